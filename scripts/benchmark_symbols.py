@@ -0,0 +1,79 @@
+"""
+benchmark of the trading symbol construction and lookup costs, run from the project root:
+
+    python scripts/benchmark_symbols.py
+"""
+import os
+import sys
+import gc
+import time
+import tracemalloc
+from typing import Callable, List, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smrti_quant_alerts.data_type import BinanceExchange, CoingeckoCoin, StockSymbol  # noqa: E402
+
+NUM_OF_SYMBOLS = 2000
+# e.g. one tick per exchange per bar close for 50 bar closes
+NUM_OF_ROUNDS = 50
+
+
+def measure(name: str, func: Callable[[], List[Any]]) -> None:
+    """
+    run <func>, print its time and the memory held by the objects it returns
+    """
+    gc.collect()
+    start = time.perf_counter()
+    res = func()
+    elapsed = time.perf_counter() - start
+    del res
+
+    gc.collect()
+    tracemalloc.start()
+    res = func()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<45} {elapsed * 1000:>8.1f} ms {current / 1024:>10.1f} KiB held  ({len(res)} objects)")
+
+
+def get_instance_size(obj: Any) -> int:
+    """
+    size of <obj> including its __dict__, if any
+    """
+    return sys.getsizeof(obj) + (sys.getsizeof(obj.__dict__) if hasattr(obj, "__dict__") else 0)
+
+
+def main() -> None:
+    bases = [f"C{i}" for i in range(NUM_OF_SYMBOLS)]
+    exchanges = [f"{base}USDT" for base in bases]
+    tickers = [f"T{i}" for i in range(NUM_OF_SYMBOLS)]
+    for base in bases:
+        BinanceExchange(base, "USDT")
+        CoingeckoCoin(base.lower(), base)
+    for ticker in tickers:
+        StockSymbol(ticker)
+
+    measure("BinanceExchange(base, quote)",
+            lambda: [BinanceExchange(base, "USDT") for _ in range(NUM_OF_ROUNDS) for base in bases])
+    measure("BinanceExchange.get_symbol_object(symbol)",
+            lambda: [BinanceExchange.get_symbol_object(exchange) for _ in range(NUM_OF_ROUNDS)
+                     for exchange in exchanges])
+    measure("CoingeckoCoin(coin_id, symbol)",
+            lambda: [CoingeckoCoin(base.lower(), base) for _ in range(NUM_OF_ROUNDS) for base in bases])
+    measure("StockSymbol(ticker)",
+            lambda: [StockSymbol(ticker) for _ in range(NUM_OF_ROUNDS) for ticker in tickers])
+
+    volumes = {BinanceExchange(base, "USDT"): 1.0 for base in bases}
+    keys = [BinanceExchange.get_symbol_object(exchange) for exchange in exchanges]
+    start = time.perf_counter()
+    for _ in range(NUM_OF_ROUNDS):
+        for key in keys:
+            volumes[key] += 1
+    print(f"{'dict lookup by BinanceExchange':<45} {(time.perf_counter() - start) * 1000:>8.1f} ms")
+    for symbol in [keys[0], CoingeckoCoin("c0", "C0"), StockSymbol("T0")]:
+        print(f"{f'size of one {symbol.type()}':<45} {get_instance_size(symbol):>8} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 import logging
 import uuid
-import time
 import os
 import csv
 from datetime import datetime, timedelta
@@ -187,7 +186,6 @@ class MACDAlert(BaseAlert):
             elif isinstance(symbol_pair[1], BinanceExchange):
                 right_close_prices = []
                 for date, _ in left_close_prices:
-                    time.sleep(0.2)
                     right_close_prices.append((date, self._binance_api.get_exchange_close_price_on_timestamp(
                         symbol_pair[1], get_stock_market_close_timestamp_from_date(date) - 60000)))
                     if right_close_prices[-1][1] == 0:
@@ -201,7 +199,6 @@ class MACDAlert(BaseAlert):
                     right_close_prices = self._enrich_close_prices_with_previous_day_price(right_close_prices)
 
                 for date, _ in right_close_prices:
-                    time.sleep(0.2)
                     left_close_prices.append((date, self._binance_api.get_exchange_close_price_on_timestamp(
                         symbol_pair[0], get_stock_market_close_timestamp_from_date(date) - 60000)))
                     if left_close_prices[-1][1] == 0:
@@ -210,7 +207,6 @@ class MACDAlert(BaseAlert):
             else:
                 left_close_prices = self._binance_api.get_exchange_close_prices_by_timeframe_num_of_ticks(
                     symbol_pair[0], timeframe, num_of_sticks)
-                time.sleep(0.2)
 
                 right_close_prices = self._binance_api.get_exchange_close_prices_by_timeframe_num_of_ticks(
                     symbol_pair[1], timeframe, num_of_sticks)
@@ -1,6 +1,10 @@
-from time import sleep
+import time
+import json
+import logging
 from decimal import Decimal
-from multiprocessing.pool import ThreadPool
+from typing import Dict, Optional
+
+from binance.websocket.um_futures.websocket_client import UMFuturesWebsocketClient
 
 from smrti_quant_alerts.alerts.base_alert import BaseAlert
 from smrti_quant_alerts.stock_crypto_api import BinanceApi
@@ -8,35 +12,92 @@ from smrti_quant_alerts.data_type import BinanceExchange
 
 
 class FutureFundingRate(BaseAlert, BinanceApi):
-    def __init__(self, alert_name: str, rate_threshold: float = 0.002, tg_type: str = "FUNDING_RATE") -> None:
+    # refresh the future exchanges known to the stream mode every hour, for new listings
+    EXCHANGES_REFRESH_INTERVAL = 3600
+
+    def __init__(self, alert_name: str, rate_threshold: float = 0.002, tg_type: str = "FUNDING_RATE",
+                 stream: bool = False) -> None:
+        """
+        :param alert_name: alert name
+        :param rate_threshold: funding rate threshold, 0.002 means +-0.2%
+        :param tg_type: telegram channel/group type
+        :param stream: alert in near real time from the !markPrice@arr websocket stream,
+                       instead of one funding rate snapshot per run
+        """
         BaseAlert.__init__(self, alert_name, tg_type=tg_type)
         BinanceApi.__init__(self)
 
         self._rate_threshold = Decimal(rate_threshold)
+        self._stream = stream
         self._exchange_list = None
         self._pass_threshold_exchanges = []
 
-    def _exchange_funding_rate_over_threshold(self, exchange: BinanceExchange) -> None:
+        # stream mode: exchanges currently over the threshold, alerted again only after going back under it
+        self._stream_pass_threshold_exchanges = set()
+        self._exchanges_timestamp = 0.0
+        self._websocket_client: Optional[UMFuturesWebsocketClient] = None
+
+    def _is_over_threshold(self, funding_rate: Decimal) -> bool:
+        return bool(funding_rate) and (funding_rate > 0 and funding_rate > self._rate_threshold or
+                                       funding_rate < 0 and funding_rate < -self._rate_threshold)
+
+    def _exchange_funding_rate_over_threshold(self, exchange: BinanceExchange, funding_rate: Decimal) -> None:
         """
         Check whether the exchange funding rate pass threshold
         """
-        funding_rate = self.get_future_exchange_funding_rate(exchange)
-        if funding_rate and (funding_rate > 0 and funding_rate > self._rate_threshold or
-                             funding_rate < 0 and funding_rate < -self._rate_threshold):
+        if self._is_over_threshold(funding_rate):
             funding_rate = f"{round(funding_rate * 100, 3)}%"
             self._pass_threshold_exchanges.append([exchange, funding_rate])
-        sleep(0.5)
+
+    def _handle_mark_price_message(self, _, msg: str) -> None:
+        """
+        Handle the all market mark price message, alert the exchanges newly passing the threshold
+
+        :param msg: [{"e": "markPriceUpdate", "s": "BTCUSDT", "r": "0.0001", ...}, ...]
+        """
+        msg = json.loads(msg)
+        if not isinstance(msg, list):
+            return
+        for exchange, funding_rate in self.parse_funding_rates(msg).items():
+            if not self._is_over_threshold(funding_rate):
+                self._stream_pass_threshold_exchanges.discard(exchange)
+            elif exchange not in self._stream_pass_threshold_exchanges:
+                self._stream_pass_threshold_exchanges.add(exchange)
+                self._exchange_funding_rate_over_threshold(exchange, funding_rate)
+
+        if self._pass_threshold_exchanges:
+            self._tg_bot.send_message(f"Funding Rate Alert: \n{self._pass_threshold_exchanges}")
+            self._pass_threshold_exchanges = []
+
+    def _run_stream(self) -> None:
+        """
+        consume the !markPrice@arr stream, restart the websocket every 5 second when it is not alive
+        """
+        while True:
+            if time.time() - self._exchanges_timestamp >= self.EXCHANGES_REFRESH_INTERVAL:
+                self.get_all_binance_exchanges("FUTURE")
+                self._exchanges_timestamp = time.time()
+            if self._websocket_client is None or not self._websocket_client.socket_manager.is_alive():
+                self._websocket_client = UMFuturesWebsocketClient(on_message=self._handle_mark_price_message)
+                self._websocket_client.mark_price_all_market()
+                logging.warning("Started mark price websocket for funding rate alert")
+            time.sleep(5)
 
     def run(self) -> None:
         """
-        This function is used to send bi-hourly alerts of funding rate over threshold
+        This function is used to send bi-hourly alerts of funding rate over threshold,
+        in stream mode it runs forever and alerts in near real time
         """
+        if self._stream:
+            self._run_stream()
+            return
+
         self._exchange_list = self.get_all_binance_exchanges("FUTURE")
         if not self._exchange_list:
             return
-        pool = ThreadPool(8)
-        pool.map(self._exchange_funding_rate_over_threshold, self._exchange_list)
-        pool.close()
+        funding_rates: Dict[BinanceExchange, Decimal] = self.get_all_future_exchanges_funding_rate()
+        for exchange in self._exchange_list:
+            self._exchange_funding_rate_over_threshold(exchange, funding_rates.get(exchange, Decimal(0)))
 
         if self._pass_threshold_exchanges:
             self._tg_bot.send_message(f"Bi-hourly Funding Rate Alert: \n"
@@ -1,13 +1,14 @@
 import logging
-import statistics
+from decimal import Decimal
 from collections import defaultdict
-from time import sleep, time
+from time import time
 from multiprocessing.pool import ThreadPool
 from typing import List, Set, Tuple, Union
 from abc import ABC, abstractmethod
 
 from smrti_quant_alerts.alerts.base_alert import BaseAlert
 from smrti_quant_alerts.stock_crypto_api import CryptoComprehensiveApi
+from smrti_quant_alerts.stock_crypto_api.moving_average_engine import MovingAverageEngine
 from smrti_quant_alerts.data_type import CoingeckoCoin, BinanceExchange, TradingSymbol
 from smrti_quant_alerts.db import close_database, SpotOverMaDBUtils
 from smrti_quant_alerts.alerts.crypto_alerts.utility import send_coins_info_to_telegram
@@ -20,32 +21,73 @@ class SpotOverMABase(ABC, CryptoComprehensiveApi):
                  trading_symbols: Union[List[TradingSymbol], Set[TradingSymbol]],
                  timeframe: int = 1, window: int = 200, alert_type: str = "alert_300") -> None:
         CryptoComprehensiveApi.__init__(self)
-        self._trading_symbols = trading_symbols
         self._symbol_type = TradingSymbol
-        self._exclude_coins = self.get_exclude_coins(exclude_coins)
-
-        self.alert_type = alert_type
         self.time_frame = timeframe
         self.window = window
+        # {TradingSymbol: spot over ma}, computed once per symbol for all the tiers run by this object
+        self._spot_over_ma_results = {}
+        self.set_tier(exclude_coins, trading_symbols, alert_type)
+
+    def set_tier(self, exclude_coins: Union[List[TradingSymbol], Set[TradingSymbol]],
+                 trading_symbols: Union[List[TradingSymbol], Set[TradingSymbol]],
+                 alert_type: str = "alert_300") -> None:
+        """
+        set the coins of the next run, the spot over ma results of the previous runs are reused
+
+        :param exclude_coins: coins not to alert
+        :param trading_symbols: coins to check
+        :param alert_type: alert type
+        """
+        self._trading_symbols = trading_symbols
+        self._exclude_coins = self.get_exclude_coins(exclude_coins)
+        self.alert_type = alert_type
         self._spot_over_ma = {}
 
+    @property
+    def trading_symbols(self) -> Union[List[TradingSymbol], Set[TradingSymbol]]:
+        return self._trading_symbols
+
     @abstractmethod
-    def _coin_spot_over_ma(self, trading_symbol: TradingSymbol) -> bool:
+    def _get_coin_prices(self, trading_symbol: TradingSymbol) -> Tuple[Decimal, List[Decimal]]:
         """
-        return True if spot price is over ma
+        return the current price and the hourly close prices from newest to oldest, (0, []) on error
         """
         raise NotImplementedError
 
+    def _get_history_days(self) -> int:
+        """
+        get the number of history days covering the ma window
+        """
+        return self.time_frame * self.window // 24 + 1
+
+    def _get_unchecked_symbols(self) -> List[TradingSymbol]:
+        """
+        get the trading symbols to check that have no spot over ma result yet
+        """
+        return [symbol for symbol in self._trading_symbols
+                if symbol not in self._exclude_coins and symbol not in self._spot_over_ma_results]
+
     def _coins_spot_over_ma(self, threads: int = 4) -> None:
         """
-        get all spot over ma coins
+        get all spot over ma coins, only the coins without result from a previous tier are checked,
+        their prices are fetched with <threads> threads and their mas computed at once
 
-        :param threads: number of threads to fill _spot_over_ma
+        :param threads: number of threads to fetch the prices
 
         """
+        unchecked_symbols = self._get_unchecked_symbols()
         pool = ThreadPool(threads)
-        pool.map(self._coin_spot_over_ma, self._trading_symbols)
+        prices = pool.map(self._get_coin_prices, unchecked_symbols)
         pool.close()
+        if unchecked_symbols:
+            engine = MovingAverageEngine([close_prices for _, close_prices in prices],
+                                         [current_price for current_price, _ in prices])
+            spot_over_ma = engine.get_spot_over_ma([(self.time_frame, self.window)])[0]
+            self._spot_over_ma_results.update(zip(unchecked_symbols, spot_over_ma.tolist()))
+
+        for trading_symbol in self._trading_symbols:
+            if trading_symbol not in self._exclude_coins and self._spot_over_ma_results.get(trading_symbol):
+                self._spot_over_ma[trading_symbol] = 1
 
         logging.info(f"spot_over_ma_{self.alert_type}: {self._spot_over_ma}")
 
@@ -90,25 +132,25 @@ class CoingeckoSpotOverMA(SpotOverMABase):
         super().__init__(exclude_coins, coingecko_coins, timeframe, window, alert_type)
         self._symbol_type = CoingeckoCoin
 
-    def _coin_spot_over_ma(self, coingecko_coin: CoingeckoCoin) -> bool:
+    def _coins_spot_over_ma(self, threads: int = 4) -> None:
         """
-        return True if spot price is over ma
+        get all spot over ma coins, the current prices of all the coins are fetched in batches first
+
+        :param threads: number of threads to fill _spot_over_ma
+        """
+        self.get_coins_current_price(self._get_unchecked_symbols())
+        super()._coins_spot_over_ma(threads=threads)
+
+    def _get_coin_prices(self, coingecko_coin: CoingeckoCoin) -> Tuple[Decimal, List[Decimal]]:
+        """
+        return the current price and the hourly close prices from newest to oldest, (0, []) on error
         """
         try:
-            if coingecko_coin in self._exclude_coins:
-                return False
-            sleep(2)
-            days_delta = self.time_frame * self.window // 24 + 1
             current_price = self.get_coin_current_price(coingecko_coin)
-            prices = self.get_coin_history_hourly_close_price(coingecko_coin, days_delta)
-            prices = prices[:self.time_frame * self.window]
-            ma = statistics.mean(prices[::self.time_frame])
-            if current_price > ma:
-                self._spot_over_ma[coingecko_coin] = 1
-                return True
-            return False
+            prices = self.get_coin_history_hourly_close_price(coingecko_coin, self._get_history_days())
+            return current_price, prices[:self.time_frame * self.window]
         except Exception:
-            return False
+            return Decimal(0), []
 
 
 class BinanceSpotOverMA(SpotOverMABase):
@@ -118,24 +160,16 @@ class BinanceSpotOverMA(SpotOverMABase):
         super().__init__(exclude_coins, binance_exchanges, timeframe, window, alert_type)
         self._symbol_type = BinanceExchange
 
-    def _coin_spot_over_ma(self, binance_exchange: BinanceExchange) -> bool:
+    def _get_coin_prices(self, binance_exchange: BinanceExchange) -> Tuple[Decimal, List[Decimal]]:
         """
-        return True if spot price is over ma
+        return the current price and the hourly close prices from newest to oldest, (0, []) on error
         """
         try:
-            if binance_exchange in self._exclude_coins:
-                return False
-            days_delta = self.time_frame * self.window // 24 + 1
             current_price = self.get_exchange_current_price(binance_exchange)
-            prices = self.get_exchange_history_hourly_close_price(binance_exchange, days_delta)
-            prices = prices[:self.time_frame * self.window]
-            ma = statistics.mean(prices[::self.time_frame])
-            if current_price > ma:
-                self._spot_over_ma[binance_exchange] = 1
-                return True
-            return False
+            prices = self.get_exchange_history_hourly_close_price(binance_exchange, self._get_history_days())
+            return current_price, prices[:self.time_frame * self.window]
         except Exception:
-            return False
+            return Decimal(0), []
 
     def _coins_spot_over_ma(self, threads: int = 6) -> None:
         """
@@ -182,6 +216,56 @@ class SpotOverMAAlert(BaseAlert, CryptoComprehensiveApi):
         self._coingecko_coins = []
         self._binance_exchanges = []
 
+        self._reset_run()
+
+    def _reset_run(self) -> None:
+        """
+        reset the run scoped results shared by the tiers of a sequential run: the spot over ma objects
+        with their results, the top market cap coins and the volume checks
+        """
+        self._coingecko_alert = None
+        self._binance_alert = None
+        self._top_market_cap_coins = []
+        self._top_market_cap_num = 0
+        self._volume_checks = defaultdict(dict)
+
+    def _get_top_market_cap_coins(self, num: int) -> List[CoingeckoCoin]:
+        """
+        get the top <num> market cap coins, a sequential run fetches the top 500 once for all the tiers,
+        their 24h volumes are recorded as the daily volume snapshot used by the volume thresholds
+
+        :param num: number of coins
+        :return: [CoingeckoCoin, ...]
+        """
+        if num > self._top_market_cap_num:
+            self._top_market_cap_num = max(num, 500) if self._alert_type == "sequential" else num
+            self._top_market_cap_coins = self.get_top_n_market_cap_coins(self._top_market_cap_num)
+            self.record_daily_volume_snapshot()
+        return self._top_market_cap_coins[:num]
+
+    @staticmethod
+    def _run_legs(*legs: SpotOverMABase) \
+            -> List[Tuple[List[Tuple[TradingSymbol, int]], List[TradingSymbol], List[TradingSymbol]]]:
+        """
+        run the coingecko and binance legs concurrently, they hit independent providers with
+        independent rate limits, each leg checks its symbols with its own bounded thread pool
+
+        :param legs: SpotOverMABase, ...
+        :return: [<result of leg.run()>, ...], in the order of <legs>
+        """
+        def run_leg(leg: SpotOverMABase) \
+                -> Tuple[List[Tuple[TradingSymbol, int]], List[TradingSymbol], List[TradingSymbol]]:
+            start = time()
+            res = leg.run()
+            logging.info(f"{leg.alert_type} {leg.__class__.__name__}: {len(leg.trading_symbols)} symbols "
+                         f"in {time() - start:.1f}s")
+            return res
+
+        pool = ThreadPool(len(legs))
+        results = pool.map(run_leg, legs)
+        pool.close()
+        return results
+
     def _get_target_coins_by_alert_type(self, alert_type: str = "alert_300") -> None:
         """
         get target coins by alert type
@@ -190,16 +274,16 @@ class SpotOverMAAlert(BaseAlert, CryptoComprehensiveApi):
         """
         # get coin list
         if alert_type == "alert_100":
-            self._binance_exchanges, self._coingecko_coins = \
-                self.get_top_market_cap_coins_with_volume_threshold(num=100)
-        elif alert_type == "alert_500":
             self._binance_exchanges, self._coingecko_coins = \
                 self.get_top_market_cap_coins_with_volume_threshold(
-                    num=500, daily_volume_threshold=1000000, weekly_volume_threshold=7000000)
-        elif alert_type == "alert_300":
+                    num=100, market_list=self._get_top_market_cap_coins(100))
+        elif alert_type in ("alert_300", "alert_500"):
+            num = int(alert_type.split("_")[1])
             self._binance_exchanges, self._coingecko_coins = \
                 self.get_top_market_cap_coins_with_volume_threshold(
-                    num=300, daily_volume_threshold=1000000, weekly_volume_threshold=7000000)
+                    num=num, daily_volume_threshold=1000000, weekly_volume_threshold=7000000,
+                    market_list=self._get_top_market_cap_coins(num),
+                    volume_checks=self._volume_checks[(1000000, 7000000)])
         elif alert_type == "meme_alert":
             self._binance_exchanges, self._coingecko_coins = \
                 self.get_coins_with_daily_volume_threshold_later_than_2023(threshold=3000000)
@@ -221,14 +305,21 @@ class SpotOverMAAlert(BaseAlert, CryptoComprehensiveApi):
         logging.info(f"{alert_type} start")
         self._get_target_coins_by_alert_type(alert_type)
 
-        # alert
-        coingecko_alert = \
-            CoingeckoSpotOverMA(exclude_coins, self._coingecko_coins, self._timeframe, self._window, alert_type)
-        coins_count, newly_deleted_coins, newly_added_coins = coingecko_alert.run()
+        # alert, the spot over ma results of the previous tiers are reused
+        if self._coingecko_alert is None:
+            self._coingecko_alert = \
+                CoingeckoSpotOverMA(exclude_coins, self._coingecko_coins, self._timeframe, self._window, alert_type)
+        else:
+            self._coingecko_alert.set_tier(exclude_coins, self._coingecko_coins, alert_type)
+        if self._binance_alert is None:
+            self._binance_alert = \
+                BinanceSpotOverMA(exclude_coins, self._binance_exchanges, self._timeframe, self._window, alert_type)
+        else:
+            self._binance_alert.set_tier(exclude_coins, self._binance_exchanges, alert_type)
 
-        binance_alert = \
-            BinanceSpotOverMA(exclude_coins, self._binance_exchanges, self._timeframe, self._window, alert_type)
-        exchanges, newly_deleted_exchanges, newly_added_exchanges = binance_alert.run()
+        (coins_count, newly_deleted_coins, newly_added_coins), \
+            (exchanges, newly_deleted_exchanges, newly_added_exchanges) = \
+            self._run_legs(self._coingecko_alert, self._binance_alert)
 
         coins_count.extend(exchanges)
         newly_deleted_coins.extend(newly_deleted_exchanges)
@@ -282,6 +373,10 @@ class SpotOverMAAlert(BaseAlert, CryptoComprehensiveApi):
         """
         self.get_all_coingecko_coins()
         self.get_all_binance_exchanges()
+        # current prices of all the tiers are served by one ticker snapshot and one price batch of this run
+        self.clear_ticker_snapshots()
+        self.clear_current_prices()
+        self._reset_run()
 
         start_timestamp = time()
 
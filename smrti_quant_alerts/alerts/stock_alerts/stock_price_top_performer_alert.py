@@ -3,13 +3,13 @@ import time
 import uuid
 import csv
 import os
-from decimal import Decimal
 from typing import List, Dict, Tuple, Optional, Set
 from collections import defaultdict
 
 from smrti_quant_alerts.email_api import EmailApi
 from smrti_quant_alerts.data_type import StockSymbol, FinancialMetricType, FinancialMetricsData
 from smrti_quant_alerts.stock_crypto_api import StockApi
+from smrti_quant_alerts.http_api import HttpSessionPool
 from smrti_quant_alerts.alerts.base_alert import BaseAlert
 from smrti_quant_alerts.llm_api import LLMAPI
 from smrti_quant_alerts.pdf_api import PDFApi
@@ -19,6 +19,8 @@ logging.basicConfig(level=logging.INFO)
 
 
 class StockPriceTopPerformerAlert(BaseAlert, StockApi):
+    PRICE_CHANGE_RETRY = 3
+
     def __init__(self, alert_name: str, tg_type: str = "TEST",
                  timeframe_list: Optional[List[str]] = None,
                  email: bool = True,
@@ -305,32 +307,24 @@ class StockPriceTopPerformerAlert(BaseAlert, StockApi):
         return res
 
     # ----------------- pre-trieve stock list -----------------
-    def get_sorted_price_increased_stocks(self) -> Dict[str, List[Tuple[StockSymbol, Decimal]]]:
+    def get_sorted_price_increased_stocks(self) -> Dict[str, List[Tuple[StockSymbol, float]]]:
         """
         Get the stocks with in the price increase percentage order for different timeframes
 
         :return: { time_frame: [(StockSymbol, price_increase_percentage), ...] }
 
         """
-        retry = True  # make sure the stock api returns non-zero price change
-        while retry:
-            stock_price_change = self.get_all_stock_price_change_percentage(self._timeframe_list)
-
-            top_stocks = {}
-            for timeframe in self._timeframe_list:
-                top_stocks[timeframe] = sorted(stock_price_change.items(),
-                                               key=lambda x: x[1][timeframe], reverse=True)
-
-                top_stocks[timeframe] = [(stock, price_change[timeframe])
-                                         for stock, price_change in top_stocks[timeframe]]
-                retry = False
-                if top_stocks[timeframe][0][1] == Decimal(0):
-                    retry = True
-
+        top_stocks = {}
+        # make sure the stock api returns non-zero price change, missing snapshots are downloaded again
+        for _ in range(self.PRICE_CHANGE_RETRY):
+            engine = self.get_price_change_engine(self._timeframe_list)
+            top_stocks = {timeframe: engine.get_sorted(timeframe) for timeframe in self._timeframe_list}
+            if all(stocks and stocks[0][1] != 0 for stocks in top_stocks.values()):
+                break
         return top_stocks
 
-    def get_top_n_non_etf_stocks(self, n: int, top_stocks: Dict[str, List[Tuple[StockSymbol, Decimal]]]) \
-            -> Dict[str, List[Tuple[StockSymbol, Decimal]]]:
+    def get_top_n_non_etf_stocks(self, n: int, top_stocks: Dict[str, List[Tuple[StockSymbol, float]]]) \
+            -> Dict[str, List[Tuple[StockSymbol, float]]]:
         """
         Get top n non-ETF stocks
 
@@ -374,6 +368,7 @@ class StockPriceTopPerformerAlert(BaseAlert, StockApi):
         This function is used to send daily report of top 50 stocks with the highest price increase
         """
         logging.warning("Running Stock Alert")
+        self.clear_quarterly_statements()
         n = 50
         top_stocks = self.get_sorted_price_increased_stocks()
         _, self._daily_volume = self.get_all_stock_price_volume_by_day_delta(1)
@@ -411,6 +406,8 @@ class StockPriceTopPerformerAlert(BaseAlert, StockApi):
         # save stock info to csv file
         self.send_stocks_info_as_csv(is_newly_added_stock, timeframe_stocks_dict, email_msg)
         close_database()
+        self.clear_quarterly_statements()
+        logging.info(f"Http connection reuse: {HttpSessionPool.get_stats()}")
         logging.info("Stock Alert Done")
 
 
@@ -3,15 +3,17 @@ import time
 import os
 import uuid
 import threading
-from typing import List, Dict, Tuple, Set
+from typing import List, Tuple, Set
 from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 import pandas as pd
 
 from smrti_quant_alerts.email_api import EmailApi
-from smrti_quant_alerts.data_type import StockSymbol, FinancialMetricType, FinancialMetricsData
+from smrti_quant_alerts.data_type import StockSymbol, FinancialMetricType, FinancialMetricsFrame
 from smrti_quant_alerts.stock_crypto_api import StockApi
+from smrti_quant_alerts.http_api import HttpSessionPool
 from smrti_quant_alerts.alerts.base_alert import BaseAlert
 from smrti_quant_alerts.db import StockAlertDBUtils, close_database
 
@@ -111,53 +113,44 @@ class StockScreenerAlert(BaseAlert, StockApi):
         stocks = [stock for stock in stocks if stock not in self._stocks_eight_quarters_stats]
 
         with ThreadPoolExecutor(max_workers=8) as executor:
-            quarterly_revenue_yoy_growth = executor.submit(self.get_stocks_quarterly_revenue_yoy_growth, stocks, 8)
-            stock_stats = executor.submit(self.get_stocks_stats_by_num_of_timeframe, stocks, "quarter", 8)
+            quarterly_revenue_yoy_growth = executor.submit(self.get_stocks_quarterly_revenue_yoy_growth_frame,
+                                                           stocks, 8)
+            stock_stats = executor.submit(self.get_stocks_stats_frame, stocks, "quarter", 8)
             quarterly_revenue_yoy_growth = quarterly_revenue_yoy_growth.result()
             stock_stats = stock_stats.result()
 
+        metrics = [FinancialMetricType.GROSS_MARGIN, FinancialMetricType.OPERATING_MARGIN,
+                   FinancialMetricType.FREE_CASH_FLOW_MARGIN]
         for stock in stocks:
-            stats = [{FinancialMetricType.REVENUE_YOY_GROWTH: quarterly_revenue_yoy_growth[stock][i],
-                      FinancialMetricType.GROSS_MARGIN: stock_stats[stock][i][FinancialMetricType.GROSS_MARGIN],
-                      FinancialMetricType.OPERATING_MARGIN: stock_stats[stock][i][FinancialMetricType.OPERATING_MARGIN],
-                      FinancialMetricType.FREE_CASH_FLOW_MARGIN:
-                          stock_stats[stock][i][FinancialMetricType.FREE_CASH_FLOW_MARGIN]} for i in range(8)]
+            stats = []
+            for i in range(8):
+                quarter_stats = stock_stats.to_metrics_data(stock, i)
+                stats.append({metric: quarter_stats[metric] for metric in metrics})
+                stats[-1].update(quarterly_revenue_yoy_growth.to_metrics_data(stock, i))
             self._stocks_eight_quarters_stats[stock] = stats
 
     def get_top_percent_stock_price_top_performer_by_gics_sector_timeframe(self) -> None:
         """
         Get top percent stock price top performer by gics sector timeframe
         """
-        all_non_etf_stocks = self.get_all_non_etf_stocks_by_gics_sector()
         self._stock_price_top_performer_by_gics_sector_timeframe = \
-            self.get_all_non_etf_stocks_price_change_percentage_by_gics_sector_timeframes(["5D", "1M"])
+            self.get_all_non_etf_stocks_price_change_percentage_by_gics_sector_timeframes(
+                ["5D", "1M"], self._price_top_percent)
         if self._top_performer_exclude_sectors:
             for sector in self._top_performer_exclude_sectors:
                 for key in self._stock_price_top_performer_by_gics_sector_timeframe.keys():
                     if sector in self._stock_price_top_performer_by_gics_sector_timeframe[key]:
                         del self._stock_price_top_performer_by_gics_sector_timeframe[key][sector]
-        for timeframe, value in self._stock_price_top_performer_by_gics_sector_timeframe.items():
-            for key, _ in value.items():
-                num_kept = int(len(all_non_etf_stocks[key]) * self._price_top_percent / 100)
-                self._stock_price_top_performer_by_gics_sector_timeframe[timeframe][key] = \
-                    self._stock_price_top_performer_by_gics_sector_timeframe[timeframe][key][:num_kept]
 
     # ---------------------------screener rules--------------------------------
-    def _growth_score_filter(self, stocks: List[StockSymbol]) \
-            -> Tuple[List[StockSymbol], Dict[StockSymbol, Dict[str, FinancialMetricsData]]]:
+    def _growth_score_filter(self, stocks: List[StockSymbol]) -> Tuple[List[StockSymbol], FinancialMetricsFrame]:
         """
         last two quarterly revenue yoy growth + avg (last two quarters) FCF margin > 80%
         """
         logging.info("growth_score_filter started")
-        filtered_stocks = []
-        growth_scores = self.get_stocks_growth_score(stocks, True)
-        for stock in stocks:
-            if growth_scores[stock][FinancialMetricType.GROWTH_SCORE] > 0.8:
-                filtered_stocks.append(stock)
-        filtered_stocks = sorted(filtered_stocks,
-                                 key=lambda x: growth_scores[x][FinancialMetricType.GROWTH_SCORE],
-                                 reverse=True)
-        return filtered_stocks, growth_scores
+        growth_scores = self.get_stocks_growth_score_frame(stocks)
+        scores = growth_scores[FinancialMetricType.GROWTH_SCORE][:, 0]
+        return growth_scores.select(scores > 0.8, sort_by=scores), growth_scores
 
     def _quarterly_revenue_yoy_growth_operating_margin_filter(self, stocks: List[StockSymbol]) -> List[StockSymbol]:
         """
@@ -168,14 +161,10 @@ class StockScreenerAlert(BaseAlert, StockApi):
         :return: list of stocks
         """
         logging.info("quarterly_revenue_yoy_growth_operating_margin_filter started")
-        filtered_stocks = []
-        revenue_yoy_growth = self.get_stocks_quarterly_revenue_yoy_growth(stocks, 1)
-        stock_stats = self.get_stocks_stats_by_num_of_timeframe(stocks, "quarter", 1)
-        for stock in stocks:
-            if revenue_yoy_growth[stock][0] + stock_stats[stock][0][FinancialMetricType.OPERATING_MARGIN] > 0.4:
-                filtered_stocks.append(stock)
-
-        return filtered_stocks
+        revenue_yoy_growth = self.get_stocks_quarterly_revenue_yoy_growth_frame(stocks, 1)
+        stock_stats = self.get_stocks_stats_frame(stocks, "quarter", 1)
+        return revenue_yoy_growth.select(revenue_yoy_growth[FinancialMetricType.REVENUE_YOY_GROWTH][:, 0] +
+                                         stock_stats[FinancialMetricType.OPERATING_MARGIN][:, 0] > 0.4)
 
     def _quarterly_revenue_yoy_growth_revenue_cagr_filter(self, stocks: List[StockSymbol]) -> List[StockSymbol]:
         """
@@ -187,29 +176,21 @@ class StockScreenerAlert(BaseAlert, StockApi):
         :return: list of stocks
         """
         logging.info("quarterly_revenue_yoy_growth_revenue_cagr_filter started")
-        filtered_stocks = []
-        revenue_yoy_growth = self.get_stocks_quarterly_revenue_yoy_growth(stocks, 6)
+        revenue_yoy_growth = self.get_stocks_quarterly_revenue_yoy_growth_frame(stocks, 6)
         revenue_cagr = self.get_stocks_revenue_cagr(stocks)
-        for stock in stocks:
-            if revenue_yoy_growth[stock][0] > 0.3 and \
-                    (revenue_cagr[stock][FinancialMetricType.REVENUE_3Y_CAGR] > 0.3 or
-                     sum(revenue_yoy_growth[stock]) / 6 > 0.3):
-                filtered_stocks.append(stock)
-
-        return filtered_stocks
+        revenue_3y_cagr = np.array([revenue_cagr[stock][FinancialMetricType.REVENUE_3Y_CAGR].float_data
+                                    for stock in stocks], dtype=float)
+        growth = revenue_yoy_growth[FinancialMetricType.REVENUE_YOY_GROWTH]
+        return revenue_yoy_growth.select((growth[:, 0] > 0.3) & ((revenue_3y_cagr > 0.3) | (growth.mean(axis=1) > 0.3)))
 
     def _quarterly_revenue_yoy_growth_filter(self, stocks: List[StockSymbol]) -> List[StockSymbol]:
         """
         latest quarterly revenue yoy growth > 30% and avg(last 3 quarterly revenue yoy growth) > 30%
         """
         logging.info("quarterly_revenue_yoy_growth_filter started")
-        filtered_stocks = []
-        revenue_yoy_growth = self.get_stocks_quarterly_revenue_yoy_growth(stocks, 3)
-        for stock in stocks:
-            if revenue_yoy_growth[stock][0] > 0.3 and \
-                    sum(revenue_yoy_growth[stock]) / 3 > 0.3:
-                filtered_stocks.append(stock)
-        return filtered_stocks
+        revenue_yoy_growth = self.get_stocks_quarterly_revenue_yoy_growth_frame(stocks, 3)
+        growth = revenue_yoy_growth[FinancialMetricType.REVENUE_YOY_GROWTH]
+        return revenue_yoy_growth.select((growth[:, 0] > 0.3) & (growth.mean(axis=1) > 0.3))
 
     # -------------------enrich email content----------------------
 
@@ -243,14 +224,13 @@ class StockScreenerAlert(BaseAlert, StockApi):
         return content + "\n"
 
     # ---------------------------build csv/xlsx-----------------------
-    def _build_growth_filter_docs(self, stocks: List[StockSymbol],
-                                  growth_scores: Dict[StockSymbol, Dict[str, FinancialMetricsData]],
+    def _build_growth_filter_docs(self, stocks: List[StockSymbol], growth_scores: FinancialMetricsFrame,
                                   growth_score_file_break_threshold: int = 1) -> List[str]:
         """
         Build growth filter xlsx files
 
         :param stocks: list of stocks
-        :param growth_scores: growth scores
+        :param growth_scores: growth scores frame of the filter
         :param growth_score_file_break_threshold: growth score file break threshold
 
         :return: list of file names
@@ -270,10 +250,10 @@ class StockScreenerAlert(BaseAlert, StockApi):
         writer_industry_maps = [defaultdict(list), defaultdict(list)]
 
         for stock in stocks:
-            index = 1 if growth_scores[stock][FinancialMetricType.GROWTH_SCORE] > \
-                         growth_score_file_break_threshold else 0
+            stats = growth_scores.to_metrics_data(stock)
+            index = 1 if stats[FinancialMetricType.GROWTH_SCORE] > growth_score_file_break_threshold else 0
             writer_industry_maps[index][stock.gics_sector].append(
-                [stock.ticker] + [str(growth_scores[stock][header]) for header in headers[1:]])
+                [stock.ticker] + [str(stats[header]) for header in headers[1:]])
 
         for filename, writer_industry_map in zip(filenames, writer_industry_maps):
             with pd.ExcelWriter(filename) as writer:
@@ -356,6 +336,7 @@ class StockScreenerAlert(BaseAlert, StockApi):
 
     # ---------------------------main--------------------------------
     def run(self) -> None:
+        self.clear_quarterly_statements()
         stocks = self._get_stocks()
         logging.warning(f"Total stocks: {len(stocks)}")
 
@@ -391,6 +372,8 @@ class StockScreenerAlert(BaseAlert, StockApi):
             if os.path.exists(file):
                 os.remove(file)
         close_database()
+        self.clear_quarterly_statements()
+        logging.info(f"Http connection reuse: {HttpSessionPool.get_stats()}")
         logging.warning("Stock Screener Alert finished")
 
 
@@ -1,5 +1,5 @@
 from .base_data_type import TradingSymbol, Tick
-from .stock_data_type import StockSymbol
+from .stock_data_type import StockSymbol, CompanyInfo
 from .crypto_data_type import BinanceExchange, CoingeckoCoin, ExchangeTick
-from .financial_metrics import FinancialMetricsData, FinancialDataType, FinancialMetricType
+from .financial_metrics import FinancialMetricsData, FinancialDataType, FinancialMetricType, FinancialMetricsFrame
 from .utility import get_class
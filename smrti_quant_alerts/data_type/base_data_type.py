@@ -1,7 +1,9 @@
 from __future__ import annotations
-from typing import Union, Optional, List
+from typing import Union, Optional, List, Any, Hashable
 from dataclasses import dataclass
 
+from .symbol_registry import SymbolRegistry
+
 
 @dataclass
 class Tick:
@@ -18,9 +20,25 @@ class Tick:
         return self.close * self.volume
 
 
-class TradingSymbol:
+class TradingSymbol(metaclass=SymbolRegistry):
+    """
+    interned trading symbol, one instance per symbol, see SymbolRegistry
+    """
+    __slots__ = ("_symbol", "_hash")
+
     def __init__(self, symbol: str) -> None:
         self._symbol = symbol.upper()
+        self._hash = hash(self._symbol)
+
+    @staticmethod
+    def intern_key(symbol: str) -> Hashable:
+        return symbol.upper()
+
+    def _reintern(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def __reduce__(self) -> tuple:
+        return self.__class__, (self._symbol,)
 
     def __repr__(self) -> str:
         return self._symbol
@@ -29,6 +47,8 @@ class TradingSymbol:
         return self._symbol
 
     def __eq__(self, other: Union[str, TradingSymbol]) -> bool:
+        if other is self:
+            return True
         if isinstance(other, self.__class__):
             return self._symbol == other._symbol
         elif isinstance(other, str):
@@ -64,7 +84,7 @@ class TradingSymbol:
         return False
 
     def __hash__(self) -> int:
-        return hash(self._symbol)
+        return self._hash
 
     def lower(self) -> str:
         return self._symbol.lower()
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Optional, Union, List
+from typing import Optional, Union, List, Tuple, Any
 from collections import defaultdict
 
 from .base_data_type import TradingSymbol, Tick
@@ -15,6 +15,7 @@ class ExchangeTick(Tick):
 
 
 class BinanceExchange(TradingSymbol):
+    __slots__ = ("base_symbol", "quote_symbol")
     symbol_base_quote_map = {}
     symbol_base_coingecko_id_map = {}
 
@@ -26,16 +27,28 @@ class BinanceExchange(TradingSymbol):
 
         super().__init__(f"{self.base_symbol}{self.quote_symbol}")
 
+    @staticmethod
+    def intern_key(base_symbol: str, quote_symbol: str) -> Tuple[str, str]:
+        return base_symbol.upper(), quote_symbol.upper()
+
+    def _reintern(self, *args: Any, **kwargs: Any) -> None:
+        # the map may have been reset since the instance was interned
+        if self._symbol not in self.symbol_base_quote_map:
+            self.symbol_base_quote_map[self._symbol] = (self.base_symbol, self.quote_symbol)
+
+    def __reduce__(self) -> tuple:
+        return self.__class__, (self.base_symbol, self.quote_symbol)
+
     @property
     def exchange(self) -> str:
         return self._symbol
 
     @staticmethod
     def get_symbol_object(symbol: str) -> Optional[BinanceExchange]:
-        if symbol.upper() in BinanceExchange.symbol_base_quote_map:
-            base_symbol, quote_symbol = BinanceExchange.symbol_base_quote_map[symbol.upper()]
-            return BinanceExchange(base_symbol, quote_symbol)
-        return None
+        base_quote = BinanceExchange.symbol_base_quote_map.get(symbol.upper())
+        if base_quote is None:
+            return None
+        return BinanceExchange.get_interned(base_quote) or BinanceExchange(*base_quote)
 
     @staticmethod
     def get_coingecko_id_by_base(base: str) -> str:
@@ -47,6 +60,7 @@ class BinanceExchange(TradingSymbol):
 
 
 class CoingeckoCoin(TradingSymbol):
+    __slots__ = ("coin_id",)
     symbol_id_map = defaultdict(set)
 
     def __init__(self, coin_id: str, coin_symbol: str) -> None:
@@ -54,8 +68,21 @@ class CoingeckoCoin(TradingSymbol):
 
         self.coin_id = coin_id
         super().__init__(coin_symbol)
+        self._hash = hash(self._symbol + self.coin_id)
         self.symbol_id_map[coin_symbol].add(coin_id)
 
+    @staticmethod
+    def intern_key(coin_id: str, coin_symbol: str) -> Tuple[str, str]:
+        return coin_id, coin_symbol.upper()
+
+    def _reintern(self, *args: Any, **kwargs: Any) -> None:
+        # the map may have been reset since the instance was interned
+        if self.coin_id not in self.symbol_id_map.get(self._symbol, ()):
+            self.symbol_id_map[self._symbol].add(self.coin_id)
+
+    def __reduce__(self) -> tuple:
+        return self.__class__, (self.coin_id, self._symbol)
+
     @property
     def coin_symbol(self) -> str:
         return self._symbol
@@ -80,6 +107,8 @@ class CoingeckoCoin(TradingSymbol):
         return None
 
     def __eq__(self, other: Union[str, CoingeckoCoin]) -> bool:
+        if other is self:
+            return True
         if isinstance(other, CoingeckoCoin):
             return self._symbol == other._symbol and self.coin_id == other.coin_id
         elif isinstance(other, str):
@@ -90,4 +119,4 @@ class CoingeckoCoin(TradingSymbol):
         return self._symbol + "&&" + self.coin_id
 
     def __hash__(self) -> int:
-        return hash(self._symbol + self.coin_id)
+        return self._hash
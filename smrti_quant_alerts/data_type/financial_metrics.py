@@ -1,6 +1,6 @@
 from __future__ import annotations
 from enum import Enum, StrEnum
-from typing import Union
+from typing import Union, List, Dict, Hashable, Iterable, Optional
 
 import numpy as np
 
@@ -149,3 +149,107 @@ class FinancialMetricsData:
         if other == 0:
             return FinancialMetricsData(0, FinancialDataType.FLOAT, self._has_percentage)
         return FinancialMetricsData(self.float_data / other, FinancialDataType.FLOAT, self._has_percentage)
+
+
+class FinancialMetricsFrame:
+    """
+    NumPy columnar financial metrics of many stocks, a (stocks, periods, metrics) float array
+    with the newest period first. Whole-array arithmetic and filtering run on the metric columns,
+    FinancialMetricsData is only built at the formatting boundary. NaN and inf are stored as 0,
+    the same as FinancialMetricsData.
+    """
+    def __init__(self, stocks: Iterable[Hashable], num_of_periods: int, metrics: Iterable[FinancialMetricType],
+                 percentage_metrics: Iterable[FinancialMetricType] = ()) -> None:
+        """
+        :param stocks: [StockSymbol, ...]
+        :param num_of_periods: number of periods, e.g. quarters
+        :param metrics: [FinancialMetricType, ...]
+        :param percentage_metrics: metrics in <metrics> with percentage
+        """
+        self.stocks = list(stocks)
+        self.metrics = list(metrics)
+        self.num_of_periods = num_of_periods
+        self.values = np.zeros((len(self.stocks), num_of_periods, len(self.metrics)))
+        percentage_metrics = set(percentage_metrics)
+        self.has_percentage = np.array([metric in percentage_metrics for metric in self.metrics], dtype=bool)
+        self._stock_index = {stock: i for i, stock in enumerate(self.stocks)}
+        self._metric_index = {metric: i for i, metric in enumerate(self.metrics)}
+
+    def __len__(self) -> int:
+        return len(self.stocks)
+
+    def __contains__(self, stock: Hashable) -> bool:
+        return stock in self._stock_index
+
+    def __getitem__(self, metric: FinancialMetricType) -> np.ndarray:
+        """
+        :param metric: FinancialMetricType
+        :return: (stocks, periods) view of <metric>
+        """
+        return self.values[:, :, self._metric_index[metric]]
+
+    def __setitem__(self, metric: FinancialMetricType, values: Union[np.ndarray, float]) -> None:
+        """
+        set the whole <metric> column, NaN and inf are stored as 0
+
+        :param metric: FinancialMetricType
+        :param values: (stocks, periods) or broadcastable values
+        """
+        self.values[:, :, self._metric_index[metric]] = \
+            np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def get_stock_index(self, stock: Hashable) -> int:
+        """
+        :param stock: StockSymbol
+        :return: row of <stock>, -1 if not in the frame
+        """
+        return self._stock_index.get(stock, -1)
+
+    def select(self, mask: np.ndarray, sort_by: Optional[np.ndarray] = None) -> List[Hashable]:
+        """
+        select the stocks where <mask> is True
+
+        :param mask: (stocks,) bool array, e.g. frame[FinancialMetricType.GROWTH_SCORE][:, 0] > 0.8
+        :param sort_by: (stocks,) array to sort the selected stocks by, the largest first, None to keep the order
+
+        :return: [StockSymbol, ...]
+        """
+        index = np.flatnonzero(mask)
+        if sort_by is not None:
+            index = index[np.argsort(-sort_by[index], kind="stable")]
+        return [self.stocks[i] for i in index]
+
+    @staticmethod
+    def safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+        """
+        element-wise division, 0 where the denominator is 0, the same as FinancialMetricsData division
+
+        :param numerator: np.ndarray
+        :param denominator: np.ndarray
+        :return: np.ndarray
+        """
+        numerator, denominator = np.asarray(numerator, dtype=float), np.asarray(denominator, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(denominator != 0, numerator / np.where(denominator != 0, denominator, 1), 0.0)
+
+    def to_metrics_data(self, stock: Hashable, period: int = 0) -> Dict[FinancialMetricType, FinancialMetricsData]:
+        """
+        convert the metrics of <stock> in <period> for formatting
+
+        :param stock: StockSymbol
+        :param period: period index, 0 is the newest
+        :return: {FinancialMetricType: FinancialMetricsData}, all 0 if <stock> is not in the frame
+        """
+        row = self._stock_index.get(stock)
+        values = self.values[row, period].tolist() if row is not None else [0.0] * len(self.metrics)
+        return {metric: FinancialMetricsData(value, has_percentage=bool(has_percentage))
+                for metric, value, has_percentage in zip(self.metrics, values, self.has_percentage)}
+
+    def to_dict(self) -> Dict[Hashable, List[Dict[FinancialMetricType, FinancialMetricsData]]]:
+        """
+        convert the whole frame for formatting
+
+        :return: {StockSymbol: [{FinancialMetricType: FinancialMetricsData}, ...]}, the newest period first
+        """
+        return {stock: [self.to_metrics_data(stock, period) for period in range(self.num_of_periods)]
+                for stock in self.stocks}
@@ -1,14 +1,51 @@
 from __future__ import annotations
-from typing import Tuple
+from typing import Tuple, Any, Dict
+from dataclasses import dataclass, field
 
 from .base_data_type import TradingSymbol
 
 
+@dataclass(frozen=True, slots=True)
+class CompanyInfo:
+    """
+    immutable company info, one record shared by all the symbols of the company
+    """
+    security_name: str = ""
+    gics_sector: str = ""
+    gics_sub_industry: str = ""
+    location: str = ""
+    cik: str = ""
+    founded_time: str = ""
+    is_complete: bool = field(init=False, default=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "is_complete", all([self.security_name, self.gics_sector, self.gics_sub_industry,
+                                                     self.location, self.cik, self.founded_time]))
+
+    def merge(self, other: CompanyInfo) -> CompanyInfo:
+        """
+        fill the empty fields from <other>
+
+        :param other: CompanyInfo
+        :return: merged CompanyInfo, self if nothing to fill
+        """
+        if self.is_complete or other is EMPTY_COMPANY_INFO:
+            return self
+        return CompanyInfo(self.security_name or other.security_name, self.gics_sector or other.gics_sector,
+                           self.gics_sub_industry or other.gics_sub_industry, self.location or other.location,
+                           self.cik or other.cik, self.founded_time or other.founded_time)
+
+
+EMPTY_COMPANY_INFO = CompanyInfo()
+
+
 class StockSymbol(TradingSymbol):
+    __slots__ = ("market", "_info")
     nasdaq_set = set()
     sp500_set = set()
     nyse_set = set()
-    symbol_info_map = {}
+    # {ticker: complete CompanyInfo}
+    symbol_info_map: Dict[str, CompanyInfo] = {}
 
     def __init__(self, symbol: str, security_name: str = "", gics_sector: str = "",
                  gics_sub_industry: str = "", location: str = "", cik: str = "",
@@ -16,15 +53,41 @@ class StockSymbol(TradingSymbol):
                  nyse: bool = False) -> None:
         symbol, self.market = StockSymbol.parse_symbol_market(symbol)
         super().__init__(symbol.upper())
-        self._security_name = security_name if security_name else ""
-        self._gics_sector = gics_sector if gics_sector else ""
-        self._gics_sub_industry = gics_sub_industry if gics_sub_industry else ""
-        self._location = location if location else ""
-        self._cik = cik if cik else ""
-        self._founded_time = founded_time if founded_time else ""
-        if symbol in StockSymbol.symbol_info_map and StockSymbol.symbol_info_map[symbol].has_stock_info:
-            self.copy(StockSymbol.symbol_info_map[symbol])
+        self._info = StockSymbol.symbol_info_map.get(self._symbol) or \
+            self._to_company_info(security_name, gics_sector, gics_sub_industry, location, cik, founded_time)
+        self._update_index(sp500, nasdaq, nyse)
 
+    @staticmethod
+    def intern_key(symbol: str, *args: Any, **kwargs: Any) -> Tuple[str, str]:
+        symbol, market = StockSymbol.parse_symbol_market(symbol)
+        return symbol.upper(), market
+
+    def _reintern(self, symbol: str, *args: Any, **kwargs: Any) -> None:
+        """
+        record the info given to a later construction of the interned symbol, a complete info is kept
+        """
+        if args or kwargs:
+            self._merge_info(*args, **kwargs)
+
+    def _merge_info(self, security_name: str = "", gics_sector: str = "",
+                    gics_sub_industry: str = "", location: str = "", cik: str = "",
+                    founded_time: str = "", sp500: bool = False, nasdaq: bool = False,
+                    nyse: bool = False) -> None:
+        if not self._info.is_complete:
+            self._info = self._to_company_info(security_name, gics_sector, gics_sub_industry,
+                                               location, cik, founded_time).merge(self._info)
+        self._update_index(sp500, nasdaq, nyse)
+
+    @staticmethod
+    def _to_company_info(*fields: str) -> CompanyInfo:
+        return CompanyInfo(*[value or "" for value in fields]) if any(fields) else EMPTY_COMPANY_INFO
+
+    def __reduce__(self) -> tuple:
+        info = self._info
+        return self.__class__, (f"{self._symbol}@{self.market}", info.security_name, info.gics_sector,
+                                info.gics_sub_industry, info.location, info.cik, info.founded_time)
+
+    def _update_index(self, sp500: bool, nasdaq: bool, nyse: bool) -> None:
         if sp500:
             StockSymbol.sp500_set.add(self._symbol)
         if nasdaq:
@@ -32,8 +95,25 @@ class StockSymbol(TradingSymbol):
         if nyse:
             StockSymbol.nyse_set.add(self._symbol)
 
-        if self.has_stock_info:
-            self.symbol_info_map[self._symbol] = self
+        if self._info.is_complete:
+            StockSymbol.symbol_info_map[self._symbol] = self._info
+
+    @classmethod
+    def load_company_info(cls, company_info: Dict[str, CompanyInfo]) -> None:
+        """
+        attach company info records in bulk, e.g. loaded from the database or the FMP profile endpoint,
+        to the interned symbols of the tickers and to the ones created later
+
+        :param company_info: {ticker: CompanyInfo}
+        """
+        company_info = {ticker.upper(): info for ticker, info in company_info.items()}
+        cls.symbol_info_map.update({ticker: info for ticker, info in company_info.items() if info.is_complete})
+        for ticker in company_info:
+            cls(ticker)
+        for (ticker, _), stock in list(cls._instances.items()):
+            info = company_info.get(ticker)
+            if info is not None and not stock._info.is_complete:
+                stock._info = info.merge(stock._info)
 
     @property
     def ticker(self) -> str:
@@ -49,33 +129,27 @@ class StockSymbol(TradingSymbol):
 
     @property
     def security_name(self) -> str:
-        self._refresh()
-        return self._security_name
+        return self._info.security_name
 
     @property
     def gics_sector(self) -> str:
-        self._refresh()
-        return self._gics_sector
+        return self._info.gics_sector
 
     @property
     def gics_sub_industry(self) -> str:
-        self._refresh()
-        return self._gics_sub_industry
+        return self._info.gics_sub_industry
 
     @property
     def location(self) -> str:
-        self._refresh()
-        return self._location
+        return self._info.location
 
     @property
     def cik(self) -> str:
-        self._refresh()
-        return self._cik
+        return self._info.cik
 
     @property
     def founded_time(self) -> str:
-        self._refresh()
-        return self._founded_time
+        return self._info.founded_time
 
     @property
     def is_sp500(self) -> bool:
@@ -91,14 +165,14 @@ class StockSymbol(TradingSymbol):
 
     @property
     def has_stock_info(self) -> bool:
-        self._refresh()
-        return self._security_name != "" and self._gics_sector != "" and self._gics_sub_industry != "" \
-            and self._location != "" and self._cik != "" and self._founded_time != ""
+        return self._info.is_complete
+
+    @property
+    def company_info(self) -> CompanyInfo:
+        return self._info
 
     @staticmethod
     def get_symbol_object(symbol: str) -> StockSymbol:
-        if symbol.upper() in StockSymbol.symbol_info_map:
-            return StockSymbol.symbol_info_map[symbol.upper()]
         return StockSymbol(symbol)
 
     @staticmethod
@@ -107,17 +181,3 @@ class StockSymbol(TradingSymbol):
             symbol, market = symbol.split("@")
             return symbol, market
         return symbol, "US"
-
-    def copy(self, stock_symbol: StockSymbol):
-        self._security_name = stock_symbol._security_name
-        self._gics_sector = stock_symbol._gics_sector
-        self._gics_sub_industry = stock_symbol._gics_sub_industry
-        self._location = stock_symbol._location
-        self._cik = stock_symbol._cik
-        self._founded_time = stock_symbol._founded_time
-        self.market = stock_symbol.market
-        self._symbol = stock_symbol._symbol
-
-    def _refresh(self):
-        if self._symbol in StockSymbol.symbol_info_map:
-            self.copy(StockSymbol.symbol_info_map[self._symbol])
@@ -0,0 +1,45 @@
+import threading
+from typing import Any, Dict, Hashable
+
+
+class SymbolRegistry(type):
+    """
+    Flyweight registry, metaclass of the trading symbols.
+
+    Constructing a symbol returns the one interned instance of its intern_key, only the first construction
+    of a key runs __init__, the later ones only run _reintern (e.g. to record newly known info) and a dict lookup.
+    Each symbol class has its own registry.
+    """
+    def __init__(cls, name: str, bases: tuple, namespace: Dict[str, Any]) -> None:
+        super().__init__(name, bases, namespace)
+        cls._instances: Dict[Hashable, Any] = {}
+        cls._instances_lock = threading.Lock()
+
+    def __call__(cls, *args: Any, **kwargs: Any) -> Any:
+        key = cls.intern_key(*args, **kwargs)
+        instance = cls._instances.get(key)
+        if instance is None:
+            with cls._instances_lock:
+                instance = cls._instances.get(key)
+                if instance is None:
+                    instance = super().__call__(*args, **kwargs)
+                    cls._instances[key] = instance
+                    return instance
+        instance._reintern(*args, **kwargs)
+        return instance
+
+    def get_interned(cls, key: Hashable) -> Any:
+        """
+        get the interned instance of <key> without constructing one
+
+        :param key: intern key
+        :return: symbol, None if not interned
+        """
+        return cls._instances.get(key)
+
+    def clear_interned(cls) -> None:
+        """
+        drop all the interned instances of the class
+        """
+        with cls._instances_lock:
+            cls._instances = {}
@@ -1,2 +1,4 @@
 from .utility import init_database_runtime, close_database, is_database_runtime_initialized, \
-    PriceVolumeDBUtils, SpotOverMaDBUtils, StockAlertDBUtils
+    init_database_cache, is_database_cache_initialized, \
+    PriceVolumeDBUtils, SpotOverMaDBUtils, StockAlertDBUtils, ResponseCacheDBUtils, StockBarDBUtils, \
+    ExchangeKlineDBUtils, CoinChartDBUtils, ReferenceDataDBUtils, CoinListingDBUtils, CoinVolumeDBUtils
@@ -5,6 +5,8 @@ from peewee import DatabaseProxy, SqliteDatabase
 from smrti_quant_alerts.settings import Config
 
 database_runtime = DatabaseProxy()
+# persistent cache shared by all the alerts, independent of the per alert database_runtime
+database_cache = DatabaseProxy()
 
 
 def init_database(db_name: str) -> SqliteDatabase:
@@ -1,10 +1,11 @@
 import time
 
-from peewee import Model, CharField, IntegerField, DateTimeField, CompositeKey, DecimalField, BooleanField
+from peewee import Model, CharField, IntegerField, DateTimeField, CompositeKey, DecimalField, BooleanField, \
+    TextField, FloatField, BigIntegerField
 from playhouse.shortcuts import ThreadSafeDatabaseMetadata
 
 
-from smrti_quant_alerts.db.database import database_runtime
+from smrti_quant_alerts.db.database import database_runtime, database_cache
 
 
 class BaseModel(Model):
@@ -13,6 +14,12 @@ class BaseModel(Model):
         model_metadata_class = ThreadSafeDatabaseMetadata
 
 
+class CacheBaseModel(Model):
+    class Meta:
+        database = database_cache
+        model_metadata_class = ThreadSafeDatabaseMetadata
+
+
 # -------------- price_volume ----------------
 class ExchangeCount(BaseModel):
     exchange = CharField()
@@ -59,3 +66,81 @@ class StockInfo(BaseModel):
     location = CharField()
     cik = CharField()
     founded_time = CharField()
+
+
+# -------------- cache ----------------
+class ResponseCacheEntry(CacheBaseModel):
+    url = CharField(primary_key=True)
+    endpoint = CharField(index=True)
+    response = TextField()
+    size = IntegerField()
+    date = DateTimeField(default=time.time, index=True)
+
+    class Meta:
+        # keep the table of the existing caches
+        table_name = "responsecache"
+
+
+class StockBar(CacheBaseModel):
+    symbol = CharField()
+    timeframe = CharField()
+    # bar start time in US/Eastern, "%Y-%m-%d" for daily bars, "%Y-%m-%d %H:%M:%S" for intraday bars
+    date = CharField()
+    close = FloatField()
+
+    class Meta:
+        primary_key = CompositeKey('symbol', 'timeframe', 'date')
+
+
+class ExchangeKline(CacheBaseModel):
+    exchange = CharField()
+    interval = CharField()
+    # kline open time in ms
+    open_time = BigIntegerField()
+    close = FloatField()
+
+    class Meta:
+        primary_key = CompositeKey('exchange', 'interval', 'open_time')
+
+
+class CoinChartPoint(CacheBaseModel):
+    coin_id = CharField()
+    # market_chart granularity, "hourly" or "daily"
+    granularity = CharField()
+    # in ms
+    timestamp = BigIntegerField()
+    price = FloatField()
+    volume = FloatField()
+
+    class Meta:
+        primary_key = CompositeKey('coin_id', 'granularity', 'timestamp')
+
+
+class ReferenceData(CacheBaseModel):
+    # dataset name, e.g. "coingecko_coins"
+    name = CharField(primary_key=True)
+    # json
+    data = TextField()
+    date = FloatField(default=time.time)
+
+
+class CoinListing(CacheBaseModel):
+    coin_id = CharField(primary_key=True)
+    # "%Y-%m-%d...", empty if unknown
+    atl_date = CharField(default="")
+    ath_date = CharField(default="")
+    # None until requested, empty if coingecko has none
+    genesis_date = CharField(null=True)
+    # update time of atl_date/ath_date
+    date = FloatField(default=time.time)
+
+
+class CoinDailyVolume(CacheBaseModel):
+    coin_id = CharField()
+    # UTC "%Y-%m-%d"
+    date = CharField()
+    # 24h volume in USD
+    volume = FloatField()
+
+    class Meta:
+        primary_key = CompositeKey('coin_id', 'date')
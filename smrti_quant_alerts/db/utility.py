@@ -1,12 +1,16 @@
 import time
+from collections import defaultdict
 from decimal import Decimal
 from typing import Union, Type, Dict, Optional, List, Tuple, Iterable, Set
 from threading import RLock
 
 
-from smrti_quant_alerts.db.database import database_runtime, init_database
-from smrti_quant_alerts.db.models import LastCount, ExchangeCount, StockAlertCount, MACDAlertValue, StockInfo
-from smrti_quant_alerts.data_type import TradingSymbol, get_class, BinanceExchange, StockSymbol
+from peewee import fn
+
+from smrti_quant_alerts.db.database import database_runtime, database_cache, init_database
+from smrti_quant_alerts.db.models import LastCount, ExchangeCount, StockAlertCount, MACDAlertValue, StockInfo, \
+    ResponseCacheEntry, StockBar, ExchangeKline, CoinChartPoint, ReferenceData, CoinListing, CoinDailyVolume
+from smrti_quant_alerts.data_type import TradingSymbol, get_class, BinanceExchange, StockSymbol, CompanyInfo
 
 # ------------ general utilities -------------
 
@@ -23,6 +27,16 @@ def is_database_runtime_initialized() -> bool:
 def close_database() -> None:
     database_runtime.close()
 
+
+def init_database_cache(db_name: str = "cache.db") -> None:
+    database_cache.initialize(init_database(db_name))
+    database_cache.create_tables([ResponseCacheEntry, StockBar, ExchangeKline, CoinChartPoint, ReferenceData,
+                                  CoinListing, CoinDailyVolume], safe=True)
+
+
+def is_database_cache_initialized() -> bool:
+    return database_cache.obj is not None
+
 # -------------- price_volume ----------------
 
 
@@ -243,11 +257,13 @@ class StockAlertDBUtils:
 
         stocks_with_info, stocks_without_info = [], []
         with database_runtime.atomic():
-            res = StockInfo.select().where(StockInfo.symbol.in_([i.ticker for i in stocks])).dicts()
+            res = list(StockInfo.select().where(StockInfo.symbol.in_([i.ticker for i in stocks])).dicts())
+            StockSymbol.load_company_info({
+                i["symbol"]: CompanyInfo(i["security_name"] or "", i["gics_sector"] or "",
+                                         i["gics_sub_industry"] or "", i["location"] or "",
+                                         i["cik"] or "", i["founded_time"] or "") for i in res})
             for i in res:
-                stock = StockSymbol(
-                    i["symbol"], i["security_name"], i["gics_sector"], i["gics_sub_industry"],
-                    i["location"], i["cik"], i["founded_time"])
+                stock = StockSymbol(i["symbol"])
                 if full:
                     if stock.has_stock_info:
                         stocks_with_info.append(stock)
@@ -305,3 +321,478 @@ class MACDAlertDBUtils(StockAlertDBUtils):
                                   last_week_value=last_week_value).on_conflict(
                 conflict_target=[MACDAlertValue.symbol_left, MACDAlertValue.symbol_right],
                 update={MACDAlertValue.last_week_value: last_week_value}).execute()
+
+
+# -------------- cache ----------------
+
+
+class ResponseCacheDBUtils:
+    db_lock = RLock()
+
+    @staticmethod
+    def get_response(url: str, ttl: Union[int, float]) -> Optional[str]:
+        """
+        get the cached response of <url> if it is not older than <ttl> seconds
+
+        :param url: cache key
+        :param ttl: time to live in seconds
+
+        :return: cached response text, None if not cached or expired
+        """
+        with database_cache.atomic():
+            res = ResponseCacheEntry.select(ResponseCacheEntry.response).where(
+                (ResponseCacheEntry.url == url) & (ResponseCacheEntry.date >= time.time() - ttl)).dicts()
+            return res[0]["response"] if res else None
+
+    @classmethod
+    def set_response(cls, url: str, endpoint: str, response: str) -> None:
+        """
+        write/overwrite the cached response of <url>
+
+        :param url: cache key
+        :param endpoint: endpoint name, e.g. "income-statement"
+        :param response: response text
+        """
+        with database_cache.atomic("EXCLUSIVE"):
+            with cls.db_lock:
+                ResponseCacheEntry.replace(url=url, endpoint=endpoint, response=response,
+                                           size=len(response), date=time.time()).execute()
+
+    @classmethod
+    def evict(cls, max_size: int) -> int:
+        """
+        delete the oldest cached responses until the total size is not larger than <max_size>
+
+        :param max_size: max total size of the cached responses in bytes
+
+        :return: number of deleted responses
+        """
+        with database_cache.atomic("EXCLUSIVE"):
+            with cls.db_lock:
+                total_size = ResponseCacheEntry.select(fn.COALESCE(fn.SUM(ResponseCacheEntry.size), 0)).scalar()
+                if total_size <= max_size:
+                    return 0
+                urls = []
+                for i in ResponseCacheEntry.select(ResponseCacheEntry.url, ResponseCacheEntry.size) \
+                        .order_by(ResponseCacheEntry.date).dicts():
+                    if total_size <= max_size:
+                        break
+                    urls.append(i["url"])
+                    total_size -= i["size"]
+                for start in range(0, len(urls), 500):
+                    ResponseCacheEntry.delete().where(ResponseCacheEntry.url.in_(urls[start:start + 500])).execute()
+                return len(urls)
+
+    @classmethod
+    def clear(cls, endpoint: Optional[str] = None) -> None:
+        """
+        delete all cached responses or the ones of <endpoint>
+
+        :param endpoint: endpoint name
+        """
+        with database_cache.atomic("EXCLUSIVE"):
+            with cls.db_lock:
+                query = ResponseCacheEntry.delete()
+                if endpoint:
+                    query = query.where(ResponseCacheEntry.endpoint == endpoint)
+                query.execute()
+
+
+class StockBarDBUtils:
+    db_lock = RLock()
+    # max number of symbols per IN clause
+    CHUNK_SIZE = 500
+
+    @classmethod
+    def get_bar_stats(cls, symbols: Iterable[str], timeframe: str) -> Dict[str, Tuple[int, str]]:
+        """
+        get the number of stored bars and the latest bar date of each symbol
+
+        :param symbols: [symbol, ...]
+        :param timeframe: "1day", "4hour", ...
+
+        :return: {symbol: (<number of bars>, <latest date>)}, symbols without bars are omitted
+        """
+        symbols = list(symbols)
+        res = {}
+        with database_cache.atomic():
+            for start in range(0, len(symbols), cls.CHUNK_SIZE):
+                query = StockBar.select(StockBar.symbol, fn.COUNT(StockBar.date).alias("count"),
+                                        fn.MAX(StockBar.date).alias("latest")) \
+                    .where((StockBar.timeframe == timeframe) &
+                           (StockBar.symbol.in_(symbols[start:start + cls.CHUNK_SIZE]))) \
+                    .group_by(StockBar.symbol).dicts()
+                for row in query:
+                    res[row["symbol"]] = (row["count"], row["latest"])
+        return res
+
+    @classmethod
+    def get_closes(cls, symbols: Iterable[str], timeframe: str, num_of_bars: int) -> Dict[str, List[float]]:
+        """
+        get the latest <num_of_bars> close prices of each symbol
+
+        :param symbols: [symbol, ...]
+        :param timeframe: "1day", "4hour", ...
+        :param num_of_bars: max number of bars per symbol
+
+        :return: {symbol: [close, ...]}, with the newest bar first
+        """
+        symbols = list(symbols)
+        res = defaultdict(list)
+        with database_cache.atomic():
+            for start in range(0, len(symbols), cls.CHUNK_SIZE):
+                ranked = StockBar.select(StockBar.symbol, StockBar.close,
+                                         fn.ROW_NUMBER().over(partition_by=[StockBar.symbol],
+                                                              order_by=[StockBar.date.desc()]).alias("rank")) \
+                    .where((StockBar.timeframe == timeframe) &
+                           (StockBar.symbol.in_(symbols[start:start + cls.CHUNK_SIZE])))
+                query = StockBar.select(ranked.c.symbol, ranked.c.close).from_(ranked) \
+                    .where(ranked.c.rank <= num_of_bars).order_by(ranked.c.symbol, ranked.c.rank).tuples()
+                for symbol, close in query:
+                    res[symbol].append(close)
+        return dict(res)
+
+    @classmethod
+    def add_bars(cls, timeframe: str, bars: Dict[str, List[Tuple[str, float]]],
+                 oldest_date: Optional[str] = None) -> None:
+        """
+        write/overwrite bars
+
+        :param timeframe: "1day", "4hour", ...
+        :param bars: {symbol: [(date, close), ...]}
+        :param oldest_date: delete the bars of <timeframe> dated before it, None to keep all
+        """
+        rows = [{"symbol": symbol, "timeframe": timeframe, "date": date, "close": close}
+                for symbol, symbol_bars in bars.items() for date, close in symbol_bars]
+        with database_cache.atomic("EXCLUSIVE"):
+            with cls.db_lock:
+                for start in range(0, len(rows), cls.CHUNK_SIZE):
+                    StockBar.replace_many(rows[start:start + cls.CHUNK_SIZE]).execute()
+                if oldest_date is not None:
+                    StockBar.delete().where((StockBar.timeframe == timeframe) &
+                                            (StockBar.date < oldest_date)).execute()
+
+    @classmethod
+    def clear(cls, timeframe: Optional[str] = None) -> None:
+        """
+        delete all bars or the ones of <timeframe>
+
+        :param timeframe: "1day", "4hour", ...
+        """
+        with database_cache.atomic("EXCLUSIVE"):
+            with cls.db_lock:
+                query = StockBar.delete()
+                if timeframe:
+                    query = query.where(StockBar.timeframe == timeframe)
+                query.execute()
+
+
+# -------------- binance kline store ----------------
+class ExchangeKlineDBUtils:
+    db_lock = RLock()
+
+    @classmethod
+    def get_open_time_range(cls, exchange: str, interval: str) -> Tuple[Optional[int], Optional[int]]:
+        """
+        get the open time of the oldest and the newest stored kline
+
+        :param exchange: "BTCUSDT", ...
+        :param interval: "1h", "1d", ...
+
+        :return: (<oldest open time>, <newest open time>) in ms, (None, None) without klines
+        """
+        with database_cache.atomic():
+            row = ExchangeKline.select(fn.MIN(ExchangeKline.open_time).alias("oldest"),
+                                       fn.MAX(ExchangeKline.open_time).alias("newest")) \
+                .where((ExchangeKline.exchange == exchange) & (ExchangeKline.interval == interval)).dicts().get()
+        return row["oldest"], row["newest"]
+
+    @classmethod
+    def get_klines(cls, exchange: str, interval: str, start_time: int = 0) -> List[Tuple[int, float]]:
+        """
+        get the stored klines opened from <start_time>
+
+        :param exchange: "BTCUSDT", ...
+        :param interval: "1h", "1d", ...
+        :param start_time: open time in ms
+
+        :return: [(open_time, close), ...], with the newest kline first
+        """
+        with database_cache.atomic():
+            return list(ExchangeKline.select(ExchangeKline.open_time, ExchangeKline.close)
+                        .where((ExchangeKline.exchange == exchange) & (ExchangeKline.interval == interval) &
+                               (ExchangeKline.open_time >= start_time))
+                        .order_by(ExchangeKline.open_time.desc()).tuples())
+
+    @classmethod
+    def add_klines(cls, exchange: str, interval: str, klines: List[Tuple[int, float]],
+                   oldest_open_time: Optional[int] = None) -> None:
+        """
+        write/overwrite klines, the newest kline may be a partial one and is overwritten on the next update
+
+        :param exchange: "BTCUSDT", ...
+        :param interval: "1h", "1d", ...
+        :param klines: [(open_time, close), ...]
+        :param oldest_open_time: delete the klines opened before it, None to keep all
+        """
+        rows = [{"exchange": exchange, "interval": interval, "open_time": open_time, "close": close}
+                for open_time, close in klines]
+        with database_cache.atomic("EXCLUSIVE"):
+            with cls.db_lock:
+                for start in range(0, len(rows), StockBarDBUtils.CHUNK_SIZE):
+                    ExchangeKline.replace_many(rows[start:start + StockBarDBUtils.CHUNK_SIZE]).execute()
+                if oldest_open_time is not None:
+                    ExchangeKline.delete().where((ExchangeKline.exchange == exchange) &
+                                                 (ExchangeKline.interval == interval) &
+                                                 (ExchangeKline.open_time < oldest_open_time)).execute()
+
+    @classmethod
+    def clear(cls, interval: Optional[str] = None) -> None:
+        """
+        delete all klines or the ones of <interval>
+
+        :param interval: "1h", "1d", ...
+        """
+        with database_cache.atomic("EXCLUSIVE"):
+            with cls.db_lock:
+                query = ExchangeKline.delete()
+                if interval:
+                    query = query.where(ExchangeKline.interval == interval)
+                query.execute()
+
+
+# -------------- coingecko chart store ----------------
+class CoinChartDBUtils:
+    db_lock = RLock()
+
+    @classmethod
+    def get_time_range(cls, coin_id: str, granularity: str) -> Tuple[Optional[int], Optional[int]]:
+        """
+        get the timestamp of the oldest and the newest stored point
+
+        :param coin_id: coingecko coin id
+        :param granularity: "hourly" or "daily"
+
+        :return: (<oldest timestamp>, <newest timestamp>) in ms, (None, None) without points
+        """
+        with database_cache.atomic():
+            row = CoinChartPoint.select(fn.MIN(CoinChartPoint.timestamp).alias("oldest"),
+                                        fn.MAX(CoinChartPoint.timestamp).alias("newest")) \
+                .where((CoinChartPoint.coin_id == coin_id) & (CoinChartPoint.granularity == granularity)) \
+                .dicts().get()
+        return row["oldest"], row["newest"]
+
+    @classmethod
+    def get_points(cls, coin_id: str, granularity: str, start_time: int = 0) -> List[Tuple[int, float, float]]:
+        """
+        get the stored points from <start_time>
+
+        :param coin_id: coingecko coin id
+        :param granularity: "hourly" or "daily"
+        :param start_time: timestamp in ms
+
+        :return: [(timestamp, price, volume), ...], with the newest point first
+        """
+        with database_cache.atomic():
+            return list(CoinChartPoint.select(CoinChartPoint.timestamp, CoinChartPoint.price, CoinChartPoint.volume)
+                        .where((CoinChartPoint.coin_id == coin_id) & (CoinChartPoint.granularity == granularity) &
+                               (CoinChartPoint.timestamp >= start_time))
+                        .order_by(CoinChartPoint.timestamp.desc()).tuples())
+
+    @classmethod
+    def replace_points(cls, coin_id: str, granularity: str, points: List[Tuple[int, float, float]],
+                       replace_from: int, oldest_timestamp: Optional[int] = None) -> None:
+        """
+        replace the stored points from <replace_from> with <points>,
+        the newest point of a chart is the live price and is replaced on the next update
+
+        :param coin_id: coingecko coin id
+        :param granularity: "hourly" or "daily"
+        :param points: [(timestamp, price, volume), ...]
+        :param replace_from: timestamp in ms
+        :param oldest_timestamp: delete the points before it, None to keep all
+        """
+        rows = [{"coin_id": coin_id, "granularity": granularity, "timestamp": timestamp,
+                 "price": price, "volume": volume} for timestamp, price, volume in points]
+        condition = (CoinChartPoint.coin_id == coin_id) & (CoinChartPoint.granularity == granularity)
+        with database_cache.atomic("EXCLUSIVE"):
+            with cls.db_lock:
+                CoinChartPoint.delete().where(condition & (CoinChartPoint.timestamp >= replace_from)).execute()
+                for start in range(0, len(rows), StockBarDBUtils.CHUNK_SIZE):
+                    CoinChartPoint.replace_many(rows[start:start + StockBarDBUtils.CHUNK_SIZE]).execute()
+                if oldest_timestamp is not None:
+                    CoinChartPoint.delete().where(condition & (CoinChartPoint.timestamp < oldest_timestamp)).execute()
+
+    @classmethod
+    def clear(cls, granularity: Optional[str] = None) -> None:
+        """
+        delete all points or the ones of <granularity>
+
+        :param granularity: "hourly" or "daily"
+        """
+        with database_cache.atomic("EXCLUSIVE"):
+            with cls.db_lock:
+                query = CoinChartPoint.delete()
+                if granularity:
+                    query = query.where(CoinChartPoint.granularity == granularity)
+                query.execute()
+
+
+# -------------- reference data ----------------
+class ReferenceDataDBUtils:
+    db_lock = RLock()
+
+    @staticmethod
+    def get_data(name: str) -> Optional[Tuple[str, float]]:
+        """
+        get the stored dataset <name>
+
+        :param name: dataset name
+
+        :return: (<json data>, <timestamp of the update>), None if not stored
+        """
+        with database_cache.atomic():
+            res = ReferenceData.select(ReferenceData.data, ReferenceData.date) \
+                .where(ReferenceData.name == name).tuples()
+            return res[0] if res else None
+
+    @classmethod
+    def set_data(cls, name: str, data: str) -> None:
+        """
+        write/overwrite the dataset <name>
+
+        :param name: dataset name
+        :param data: json data
+        """
+        with database_cache.atomic("EXCLUSIVE"):
+            with cls.db_lock:
+                ReferenceData.replace(name=name, data=data, date=time.time()).execute()
+
+    @classmethod
+    def clear(cls, name: Optional[str] = None) -> None:
+        """
+        delete all the datasets or the one of <name>
+
+        :param name: dataset name
+        """
+        with database_cache.atomic("EXCLUSIVE"):
+            with cls.db_lock:
+                query = ReferenceData.delete()
+                if name:
+                    query = query.where(ReferenceData.name == name)
+                query.execute()
+
+
+# -------------- coin listing metadata ----------------
+class CoinListingDBUtils:
+    db_lock = RLock()
+
+    @staticmethod
+    def get_listings() -> Dict[str, Dict[str, Union[str, float, None]]]:
+        """
+        get the listing metadata of all the stored coins
+
+        :return: {coin_id: {"atl_date": .., "ath_date": .., "genesis_date": .., "date": ..}}
+        """
+        with database_cache.atomic():
+            return {row.pop("coin_id"): row for row in CoinListing.select().dicts()}
+
+    @classmethod
+    def update_market_dates(cls, market_dates: Dict[str, Tuple[str, str]]) -> None:
+        """
+        write/overwrite the atl and ath dates of the coins, the genesis dates are kept
+
+        :param market_dates: {coin_id: (atl_date, ath_date)}
+        """
+        now = time.time()
+        rows = [{"coin_id": coin_id, "atl_date": atl_date, "ath_date": ath_date, "date": now}
+                for coin_id, (atl_date, ath_date) in market_dates.items()]
+        with database_cache.atomic("EXCLUSIVE"):
+            with cls.db_lock:
+                for start in range(0, len(rows), StockBarDBUtils.CHUNK_SIZE):
+                    CoinListing.insert_many(rows[start:start + StockBarDBUtils.CHUNK_SIZE]) \
+                        .on_conflict(conflict_target=[CoinListing.coin_id],
+                                     preserve=[CoinListing.atl_date, CoinListing.ath_date, CoinListing.date]) \
+                        .execute()
+
+    @classmethod
+    def update_genesis_dates(cls, genesis_dates: Dict[str, str]) -> None:
+        """
+        write/overwrite the genesis dates of the coins, the atl and ath dates are kept
+
+        :param genesis_dates: {coin_id: genesis_date}, empty genesis_date if coingecko has none
+        """
+        rows = [{"coin_id": coin_id, "genesis_date": genesis_date, "date": 0}
+                for coin_id, genesis_date in genesis_dates.items()]
+        with database_cache.atomic("EXCLUSIVE"):
+            with cls.db_lock:
+                for start in range(0, len(rows), StockBarDBUtils.CHUNK_SIZE):
+                    CoinListing.insert_many(rows[start:start + StockBarDBUtils.CHUNK_SIZE]) \
+                        .on_conflict(conflict_target=[CoinListing.coin_id], preserve=[CoinListing.genesis_date]) \
+                        .execute()
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        delete all the listing metadata
+        """
+        with database_cache.atomic("EXCLUSIVE"):
+            with cls.db_lock:
+                CoinListing.delete().execute()
+
+
+# -------------- coin daily volume history ----------------
+class CoinVolumeDBUtils:
+    db_lock = RLock()
+
+    @staticmethod
+    def get_volumes(coin_ids: List[str], start_date: str) -> Dict[str, Dict[str, float]]:
+        """
+        get the stored daily volumes of <coin_ids> since <start_date>
+
+        :param coin_ids: [coin_id, ...]
+        :param start_date: UTC "%Y-%m-%d"
+
+        :return: {coin_id: {date: volume}}
+        """
+        res = defaultdict(dict)
+        with database_cache.atomic():
+            for start in range(0, len(coin_ids), StockBarDBUtils.CHUNK_SIZE):
+                for coin_id, date, volume in CoinDailyVolume \
+                        .select(CoinDailyVolume.coin_id, CoinDailyVolume.date, CoinDailyVolume.volume) \
+                        .where(CoinDailyVolume.coin_id.in_(coin_ids[start:start + StockBarDBUtils.CHUNK_SIZE]) &
+                               (CoinDailyVolume.date >= start_date)).tuples():
+                    res[coin_id][date] = volume
+        return dict(res)
+
+    @classmethod
+    def add_volumes(cls, volumes: Dict[str, Dict[str, float]], oldest_date: Optional[str] = None,
+                    overwrite: bool = True) -> None:
+        """
+        write/overwrite daily volumes
+
+        :param volumes: {coin_id: {date: volume}}
+        :param oldest_date: delete the volumes before it, None to keep all
+        :param overwrite: False to keep the volumes already stored
+        """
+        rows = [{"coin_id": coin_id, "date": date, "volume": volume}
+                for coin_id, coin_volumes in volumes.items() for date, volume in coin_volumes.items()]
+        with database_cache.atomic("EXCLUSIVE"):
+            with cls.db_lock:
+                for start in range(0, len(rows), StockBarDBUtils.CHUNK_SIZE):
+                    if overwrite:
+                        CoinDailyVolume.replace_many(rows[start:start + StockBarDBUtils.CHUNK_SIZE]).execute()
+                    else:
+                        CoinDailyVolume.insert_many(rows[start:start + StockBarDBUtils.CHUNK_SIZE]) \
+                            .on_conflict_ignore().execute()
+                if oldest_date is not None:
+                    CoinDailyVolume.delete().where(CoinDailyVolume.date < oldest_date).execute()
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        delete all the daily volumes
+        """
+        with database_cache.atomic("EXCLUSIVE"):
+            with cls.db_lock:
+                CoinDailyVolume.delete().execute()
@@ -0,0 +1,6 @@
+from .rate_limiter import RateLimiter, RateLimitedHTTPAdapter
+from .http_session import HttpSessionPool
+from .response_cache import ResponseCache
+from .async_fetcher import AsyncBatchFetcher
+from .request_coalescer import RequestCoalescer
+from .json_stream import iter_json_array
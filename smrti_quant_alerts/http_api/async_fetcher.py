@@ -0,0 +1,121 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Hashable, Optional
+
+from smrti_quant_alerts.exception import error_handling
+from smrti_quant_alerts.settings import Config
+from smrti_quant_alerts.http_api.http_session import HttpSessionPool
+from smrti_quant_alerts.http_api.response_cache import ResponseCache
+
+
+class AsyncBatchFetcher:
+    """
+    asyncio batch fetch engine for per-symbol endpoints.
+
+    A batch of urls is scheduled on the event loop at once, each request runs on the
+    keep-alive session of HttpSessionPool. The number of requests in flight is capped
+    per provider process-wide, by "providers.<provider>.max_in_flight" in configs.json.
+    fetch_json is the synchronous facade, async_fetch_json can be awaited inside a running loop.
+    Responses of the endpoints cached by ResponseCache are served from disk until they expire.
+    """
+    DEFAULT_MAX_IN_FLIGHT = 8
+    TIMEOUT = 50
+
+    _executors: Dict[str, ThreadPoolExecutor] = {}
+    _executors_lock = threading.Lock()
+
+    @staticmethod
+    def get_max_in_flight(provider: str) -> int:
+        """
+        get the max number of requests in flight for the provider
+
+        :param provider: provider name, e.g. "fmp"
+        :return: max number of requests in flight
+        """
+        provider_settings = Config.PROVIDER_SETTINGS.get(provider, {})
+        return max(int(provider_settings.get("max_in_flight", AsyncBatchFetcher.DEFAULT_MAX_IN_FLIGHT)), 1)
+
+    @classmethod
+    def _get_executor(cls, provider: str) -> ThreadPoolExecutor:
+        """
+        get the shared executor of the provider, its size is the in-flight cap of the provider
+
+        :param provider: provider name
+        :return: ThreadPoolExecutor
+        """
+        executor = cls._executors.get(provider)
+        if executor is None:
+            with cls._executors_lock:
+                executor = cls._executors.get(provider)
+                if executor is None:
+                    executor = ThreadPoolExecutor(max_workers=cls.get_max_in_flight(provider),
+                                                  thread_name_prefix=f"{provider}_fetcher")
+                    cls._executors[provider] = executor
+        return executor
+
+    @staticmethod
+    def _fetch_json(url: str, provider: str, timeout: int) -> Optional[Any]:
+        """
+        fetch one url from the response cache or the provider, retry on failure
+
+        :param url: url
+        :param provider: provider name
+        :param timeout: request timeout in seconds
+        :return: json response, None if all retries failed
+        """
+        response = ResponseCache.get(url)
+        if response is not None:
+            return response
+
+        @error_handling(provider, default_val=None)
+        def fetch() -> Any:
+            return HttpSessionPool.get(url, timeout=timeout).json()
+
+        response = fetch()
+        ResponseCache.set(url, response)
+        return response
+
+    @classmethod
+    async def async_fetch_json(cls, urls: Dict[Hashable, str], provider: str,
+                               timeout: int = TIMEOUT) -> Dict[Hashable, Optional[Any]]:
+        """
+        fetch all the urls concurrently
+
+        :param urls: {key: url}, key is usually StockSymbol
+        :param provider: provider name, e.g. "fmp"
+        :param timeout: request timeout in seconds
+        :return: {key: json response or None}
+        """
+        loop = asyncio.get_running_loop()
+        executor = cls._get_executor(provider)
+        keys = list(urls.keys())
+        responses = await asyncio.gather(
+            *[loop.run_in_executor(executor, cls._fetch_json, urls[key], provider, timeout) for key in keys]
+        )
+        return dict(zip(keys, responses))
+
+    @classmethod
+    def fetch_json(cls, urls: Dict[Hashable, str], provider: str,
+                   timeout: int = TIMEOUT) -> Dict[Hashable, Optional[Any]]:
+        """
+        synchronous facade of async_fetch_json
+
+        :param urls: {key: url}
+        :param provider: provider name
+        :param timeout: request timeout in seconds
+        :return: {key: json response or None}
+        """
+        if not urls:
+            return {}
+        return asyncio.run(cls.async_fetch_json(urls, provider, timeout))
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """
+        shutdown all the executors, they are re-created on the next fetch
+        """
+        with cls._executors_lock:
+            for executor in cls._executors.values():
+                executor.shutdown(wait=True)
+            cls._executors = {}
@@ -0,0 +1,111 @@
+import threading
+from typing import Dict, Any
+from urllib.parse import urlsplit
+
+import requests
+
+from smrti_quant_alerts.http_api.rate_limiter import RateLimiter, RateLimitedHTTPAdapter
+
+
+class HttpSessionPool:
+    """
+    Process wide keep-alive http sessions, one requests.Session per provider host.
+
+    All raw http calls (FMP, EODHD, telegram, ...) should go through HttpSessionPool.get/post,
+    so that the TCP + TLS handshake is paid once per connection instead of once per request.
+    requests.Session is shared by all threads, connections are kept in the urllib3 pool of the session.
+    Requests to a known provider host are throttled by the RateLimiter bucket of the provider.
+    """
+    # the stock screener runs up to 8 filters concurrently, each with ThreadPool(8)
+    POOL_MAXSIZE = 64
+
+    _sessions: Dict[str, requests.Session] = {}
+    _sessions_lock = threading.Lock()
+
+    @staticmethod
+    def _get_host(url: str) -> str:
+        """
+        get host of the url
+
+        :param url: url
+        :return: host, e.g. "financialmodelingprep.com"
+        """
+        return urlsplit(url).netloc.lower()
+
+    @classmethod
+    def get_session(cls, url: str) -> requests.Session:
+        """
+        get the shared session for the host of <url>, create one if not exists
+
+        :param url: url or host
+        :return: requests.Session
+        """
+        host = cls._get_host(url) if "://" in url else url.lower()
+        session = cls._sessions.get(host)
+        if session is None:
+            with cls._sessions_lock:
+                session = cls._sessions.get(host)
+                if session is None:
+                    session = requests.Session()
+                    adapter = RateLimitedHTTPAdapter(RateLimiter.get_provider(host),
+                                                     pool_connections=1, pool_maxsize=cls.POOL_MAXSIZE)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    cls._sessions[host] = session
+        return session
+
+    @classmethod
+    def get(cls, url: str, **kwargs: Any) -> requests.Response:
+        """
+        http GET through the shared session of the host
+
+        :param url: url
+        :param kwargs: keyword arguments of requests.get
+        :return: requests.Response
+        """
+        return cls.get_session(url).get(url, **kwargs)
+
+    @classmethod
+    def post(cls, url: str, **kwargs: Any) -> requests.Response:
+        """
+        http POST through the shared session of the host
+
+        :param url: url
+        :param kwargs: keyword arguments of requests.post
+        :return: requests.Response
+        """
+        return cls.get_session(url).post(url, **kwargs)
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Dict[str, int]]:
+        """
+        get connection reuse stats of all the sessions
+
+        :return: {host: {"requests": <num of requests>, "connections": <num of new connections>,
+                         "reused": <num of requests on reused connections>}}
+        """
+        stats = {}
+        with cls._sessions_lock:
+            sessions = list(cls._sessions.items())
+        for host, session in sessions:
+            num_requests, num_connections = 0, 0
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is not None:
+                        num_requests += pool.num_requests
+                        num_connections += pool.num_connections
+            stats[host] = {"requests": num_requests, "connections": num_connections,
+                           "reused": max(num_requests - num_connections, 0)}
+        return stats
+
+    @classmethod
+    def close_all(cls) -> None:
+        """
+        close all the sessions and drop the kept-alive connections
+        """
+        with cls._sessions_lock:
+            for session in cls._sessions.values():
+                session.close()
+            cls._sessions = {}
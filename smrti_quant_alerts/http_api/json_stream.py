@@ -0,0 +1,47 @@
+import re
+import json
+import codecs
+from typing import Iterable, Iterator, Union, Any
+
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+def iter_json_array(chunks: Iterable[Union[bytes, str]]) -> Iterator[Any]:
+    """
+    incrementally parse a top level json array read in chunks, e.g. requests.Response.iter_content,
+    and yield each item as soon as it is complete, the full payload is never held in memory
+
+    :param chunks: utf-8 bytes or str chunks of the json array
+
+    :return: iterator of the array items
+    """
+    decoder = json.JSONDecoder()
+    utf8_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer, pos = "", 0
+    in_array = False
+    for chunk in chunks:
+        buffer = buffer[pos:] + (utf8_decoder.decode(chunk) if isinstance(chunk, bytes) else chunk)
+        pos = 0
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if pos >= len(buffer):
+                break
+            if not in_array:
+                if buffer[pos] != "[":
+                    raise ValueError(f"expected a json array, got: {buffer[pos:pos + 100]}")
+                in_array = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # incomplete item, wait for the next chunk
+                break
+            # a valid array always has "," or "]" after an item, a number at the end may be cut off
+            if end >= len(buffer):
+                break
+            yield item
+            pos = end
+    raise ValueError("incomplete json array")
@@ -0,0 +1,160 @@
+import time
+import threading
+from typing import Dict, Optional, Any
+from urllib.parse import urlsplit
+
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+
+from smrti_quant_alerts.settings import Config
+
+
+class TokenBucket:
+    """
+    thread safe token bucket, refilled continuously at <rate_per_minute>, holds at most <burst> tokens
+    """
+    def __init__(self, rate_per_minute: float, burst: int = 1) -> None:
+        self._rate = rate_per_minute / 60
+        self._capacity = max(burst, 1)
+        self._tokens = float(self._capacity)
+        self._last_refill_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 1) -> float:
+        """
+        take <tokens> tokens, block until they are available.
+        tokens are reserved under the lock, so the waiting callers are served in order
+
+        :param tokens: number of tokens
+        :return: seconds waited
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._last_refill_time) * self._rate)
+            self._last_refill_time = now
+            self._tokens -= tokens
+            wait_time = -self._tokens / self._rate if self._tokens < 0 else 0
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return wait_time
+
+
+class RateLimiter:
+    """
+    Process wide token bucket rate limiter, one bucket per provider shared by all threads,
+    and one bucket per "<provider>:<key>" for the limits scoped to a key, e.g. "telegram:<chat_id>".
+
+    Limits default to DEFAULT_LIMITS and KEYED_LIMITS, and can be overridden per plan by
+    "providers.<provider>.rate_per_minute" and "providers.<provider>.burst" in configs.json,
+    the keyed ones by "providers.<provider>.per_key.rate_per_minute" and "providers.<provider>.per_key.burst".
+    """
+    DEFAULT_LIMITS = {
+        "binance": {"rate_per_minute": 1200, "burst": 20},
+        # coingecko Analyst plan
+        "coingecko": {"rate_per_minute": 500, "burst": 10},
+        # financialmodelingprep Starter plan
+        "fmp": {"rate_per_minute": 300, "burst": 10},
+        "eodhd": {"rate_per_minute": 1000, "burst": 10},
+        # 30 messages per second overall
+        "telegram": {"rate_per_minute": 1800, "burst": 30},
+        "openai": {"rate_per_minute": 20, "burst": 1},
+    }
+    KEYED_LIMITS = {
+        # 20 messages per minute per group
+        "telegram": {"rate_per_minute": 20, "burst": 1},
+    }
+    PROVIDER_HOSTS = {
+        "api.binance.com": "binance",
+        "fapi.binance.com": "binance",
+        "api.coingecko.com": "coingecko",
+        "pro-api.coingecko.com": "coingecko",
+        "financialmodelingprep.com": "fmp",
+        "eodhd.com": "eodhd",
+        "api.telegram.org": "telegram",
+        "api.openai.com": "openai",
+    }
+
+    _buckets: Dict[str, TokenBucket] = {}
+    _buckets_lock = threading.Lock()
+
+    @classmethod
+    def get_provider(cls, url: str) -> Optional[str]:
+        """
+        get the provider of the url
+
+        :param url: url or host
+        :return: provider name, None if the host is not a known provider
+        """
+        host = urlsplit(url).netloc if "://" in url else url
+        return cls.PROVIDER_HOSTS.get(host.lower().split(":")[0])
+
+    @classmethod
+    def get_limits(cls, provider: str) -> Dict[str, Any]:
+        """
+        get the rate limits of the provider, configs.json overrides the defaults
+
+        :param provider: provider name, or "<provider>:<key>" for the limits scoped to a key
+        :return: {"rate_per_minute": <rate_per_minute>, "burst": <burst>}
+        """
+        provider, keyed, _ = provider.partition(":")
+        default_limits = cls.KEYED_LIMITS if keyed else cls.DEFAULT_LIMITS
+        limits = dict(default_limits.get(provider, {"rate_per_minute": 60, "burst": 1}))
+        provider_settings = Config.PROVIDER_SETTINGS.get(provider, {})
+        if keyed:
+            provider_settings = provider_settings.get("per_key", {})
+        for key in ["rate_per_minute", "burst"]:
+            if key in provider_settings:
+                limits[key] = provider_settings[key]
+        return limits
+
+    @classmethod
+    def get_bucket(cls, provider: str) -> TokenBucket:
+        """
+        get the shared bucket of the provider, create one if not exists
+
+        :param provider: provider name, or "<provider>:<key>"
+        :return: TokenBucket
+        """
+        bucket = cls._buckets.get(provider)
+        if bucket is None:
+            with cls._buckets_lock:
+                bucket = cls._buckets.get(provider)
+                if bucket is None:
+                    bucket = TokenBucket(**cls.get_limits(provider))
+                    cls._buckets[provider] = bucket
+        return bucket
+
+    @classmethod
+    def acquire(cls, provider: str, tokens: int = 1) -> float:
+        """
+        block until the provider allows another <tokens> requests
+
+        :param provider: provider name, e.g. "coingecko", or "<provider>:<key>", e.g. "telegram:<chat_id>"
+        :param tokens: number of requests
+        :return: seconds waited
+        """
+        return cls.get_bucket(provider).acquire(tokens)
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        drop all the buckets, they are re-created with the current configs on the next acquire
+        """
+        with cls._buckets_lock:
+            cls._buckets = {}
+
+
+class RateLimitedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that acquires the RateLimiter bucket of the provider before sending each request,
+    mount it on the requests.Session of sdk clients (pycoingecko, binance-connector)
+    """
+    def __init__(self, provider: Optional[str] = None, **kwargs: Any) -> None:
+        self._provider = provider
+        super().__init__(**kwargs)
+
+    def send(self, request: PreparedRequest, **kwargs: Any) -> Response:
+        provider = self._provider or RateLimiter.get_provider(request.url)
+        if provider:
+            RateLimiter.acquire(provider)
+        return super().send(request, **kwargs)
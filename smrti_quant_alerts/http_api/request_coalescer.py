@@ -0,0 +1,63 @@
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Hashable, Iterable, Callable, List, Tuple, Optional
+
+
+class RequestCoalescer:
+    """
+    Coalesce overlapping fetches of the same keys within a run.
+
+    Each key is fetched once with the widest window asked for so far (e.g. the "limit" of a statement endpoint),
+    callers asking for a narrower window get the same result and derive their view from it.
+    Callers asking for keys that are being fetched by another thread wait for that fetch instead of
+    issuing their own. Failed fetches (None) are not kept, so the next caller retries them.
+    """
+    def __init__(self) -> None:
+        self._entries: Dict[Hashable, Tuple[int, Future]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, keys: Iterable[Hashable], window: int,
+            fetch: Callable[[List[Hashable], int], Dict[Hashable, Optional[Any]]]) -> Dict[Hashable, Optional[Any]]:
+        """
+        get the results of <keys>, fetch the ones not fetched yet with at least <window>
+
+        :param keys: keys to get, e.g. [StockSymbol, ...]
+        :param window: window needed by the caller
+        :param fetch: function fetching (keys, window) -> {key: result or None}
+
+        :return: {key: result or None}
+        """
+        futures, futures_to_fetch = {}, {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None or entry[0] < window:
+                    entry = (window, Future())
+                    self._entries[key] = entry
+                    futures_to_fetch[key] = entry[1]
+                futures[key] = entry[1]
+
+        if futures_to_fetch:
+            results = {}
+            try:
+                results = fetch(list(futures_to_fetch.keys()), window)
+            except Exception as e:
+                logging.error(f"coalesced fetch error: {e}")
+            finally:
+                with self._lock:
+                    for key, future in futures_to_fetch.items():
+                        entry = self._entries.get(key)
+                        if results.get(key) is None and entry and entry[1] is future:
+                            del self._entries[key]
+                for key, future in futures_to_fetch.items():
+                    future.set_result(results.get(key))
+
+        return {key: future.result() for key, future in futures.items()}
+
+    def clear(self) -> None:
+        """
+        drop all the results, e.g. at the start of a new run
+        """
+        with self._lock:
+            self._entries = {}
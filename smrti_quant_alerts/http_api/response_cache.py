@@ -0,0 +1,128 @@
+import json
+import logging
+import threading
+from typing import Optional, Any, Dict
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+from smrti_quant_alerts.settings import Config
+from smrti_quant_alerts.db import init_database_cache, is_database_cache_initialized, ResponseCacheDBUtils
+
+
+class ResponseCache:
+    """
+    Persistent on-disk cache of slowly changing api responses, in runtime_database/cache.db.
+
+    Only the endpoints in DEFAULT_TTLS are cached, each with its own time to live in hours,
+    overridable by "providers.fmp.cache_ttls" in configs.json. Api keys are stripped from the cache keys.
+    Once the cached responses exceed MAX_SIZE bytes, the oldest ones are evicted.
+    """
+    # financial statements and estimates change at most quarterly, refresh often enough to catch new filings
+    DEFAULT_TTLS = {
+        "income-statement": 72,
+        "cash-flow-statement": 72,
+        "balance-sheet-statement": 72,
+        "analyst-estimates": 24,
+    }
+    MAX_SIZE = 512 * 1024 * 1024
+    # check the total size every <EVICT_INTERVAL> writes
+    EVICT_INTERVAL = 500
+    SECRET_PARAMS = {"apikey", "api_token"}
+
+    _num_of_writes = 0
+    _init_lock = threading.Lock()
+    _write_count_lock = threading.Lock()
+
+    @classmethod
+    def _init_database(cls) -> None:
+        if not is_database_cache_initialized():
+            with cls._init_lock:
+                if not is_database_cache_initialized():
+                    init_database_cache()
+                    ResponseCacheDBUtils.evict(cls.MAX_SIZE)
+
+    @classmethod
+    def get_ttls(cls) -> Dict[str, float]:
+        """
+        get the time to live of the cached endpoints in hours
+
+        :return: {endpoint: <ttl in hours>}
+        """
+        return {**cls.DEFAULT_TTLS, **Config.PROVIDER_SETTINGS.get("fmp", {}).get("cache_ttls", {})}
+
+    @classmethod
+    def get_endpoint(cls, url: str) -> Optional[str]:
+        """
+        get the cached endpoint of the url
+
+        :param url: url
+        :return: endpoint name, e.g. "income-statement", None if the url is not cached
+        """
+        ttls = cls.get_ttls()
+        for segment in urlsplit(url).path.split("/"):
+            if segment in ttls:
+                return segment if ttls[segment] > 0 else None
+        return None
+
+    @classmethod
+    def get_key(cls, url: str) -> str:
+        """
+        get the cache key of the url, without api keys
+
+        :param url: url
+        :return: cache key
+        """
+        split_url = urlsplit(url)
+        params = sorted((k, v) for k, v in parse_qsl(split_url.query) if k.lower() not in cls.SECRET_PARAMS)
+        return f"{split_url.netloc}{split_url.path}?{urlencode(params)}"
+
+    @classmethod
+    def get(cls, url: str) -> Optional[Any]:
+        """
+        get the cached json response of the url
+
+        :param url: url
+        :return: json response, None if the url is not cached, not in cache or expired
+        """
+        endpoint = cls.get_endpoint(url)
+        if not endpoint:
+            return None
+        try:
+            cls._init_database()
+            response = ResponseCacheDBUtils.get_response(cls.get_key(url), cls.get_ttls()[endpoint] * 3600)
+            return json.loads(response) if response is not None else None
+        except Exception as e:
+            logging.error(f"response cache read error: {e}")
+            return None
+
+    @classmethod
+    def set(cls, url: str, response: Any) -> None:
+        """
+        cache the json response of the url, only non-empty list responses of the cached endpoints are cached,
+        FMP returns an empty list or an error dict otherwise
+
+        :param url: url
+        :param response: json response
+        """
+        endpoint = cls.get_endpoint(url)
+        if not endpoint or not response or not isinstance(response, list):
+            return
+        try:
+            cls._init_database()
+            ResponseCacheDBUtils.set_response(cls.get_key(url), endpoint, json.dumps(response))
+            with cls._write_count_lock:
+                cls._num_of_writes += 1
+                need_evict = cls._num_of_writes % cls.EVICT_INTERVAL == 0
+            if need_evict:
+                ResponseCacheDBUtils.evict(cls.MAX_SIZE)
+        except Exception as e:
+            logging.error(f"response cache write error: {e}")
+
+    @classmethod
+    def clear(cls, endpoint: Optional[str] = None) -> None:
+        """
+        clear all the cached responses or the ones of <endpoint>
+
+        :param endpoint: endpoint name
+        """
+        cls._init_database()
+        ResponseCacheDBUtils.clear(endpoint)
@@ -1,22 +1,23 @@
 import os
 import re
 import logging
+import threading
 from typing import Tuple, List, Union
-from time import time, sleep
 from datetime import datetime
 
 from openai import OpenAI
 
 from smrti_quant_alerts.settings import Config
 from smrti_quant_alerts.exception import error_handling
+from smrti_quant_alerts.http_api import RateLimiter
 from smrti_quant_alerts.data_type import StockSymbol
 
 
 class LLMAPI:
-    _rate_limit_per_minute = 20
-    _last_request_time = 0
-    _current_count = 0
     _default_source = "OPENAI"
+    # one OpenAI client per api key, shared by all instances to reuse its keep-alive connections
+    _clients = {}
+    _clients_lock = threading.Lock()
 
     def __init__(self) -> None:
         config = Config()
@@ -30,7 +31,20 @@ class LLMAPI:
             logging.warning("No OpenAI API key found in tokens.json or environment variables")
         
         self._model = "gpt-4.1"
-        self._client = OpenAI(api_key=self._api_key) if self._api_key else None
+        self._client = self._get_shared_client(self._api_key) if self._api_key else None
+
+    @classmethod
+    def _get_shared_client(cls, api_key: str) -> OpenAI:
+        """
+        get the process wide OpenAI client for the api key, create one if not exists
+
+        :param api_key: api key
+        :return: OpenAI client
+        """
+        with cls._clients_lock:
+            if api_key not in cls._clients:
+                cls._clients[api_key] = OpenAI(api_key=api_key)
+            return cls._clients[api_key]
 
     @staticmethod
     def build_chat_message(system_message: str, user_message: str) -> list:
@@ -82,6 +96,7 @@ class LLMAPI:
         Returns:
             Tuple[str, str]: (response_content, citations)
         """
+        RateLimiter.acquire("openai")
         try:                        
             response = self._client.chat.completions.create(
                 model=self._model,
@@ -134,11 +149,6 @@ class LLMAPI:
         :param timeframe: timeframe list
         :return: stock increase reason
         """
-        if self._current_count % self._rate_limit_per_minute == 0:
-            sleep(max(60 - time() + self._last_request_time, 0))
-            self._last_request_time = time()
-            self._current_count = 0
-        self._current_count += 1
         timeframe = [timeframe] if isinstance(timeframe, str) else timeframe
         date_str = datetime.now().strftime("%Y-%m-%d")
 
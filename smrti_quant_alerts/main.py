@@ -38,7 +38,9 @@ def main():
     alert_type = configs.SETTINGS[alert_name]["alert_type"]
     alert_class = alert_type_to_alert_class[alert_type]
     configs.SETTINGS[alert_name]["alert_input_args"]["alert_name"] = alert_name
-    if alert_type == "price_volume":
+    # long-running websocket alerts are not scheduled
+    if alert_type == "price_volume" or \
+            alert_type == "funding_rate" and configs.SETTINGS[alert_name]["alert_input_args"].get("stream"):
         alert = alert_class(**configs.SETTINGS[alert_name]["alert_input_args"])
         alert.run()
     else:
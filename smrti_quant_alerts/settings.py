@@ -13,6 +13,8 @@ class Config:
     PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     TOKENS = None
     SETTINGS = None
+    # the "providers" section of configs.json, e.g. {"fmp": {"max_in_flight": 16}}
+    PROVIDER_SETTINGS = {}
     API_ENDPOINTS = {
         "FMP_API_URL": "https://financialmodelingprep.com/api",
         "EODHD_API_URL": "https://eodhd.com/api",
@@ -40,6 +42,7 @@ class Config:
         try:
             cls.TOKENS = json.load(open(os.path.join(cls.PROJECT_DIR, "token.json")))
             cls.SETTINGS = json.load(open(os.path.join(cls.PROJECT_DIR, "configs.json")))
+            cls.PROVIDER_SETTINGS = cls.SETTINGS.pop("providers", {})
         except json.decoder.JSONDecodeError:
             logging.error("token.json/configs.json is not a valid json file")
             exit(1)
@@ -209,4 +212,5 @@ class Config:
 
     def reload_settings(self) -> None:
         self.SETTINGS = json.load(open(os.path.join(self.PROJECT_DIR, "configs.json")))
+        Config.PROVIDER_SETTINGS = self.SETTINGS.pop("providers", {})
         self._validate_configs()
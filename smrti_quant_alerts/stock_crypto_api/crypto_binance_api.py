@@ -1,16 +1,19 @@
 import time
+import threading
 from decimal import Decimal
 from datetime import datetime
-from typing import List, Union, Set, Optional, Tuple
+from typing import List, Union, Set, Optional, Tuple, Dict, Any, Callable
 
 from binance.spot import Spot
 from binance.um_futures import UMFutures
 
 from smrti_quant_alerts.exception import error_handling
+from smrti_quant_alerts.http_api import RateLimitedHTTPAdapter
 from smrti_quant_alerts.settings import Config
 from smrti_quant_alerts.data_type import BinanceExchange, CoingeckoCoin, TradingSymbol
-from smrti_quant_alerts.stock_crypto_api.utility import read_exclude_coins_from_file, \
-    get_date_from_timestamp, get_datetime_now
+from smrti_quant_alerts.db import init_database_cache, is_database_cache_initialized, ExchangeKlineDBUtils
+from smrti_quant_alerts.stock_crypto_api.utility import get_date_from_timestamp, get_datetime_now
+from smrti_quant_alerts.stock_crypto_api.exclude_coin_index import ExcludeCoinIndex
 
 
 class BinanceApi:
@@ -21,12 +24,35 @@ class BinanceApi:
     active_exchanges_timestamp = 0
     active_binance_spot_exchanges_set = set()
 
+    # exchange lists reused by the exclude coin expansion, {exchange_type: (timestamp, [BinanceExchange, ...])}
+    EXCHANGE_LIST_TTL = 3600
+    _exchange_lists: Dict[str, Tuple[float, List[BinanceExchange]]] = {}
+
     # timeframe to days
     timeframe_to_days = {"1d": 1, "2d": 2, "3d": 3, "1w": 7, "2w": 14, "1m": 30}
 
+    # all spot tickers are fetched in one request and served from memory,
+    # refreshed once per alert run or when older than TICKER_SNAPSHOT_TTL seconds
+    TICKER_SNAPSHOT_TTL = 300
+    _ticker_snapshots: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+    _ticker_snapshot_lock = threading.Lock()
+
+    # klines are kept in the local kline store, only the klines since the newest stored one are fetched
+    KLINE_INTERVAL_MS = {"1m": 60 * 1000, "1h": 3600 * 1000, "1d": 86400 * 1000, "1w": 7 * 86400 * 1000,
+                         "1M": 31 * 86400 * 1000}
+    # max klines per request, also the number of klines kept per exchange and interval
+    KLINE_LIMIT = 1000
+    # {(exchange, interval): start time of the last full fetch}, for exchanges listed after the start time
+    _kline_history_start: Dict[Tuple[str, str], int] = {}
+
     def __init__(self) -> None:
         self._binance_spot_client = Spot()
         self._binance_futures_client = UMFutures()
+        # spot and futures requests share the process wide "binance" rate limit
+        for client in [self._binance_spot_client, self._binance_futures_client]:
+            client.session.mount("https://", RateLimitedHTTPAdapter("binance"))
+        if not is_database_cache_initialized():
+            init_database_cache()
 
     def _update_active_binance_spot_exchanges(self) -> None:
         """
@@ -53,32 +79,15 @@ class BinanceApi:
 
         :return: [BinanceExchange, ...]
         """
-        exclude_coins = set()
-        self.get_all_binance_exchanges(exchange_type="SPOT")
-        self.get_all_binance_exchanges(exchange_type="FUTURE")
+        exclude_coins = set(ExcludeCoinIndex.get_binance_excludes(self.get_recent_binance_exchanges("SPOT"),
+                                                                  self.get_recent_binance_exchanges("FUTURE")))
         # process exclude coins from class input
         if input_exclude_coins:
             for coin in input_exclude_coins:
                 if isinstance(coin, BinanceExchange):
                     exclude_coins.add(coin)
                 elif isinstance(coin, CoingeckoCoin):
-                    for quote in ["USDT", "FDUSD", "BTC", "ETH"]:
-                        binance_exchange = BinanceExchange.get_symbol_object(f"{coin.coin_symbol}{quote}")
-                        if binance_exchange:
-                            exclude_coins.add(binance_exchange)
-
-        # process exclude coins from stable coins and json file
-        exclude_coin_symbols = read_exclude_coins_from_file()
-
-        for coin in exclude_coin_symbols:
-            binance_exchange = BinanceExchange.get_symbol_object(coin)
-            if binance_exchange:
-                exclude_coins.add(binance_exchange)
-            else:
-                for quote in ["USDT", "FDUSD", "BTC", "ETH"]:
-                    binance_exchange = BinanceExchange.get_symbol_object(f"{coin}{quote}")
-                    if binance_exchange:
-                        exclude_coins.add(binance_exchange)
+                    exclude_coins.update(ExcludeCoinIndex.get_exchanges_by_base(coin.coin_symbol))
         return exclude_coins
 
     @error_handling("binance", default_val=[])
@@ -97,8 +106,29 @@ class BinanceApi:
         for exchange in response['symbols']:
             if exchange['status'] == 'TRADING':
                 binance_exchanges.append(BinanceExchange(exchange['baseAsset'], exchange['quoteAsset']))
+        if binance_exchanges:
+            BinanceApi._exchange_lists[exchange_type] = (time.time(), binance_exchanges)
         return binance_exchanges
 
+    def get_recent_binance_exchanges(self, exchange_type: str = "SPOT") -> List[BinanceExchange]:
+        """
+        Get all exchanges on binance, the list fetched within EXCHANGE_LIST_TTL seconds is reused
+
+        :param exchange_type: SPOT or FUTURE
+        :return: [BinanceExchange]
+        """
+        timestamp, binance_exchanges = self._exchange_lists.get(exchange_type, (0, []))
+        if time.time() - timestamp < self.EXCHANGE_LIST_TTL:
+            return binance_exchanges
+        return self.get_all_binance_exchanges(exchange_type)
+
+    @classmethod
+    def clear_exchange_lists(cls) -> None:
+        """
+        drop the reused exchange lists, the next get_recent_binance_exchanges fetches them again
+        """
+        cls._exchange_lists = {}
+
     @error_handling("binance", default_val=Decimal(0))
     def get_future_exchange_funding_rate(self, exchange: Optional[BinanceExchange]) -> Decimal:
         """
@@ -115,10 +145,96 @@ class BinanceApi:
             return Decimal(response["lastFundingRate"])
         return Decimal(0)
 
+    @error_handling("binance", default_val={})
+    def get_all_future_exchanges_funding_rate(self) -> Dict[BinanceExchange, Decimal]:
+        """
+        Get funding rate of all the future exchanges in one premium index request
+
+        :return: {BinanceExchange: funding_rate}, only the exchanges known from get_all_binance_exchanges("FUTURE")
+        """
+        return self.parse_funding_rates(self._binance_futures_client.mark_price())
+
+    @staticmethod
+    def parse_funding_rates(premium_indexes: List[Dict[str, Any]]) -> Dict[BinanceExchange, Decimal]:
+        """
+        parse premium indexes, from the premium index endpoint or the !markPrice@arr stream
+
+        :param premium_indexes: [{"symbol": "BTCUSDT", "lastFundingRate": "0.0001", ...}, ...]
+                                or [{"s": "BTCUSDT", "r": "0.0001", ...}, ...]
+
+        :return: {BinanceExchange: funding_rate}
+        """
+        funding_rates = {}
+        for premium_index in premium_indexes:
+            exchange = BinanceExchange.get_symbol_object(premium_index.get("symbol") or premium_index.get("s") or "")
+            funding_rate = premium_index.get("lastFundingRate") or premium_index.get("r")
+            if exchange and funding_rate:
+                funding_rates[exchange] = Decimal(funding_rate)
+        return funding_rates
+
+    def _get_ticker_snapshot(self, name: str, fetch: Callable[[], List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        get the ticker snapshot <name> of all the spot exchanges, fetch it if missing or expired
+
+        :param name: snapshot name, "price" or "24hr"
+        :param fetch: function requesting all the tickers
+
+        :return: {"BTCUSDT": ticker, ...}, empty if the request failed
+        """
+        timestamp, snapshot = self._ticker_snapshots.get(name, (0, {}))
+        if time.time() - timestamp < self.TICKER_SNAPSHOT_TTL:
+            return snapshot
+        with self._ticker_snapshot_lock:
+            timestamp, snapshot = self._ticker_snapshots.get(name, (0, {}))
+            if time.time() - timestamp < self.TICKER_SNAPSHOT_TTL:
+                return snapshot
+            snapshot = {ticker["symbol"]: ticker for ticker in fetch() if "symbol" in ticker}
+            if snapshot:
+                BinanceApi._ticker_snapshots[name] = (time.time(), snapshot)
+        return snapshot
+
+    @classmethod
+    def clear_ticker_snapshots(cls) -> None:
+        """
+        drop the ticker snapshots, the next lookup fetches all the tickers again, e.g. at the start of a run
+        """
+        with cls._ticker_snapshot_lock:
+            cls._ticker_snapshots = {}
+
+    @error_handling("binance", default_val=[])
+    def _get_all_spot_ticker_prices(self) -> List[Dict[str, Any]]:
+        return self._binance_spot_client.ticker_price()
+
+    @error_handling("binance", default_val=[])
+    def _get_all_spot_tickers_24hr(self) -> List[Dict[str, Any]]:
+        return self._binance_spot_client.ticker_24hr()
+
+    def get_all_spot_current_prices(self) -> Dict[str, Decimal]:
+        """
+        Get the current price of all the spot exchanges from the ticker snapshot
+
+        :return: {"BTCUSDT": price, ...}
+        """
+        return {symbol: Decimal(ticker.get("price", 0))
+                for symbol, ticker in self._get_ticker_snapshot("price", self._get_all_spot_ticker_prices).items()}
+
+    def get_exchange_24hr_ticker(self, binance_exchange: Optional[BinanceExchange]) -> Dict[str, Any]:
+        """
+        Get exchange 24hr ticker stats from the ticker snapshot
+
+        :param binance_exchange: BinanceExchange
+
+        :return: {"priceChangePercent": "1.0", "volume": "100", "quoteVolume": "100", ...}, empty if unknown
+        """
+        if not binance_exchange:
+            return {}
+        return self._get_ticker_snapshot("24hr", self._get_all_spot_tickers_24hr).get(binance_exchange.exchange, {})
+
     @error_handling("binance", default_val=Decimal(0))
     def get_exchange_current_price(self, binance_exchange: Optional[BinanceExchange]) -> Decimal:
         """
-        Get exchange current close price
+        Get exchange current close price, from the ticker snapshot,
+        exchanges missing from the snapshot are requested one by one
 
         :param binance_exchange: BinanceExchange
 
@@ -126,6 +242,9 @@ class BinanceApi:
         """
         if not binance_exchange:
             return Decimal(0)
+        ticker = self._get_ticker_snapshot("price", self._get_all_spot_ticker_prices).get(binance_exchange.exchange)
+        if ticker:
+            return Decimal(ticker.get("price", 0))
         response = self._binance_spot_client.ticker_price(symbol=binance_exchange.exchange)
 
         if isinstance(response, dict):
@@ -133,11 +252,49 @@ class BinanceApi:
         else:
             return Decimal(response[0].get("price", 0))
 
+    def update_exchange_klines(self, exchange: BinanceExchange, interval: str, start_time: int) -> None:
+        """
+        Update the local kline store incrementally. Without klines since <start_time>, the klines since
+        <start_time> are fetched, otherwise only the ones since the newest stored kline, which may have been a
+        partial one. The klines are requested KLINE_LIMIT at a time until the current one, e.g. for an exchange
+        not updated for a while. Klines older than KLINE_LIMIT intervals before the newest one are deleted.
+
+        :param exchange: BinanceExchange
+        :param interval: "1h", "1d", "1w" or "1M"
+        :param start_time: open time in ms of the oldest kline needed
+        """
+        interval_ms = self.KLINE_INTERVAL_MS[interval]
+        oldest, newest = ExchangeKlineDBUtils.get_open_time_range(exchange.exchange, interval)
+        history_start = self._kline_history_start.get((exchange.exchange, interval))
+        history_missing = oldest is None or oldest - interval_ms > start_time
+        if history_missing and (history_start is None or history_start > start_time):
+            fetch_start_time = start_time
+            BinanceApi._kline_history_start[(exchange.exchange, interval)] = start_time
+        elif newest is None or newest < start_time:
+            # all the stored klines are older than needed
+            fetch_start_time = start_time
+        else:
+            fetch_start_time = newest
+
+        now = int(time.time() * 1000)
+        while True:
+            limit = min(self.KLINE_LIMIT, (now - fetch_start_time) // interval_ms + 2)
+            response = self._binance_spot_client.klines(symbol=exchange, interval=interval,
+                                                        startTime=fetch_start_time, limit=limit)
+            klines = [(int(kline[0]), float(kline[4])) for kline in response]
+            if not klines:
+                break
+            ExchangeKlineDBUtils.add_klines(exchange.exchange, interval, klines,
+                                            klines[-1][0] - self.KLINE_LIMIT * interval_ms)
+            if len(klines) < limit or klines[-1][0] + interval_ms > now:
+                break
+            fetch_start_time = klines[-1][0] + interval_ms
+
     @error_handling("binance", default_val=[])
     def get_exchange_history_hourly_close_price(
             self, exchange: Optional[BinanceExchange], days: int = 10) -> List[Decimal]:
         """
-        Get exchange past close price for the history <days> days
+        Get exchange past close price for the history <days> days, from the local kline store
 
         :param exchange: BinanceExchange
         :param days: number of days to get
@@ -147,11 +304,10 @@ class BinanceApi:
         if not exchange:
             return []
         start_time = (int(time.time()) - days * 24 * 60 * 60) * 1000
-        response = self._binance_spot_client.klines(symbol=exchange, interval="1h",
-                                                    startTime=start_time, limit=1000)
+        self.update_exchange_klines(exchange, "1h", start_time)
 
-        prices = [Decimal(i[4]) for i in response][::-1]
-        return prices
+        klines = ExchangeKlineDBUtils.get_klines(exchange.exchange, "1h", start_time)
+        return [Decimal(str(close)) for _, close in klines]
 
     def get_all_spot_exchanges_in_usdt_fdusd_btc(self) -> List[BinanceExchange]:
         """
@@ -175,7 +331,7 @@ class BinanceApi:
     def get_exchange_close_prices_by_timeframe_num_of_ticks(self, exchange: BinanceExchange, timeframe: str,
                                                             num_of_tick: int = 10) -> List[Tuple[str, float]]:
         """
-        Get exchange past close price for the history <timeframe> number of ticks
+        Get exchange past close price for the history <timeframe> number of ticks, from the local kline store
 
         :param exchange: BinanceExchange
         :param timeframe: timeframe
@@ -190,11 +346,10 @@ class BinanceApi:
                       self.timeframe_to_days[timeframe] * (num_of_tick + 1) * 24 * 60 * 60) * 1000
         binance_timeframe = "1M" if timeframe == "1m" else f"1{timeframe[1]}"
 
-        response = self._binance_spot_client.klines(symbol=exchange, interval=binance_timeframe,
-                                                    startTime=start_time, limit=1000)
+        self.update_exchange_klines(exchange, binance_timeframe, start_time)
 
-        close_prices_in_days = [p for i, p in enumerate([(get_date_from_timestamp(i[0]), float(i[4]))
-                                for i in response][::-1])]
+        close_prices_in_days = [(get_date_from_timestamp(open_time), close) for open_time, close in
+                                ExchangeKlineDBUtils.get_klines(exchange.exchange, binance_timeframe, start_time)]
 
         if timeframe[-1] == "w":
             return [x for x in close_prices_in_days if datetime.strptime(x[0], "%Y-%m-%d").date().weekday() == 0]
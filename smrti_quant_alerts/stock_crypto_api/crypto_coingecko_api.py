@@ -1,22 +1,64 @@
-import time
 import math
+import time
+import datetime
+import threading
+from multiprocessing.pool import ThreadPool
+from collections import defaultdict
 from decimal import Decimal
-from typing import List, Dict, Set, Any, Union, Optional
+from typing import List, Dict, Set, Any, Union, Optional, Tuple
 
+import numpy as np
 from pycoingecko import CoinGeckoAPI
 
 from smrti_quant_alerts.exception import error_handling
+from smrti_quant_alerts.http_api import RateLimitedHTTPAdapter
 from smrti_quant_alerts.settings import Config
 from smrti_quant_alerts.data_type import CoingeckoCoin, TradingSymbol, BinanceExchange
-from smrti_quant_alerts.stock_crypto_api.utility import read_exclude_coins_from_file
+from smrti_quant_alerts.db import init_database_cache, is_database_cache_initialized, CoinChartDBUtils, \
+    CoinVolumeDBUtils
+from smrti_quant_alerts.stock_crypto_api.exclude_coin_index import ExcludeCoinIndex
+from smrti_quant_alerts.stock_crypto_api.reference_data_store import ReferenceDataStore
 
 
 class CoingeckoApi:
     COINGECKO_API_KEY = Config().TOKENS["COINGECKO_API_KEY"]
     PWD = Config.PROJECT_DIR
 
+    # price/volume charts are kept in the local chart store. The market_chart granularity is automatic,
+    # ranges of 2 to 90 days are hourly and longer ones daily, so each granularity is always filled
+    # with a range of at least its minimum days: {granularity: (seconds, min days, retention days)}
+    CHART_GRANULARITIES = {"hourly": (3600, 2, 90), "daily": (86400, 91, 3650)}
+    # charts with a newer point are served without request
+    CHART_MAX_AGE = 3600
+    # daily market_chart attributes served from the store: {attribute: index in the stored point}
+    CHART_STORE_ATTRIBUTES = {"prices": 1, "total_volumes": 2}
+    # {(coin_id, granularity): start time of the last full fill}, for coins listed after the start time
+    _chart_history_start: Dict[Tuple[str, str], int] = {}
+
+    # simple/price takes comma separated ids, the prices are kept in memory for CURRENT_PRICE_TTL seconds
+    PRICE_BATCH_SIZE = 250
+    CURRENT_PRICE_TTL = 300
+    # {coin_id: (timestamp, price)}
+    _current_prices: Dict[str, Tuple[float, Decimal]] = {}
+    _current_price_lock = threading.Lock()
+
+    # rolling history of the volumes of the UTC days, i.e. the 24h volumes at 00:00 UTC from the daily market
+    # charts, or the first 24h volume snapshot recorded with its window centered in the day
+    VOLUME_HISTORY_DAYS = 30
+    VOLUME_HISTORY_THREADS = 4
+    # the latest 24h volumes are only kept in memory for LATEST_VOLUME_TTL seconds
+    LATEST_VOLUME_TTL = 3600
+    # {coin_id: (timestamp, 24h volume)}
+    _latest_volumes: Dict[str, Tuple[float, float]] = {}
+    _latest_volume_lock = threading.Lock()
+
     def __init__(self) -> None:
         self._cg = CoinGeckoAPI(api_key=self.COINGECKO_API_KEY)
+        # keep the retry policy of pycoingecko, throttle by the process wide "coingecko" rate limit
+        max_retries = self._cg.session.get_adapter("https://").max_retries
+        self._cg.session.mount("https://", RateLimitedHTTPAdapter("coingecko", max_retries=max_retries))
+        if not is_database_cache_initialized():
+            init_database_cache()
 
     def get_exclude_coins(
             self, input_exclude_coins: Union[List[TradingSymbol], Set[TradingSymbol], None] = None) \
@@ -28,8 +70,7 @@ class CoingeckoApi:
 
         :return: [CoingeckoCoin, ...]
         """
-        exclude_coins = set()
-        self.get_all_coingecko_coins()
+        exclude_coins = set(ExcludeCoinIndex.get_coingecko_excludes(self.get_coins_catalog()))
         # process exclude coins from class input
         if input_exclude_coins:
             for coin in input_exclude_coins:
@@ -39,34 +80,29 @@ class CoingeckoApi:
                         exclude_coins.add(coin)
                 elif isinstance(coin, CoingeckoCoin):
                     exclude_coins.add(coin)
+        return exclude_coins
 
-        # process exclude coins from stable coins and json file
-        exclude_coin_symbols = read_exclude_coins_from_file()
+    def _fetch_coins_catalog(self) -> List[List[str]]:
+        return [[coin["id"], coin["symbol"], ", ".join(coin["platforms"].keys()) if coin.get("platforms") else ""]
+                for coin in self._cg.get_coins_list(include_platform=True)]
 
-        for coin in exclude_coin_symbols:
-            coingecok_coin = CoingeckoCoin.get_symbol_object(coin, "other")
-            if isinstance(coingecok_coin, list):
-                exclude_coins.update(coingecok_coin)
-            elif coingecok_coin:
-                exclude_coins.add(coingecok_coin)
-            else:
-                binance_exchange = BinanceExchange.get_symbol_object(coin)
-                if binance_exchange:
-                    coingecok_coin = \
-                        CoingeckoCoin.get_symbol_object(binance_exchange.base_symbol, "binance")
-                    if coingecok_coin:
-                        exclude_coins.add(coingecok_coin)
-        return exclude_coins
+    @error_handling("coingecko", default_val=[])
+    def get_coins_catalog(self) -> List[List[str]]:
+        """
+        Get the catalog of all coins on coingecko, from the reference data store
+
+        :return: [[coin_id, symbol, <comma separated chain names>], ...]
+        """
+        return ReferenceDataStore.get("coingecko_coins", self._fetch_coins_catalog)
 
     @error_handling("coingecko", default_val=[])
     def get_all_coingecko_coins(self) -> List[CoingeckoCoin]:
         """
-        Get all coins on coingecko
+        Get all coins on coingecko, from the coin catalog
 
         :return: [CoingeckoCoin, ...]
         """
-        coingecko_coins = self._cg.get_coins_list()
-        return [CoingeckoCoin(coin["id"], coin["symbol"]) for coin in coingecko_coins]
+        return [CoingeckoCoin(coin_id, symbol) for coin_id, symbol, _ in self.get_coins_catalog()]
 
     @error_handling("coingecko", default_val=[])
     def get_top_n_market_cap_coins(self, n: int = 100) -> List[CoingeckoCoin]:
@@ -85,7 +121,6 @@ class CoingeckoApi:
             market_list += self._cg.get_coins_markets(
                 vs_currency='usd', order='market_cap_desc', per_page=250,
                 page=page, sparkline=False)
-            time.sleep(0.2)
         market_list = market_list
 
         seen = set()
@@ -95,25 +130,121 @@ class CoingeckoApi:
                 coingecko_coins.append(CoingeckoCoin(market['id'], market['symbol']))
                 seen.add(market['id'])
 
+        # the market pages are the latest 24h volumes
+        self._cache_latest_volumes({market['id']: float(market['total_volume'])
+                                    for market in market_list if market.get('total_volume') is not None},
+                                   time.time())
         return coingecko_coins[:n]
 
+    @staticmethod
+    def _get_utc_date(timestamp: float) -> str:
+        return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime("%Y-%m-%d")
+
+    def _cache_latest_volumes(self, volumes: Dict[str, float], timestamp: float) -> None:
+        with self._latest_volume_lock:
+            CoingeckoApi._latest_volumes.update({coin_id: (timestamp, volume) for coin_id, volume in volumes.items()})
+
+    def _get_latest_volume(self, coin_id: str) -> float:
+        timestamp, volume = self._latest_volumes.get(coin_id, (0, np.nan))
+        return volume if time.time() - timestamp < self.LATEST_VOLUME_TTL else np.nan
+
+    @classmethod
+    def clear_latest_volumes(cls) -> None:
+        """
+        drop the latest 24h volumes kept in memory
+        """
+        with cls._latest_volume_lock:
+            cls._latest_volumes = {}
+
+    def add_daily_volumes(self, volumes: Dict[str, Dict[str, float]], overwrite: bool = True) -> None:
+        """
+        add to the rolling daily volume history, the days older than VOLUME_HISTORY_DAYS are dropped
+
+        :param volumes: {coin_id: {UTC "%Y-%m-%d": volume of the day}}
+        :param overwrite: False to keep the days already stored
+        """
+        if volumes:
+            CoinVolumeDBUtils.add_volumes(volumes, self._get_utc_date(time.time() - self.VOLUME_HISTORY_DAYS * 86400),
+                                          overwrite)
+
+    def record_daily_volume_snapshot(self) -> None:
+        """
+        Record the latest 24h volumes kept in memory, e.g. of the last get_top_n_market_cap_coins,
+        into the rolling daily volume history, as the volume of the UTC day their 24h window is centered in.
+        Only the first snapshot of each day is stored, the days already stored are kept,
+        so whichever run comes first in the day records it.
+        """
+        now = time.time()
+        with self._latest_volume_lock:
+            latest_volumes = list(self._latest_volumes.items())
+        volumes = defaultdict(dict)
+        for coin_id, (timestamp, volume) in latest_volumes:
+            if now - timestamp < self.LATEST_VOLUME_TTL:
+                volumes[coin_id][self._get_utc_date(timestamp - 43200)] = volume
+        self.add_daily_volumes(volumes, overwrite=False)
+
+    def get_daily_volume_history(self, coingecko_coins: List[CoingeckoCoin], days: int = 7) -> np.ndarray:
+        """
+        Get the volumes of the last <days> completed UTC days from the rolling daily volume history,
+        and the latest 24h volume from the last market snapshot.
+        The coins with missing days are requested with their daily market chart, which is backfilled
+        into the history, so after the first run mostly the snapshots of record_daily_volume_snapshot
+        are needed.
+
+        :param coingecko_coins: [CoingeckoCoin, ...]
+        :param days: number of past days
+
+        :return: (<num of coins>, <days> + 1) array, the oldest day first, the last column is the latest
+                 24h volume, rows of the coins without volume are nan
+        """
+        now = time.time()
+        dates = [self._get_utc_date(now - (days - i) * 86400) for i in range(days)]
+        stored = CoinVolumeDBUtils.get_volumes([coin.coin_id for coin in coingecko_coins], dates[0]) if days else {}
+        volumes = np.array([[stored.get(coin.coin_id, {}).get(date, np.nan) for date in dates] +
+                            [self._get_latest_volume(coin.coin_id)] for coin in coingecko_coins],
+                           dtype=np.float64).reshape(len(coingecko_coins), days + 1)
+
+        missing = np.flatnonzero(np.isnan(volumes).any(axis=1)).tolist()
+        if not missing:
+            return volumes
+
+        def get_chart(i: int) -> List[List[float]]:
+            return self.get_coin_market_info(coingecko_coins[i], ["total_volumes"], days=days,
+                                             interval="daily").get("total_volumes", [])
+
+        pool = ThreadPool(self.VOLUME_HISTORY_THREADS)
+        charts = pool.map(get_chart, missing)
+        pool.close()
+
+        backfill, latest = {}, {}
+        for i, chart in zip(missing, charts):
+            volumes[i] = np.nan
+            if not chart:
+                continue
+            # a daily point at 00:00 is the volume of the day before, the last point is the latest 24h volume
+            coin_volumes = {self._get_utc_date(timestamp / 1000 - 1): float(volume or 0)
+                            for timestamp, volume in chart if timestamp % (86400 * 1000) == 0}
+            coin_volumes = {date: volume for date, volume in coin_volumes.items() if date < self._get_utc_date(now)}
+            coin_stored = stored.get(coingecko_coins[i].coin_id, {})
+            volumes[i, :days] = [coin_volumes.get(date, coin_stored.get(date, 0)) for date in dates]
+            volumes[i, days] = float(chart[-1][1] or 0)
+            backfill[coingecko_coins[i].coin_id] = coin_volumes
+            latest[coingecko_coins[i].coin_id] = volumes[i, days]
+        self.add_daily_volumes(backfill)
+        self._cache_latest_volumes(latest, now)
+        return volumes
+
     @error_handling("coingecko", default_val={})
     def get_coins_chain_info(self, coingecko_coins: Union[List[CoingeckoCoin], Set[CoingeckoCoin]]) \
             -> Dict[CoingeckoCoin, str]:
         """
-        get coin chain name information
+        get coin chain name information, from the coin catalog
         :param coingecko_coins: [CoingeckoCoin, ...]
         """
-        res, coin_chains = {}, {}
         if not coingecko_coins:
-            return res
-        coins_chain_info = self._cg.get_coins_list(include_platform=True)
-        for coin in coins_chain_info:
-            if coin["platforms"]:
-                coin_chains[CoingeckoCoin(coin["id"], coin["symbol"])] = ", ".join(coin["platforms"].keys())
-        for coin in coingecko_coins:
-            res[coin] = coin_chains.get(coin, "")
-        return res
+            return {}
+        coin_chains = {coin_id: chains for coin_id, _, chains in self.get_coins_catalog() if chains}
+        return {coin: coin_chains.get(coin.coin_id, "") for coin in coingecko_coins}
 
     @error_handling("coingecko", default_val=[])
     def get_coins_market_info(self, coingecko_coins: Union[List[CoingeckoCoin], Set[CoingeckoCoin]],
@@ -178,7 +309,8 @@ class CoingeckoApi:
                              market_attribute_name_list: Optional[List[str]] = None,
                              days: int = 1, interval: str = "daily") -> Dict[str, Any]:
         """
-        get coin market info from coingecko
+        get coin market info from coingecko, the daily prices and total volumes are served
+        from the local chart store
 
         :param coingecko_coin: CoingeckoCoin
         :param market_attribute_name_list: [market_attribute_name, ...]
@@ -189,17 +321,64 @@ class CoingeckoApi:
         """
         if not coingecko_coin:
             return {}
+        if interval == "daily" and set(market_attribute_name_list) <= set(self.CHART_STORE_ATTRIBUTES):
+            start_time = int(time.time()) - days * 86400
+            self.update_coin_chart(coingecko_coin, "daily", start_time)
+            points = CoinChartDBUtils.get_points(coingecko_coin.coin_id, "daily", start_time * 1000)[::-1]
+            if not points:
+                return {}
+            return {market_attribute_name: [[point[0], point[self.CHART_STORE_ATTRIBUTES[market_attribute_name]]]
+                                            for point in points]
+                    for market_attribute_name in market_attribute_name_list}
         coin_info = self._cg.get_coin_market_chart_by_id(
             id=coingecko_coin.coin_id, vs_currency='usd', days=days, interval=interval)
 
         return {market_attribute_name: coin_info[market_attribute_name]
                 for market_attribute_name in market_attribute_name_list}
 
+    def update_coin_chart(self, coingecko_coin: CoingeckoCoin, granularity: str, start_time: int) -> None:
+        """
+        Update the local chart store incrementally with the market_chart range endpoint.
+        Without points since <start_time>, the chart since <start_time> is fetched, otherwise only the points
+        since the newest stored one, which is the live price of the last fill, and only if it is older
+        than CHART_MAX_AGE.
+
+        :param coingecko_coin: CoingeckoCoin
+        :param granularity: "hourly" or "daily"
+        :param start_time: timestamp in seconds of the oldest point needed
+        """
+        interval, min_days, retention_days = self.CHART_GRANULARITIES[granularity]
+        now = int(time.time())
+        oldest, newest = CoinChartDBUtils.get_time_range(coingecko_coin.coin_id, granularity)
+        history_start = self._chart_history_start.get((coingecko_coin.coin_id, granularity))
+        history_missing = oldest is None or oldest // 1000 - interval > start_time
+        fetch_history = newest is None or history_missing and (history_start is None or history_start > start_time)
+        if fetch_history:
+            from_time = start_time
+        elif now - newest // 1000 < self.CHART_MAX_AGE:
+            return
+        else:
+            from_time = newest // 1000
+        # a shorter range would change the granularity
+        from_time = min(from_time, now - min_days * 86400)
+
+        response = self._cg.get_coin_market_chart_range_by_id(
+            id=coingecko_coin.coin_id, vs_currency="usd", from_timestamp=from_time, to_timestamp=now, precision="full")
+        volumes = {int(timestamp): volume for timestamp, volume in response.get("total_volumes", [])}
+        points = [(int(timestamp), float(price), float(volumes.get(int(timestamp)) or 0))
+                  for timestamp, price in response.get("prices", []) if price is not None]
+        if points:
+            CoinChartDBUtils.replace_points(coingecko_coin.coin_id, granularity, points, from_time * 1000,
+                                            (now - retention_days * 86400) * 1000)
+            if fetch_history:
+                CoingeckoApi._chart_history_start[(coingecko_coin.coin_id, granularity)] = start_time
+
     @error_handling("coingecko", default_val=[])
     def get_coin_history_hourly_close_price(self, coingecko_coin: Optional[CoingeckoCoin] = None, days: int = 10) \
             -> List[Decimal]:
         """
-        Get coin past close price for the history <days> days
+        Get coin past close price for the history <days> days, from the local chart store,
+        hourly up to 90 days and daily for longer histories
 
         :param coingecko_coin: CoingeckoCoin
         :param days: number of days to get
@@ -208,18 +387,69 @@ class CoingeckoApi:
         """
         if not coingecko_coin:
             return []
-        respond = self._cg.get_coin_market_chart_by_id(id=coingecko_coin.coin_id,
-                                                       vs_currency='usd', days=days,
-                                                       precision="full")
-        prices = respond.get("prices", [])
-        prices = [Decimal(i[1]) for i in prices][::-1]
-
+        granularity = "hourly" if days <= self.CHART_GRANULARITIES["hourly"][2] else "daily"
+        start_time = int(time.time()) - days * 86400
+        self.update_coin_chart(coingecko_coin, granularity, start_time)
+
+        points = CoinChartDBUtils.get_points(coingecko_coin.coin_id, granularity, start_time * 1000)
+        return [Decimal(price) for _, price, _ in points]
+
+    def _get_cached_current_price(self, coin_id: str) -> Optional[Decimal]:
+        timestamp, price = self._current_prices.get(coin_id, (0, None))
+        return price if time.time() - timestamp < self.CURRENT_PRICE_TTL else None
+
+    def _cache_current_prices(self, response: Dict[str, Dict[str, Any]]) -> Dict[str, Decimal]:
+        now = time.time()
+        prices = {coin_id: Decimal(price["usd"]) for coin_id, price in response.items()
+                  if price.get("usd") is not None}
+        with self._current_price_lock:
+            CoingeckoApi._current_prices.update({coin_id: (now, price) for coin_id, price in prices.items()})
         return prices
 
+    @classmethod
+    def clear_current_prices(cls) -> None:
+        """
+        drop the prices kept in memory, e.g. at the start of a run
+        """
+        with cls._current_price_lock:
+            cls._current_prices = {}
+
+    @error_handling("coingecko", default_val={})
+    def _get_current_prices_batch(self, coin_ids: List[str]) -> Dict[str, Decimal]:
+        return self._cache_current_prices(self._cg.get_price(ids=coin_ids, vs_currencies='usd', precision='full'))
+
+    def get_coins_current_price(self, coingecko_coins: Union[List[CoingeckoCoin], Set[CoingeckoCoin]]) \
+            -> Dict[CoingeckoCoin, Decimal]:
+        """
+        Get the current price of <coingecko_coins> with PRICE_BATCH_SIZE ids per simple/price request,
+        only the coins without a price kept in memory are requested, the prices are kept for
+        the later get_coin_current_price calls
+
+        :param coingecko_coins: [CoingeckoCoin, ...]
+
+        :return: {CoingeckoCoin: price}, coins without price are omitted
+        """
+        res = {}
+        missing_ids = []
+        for coin in dict.fromkeys(coingecko_coins):
+            price = self._get_cached_current_price(coin.coin_id)
+            if price is None:
+                missing_ids.append(coin.coin_id)
+            else:
+                res[coin] = price
+
+        prices = {}
+        for start in range(0, len(missing_ids), self.PRICE_BATCH_SIZE):
+            prices.update(self._get_current_prices_batch(missing_ids[start:start + self.PRICE_BATCH_SIZE]))
+        for coin in coingecko_coins:
+            if coin.coin_id in prices:
+                res[coin] = prices[coin.coin_id]
+        return res
+
     @error_handling("coingecko", default_val=Decimal(0))
     def get_coin_current_price(self, coingecko_coin: Optional[CoingeckoCoin] = None) -> Decimal:
         """
-        Get coin current close price
+        Get coin current close price, served from memory after get_coins_current_price
 
         :param coingecko_coin: CoingeckoCoin
 
@@ -227,6 +457,8 @@ class CoingeckoApi:
         """
         if not coingecko_coin:
             return Decimal(0)
+        price = self._get_cached_current_price(coingecko_coin.coin_id)
+        if price is not None:
+            return price
         respond = self._cg.get_price(ids=coingecko_coin.coin_id, vs_currencies='usd', precision='full')
-        price = respond.get(coingecko_coin.coin_id, {}).get('usd', 0)
-        return Decimal(price)
+        return self._cache_current_prices(respond).get(coingecko_coin.coin_id, Decimal(0))
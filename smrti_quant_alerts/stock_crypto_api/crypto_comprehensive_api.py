@@ -1,17 +1,23 @@
 import time
-import math
-from typing import Tuple, List, Optional, Union, Set
+import itertools
+from typing import Tuple, List, Optional, Union, Set, Dict, Any
 from multiprocessing.pool import ThreadPool
 
 import numpy as np
 
 from smrti_quant_alerts.exception import error_handling
 from smrti_quant_alerts.data_type import BinanceExchange, CoingeckoCoin, TradingSymbol
+from smrti_quant_alerts.db import CoinListingDBUtils
 from smrti_quant_alerts.stock_crypto_api.crypto_binance_api import BinanceApi
 from smrti_quant_alerts.stock_crypto_api.crypto_coingecko_api import CoingeckoApi
+from smrti_quant_alerts.stock_crypto_api.reference_data_store import ReferenceDataStore
 
 
 class CryptoComprehensiveApi(BinanceApi, CoingeckoApi):
+    # listing metadata of the coins, for the later than 2023 scan
+    LISTING_RECHECK_DAYS = 7
+    LISTING_SCAN_THREADS = 4
+
     def __init__(self) -> None:
         BinanceApi.__init__(self)
         CoingeckoApi.__init__(self)
@@ -32,23 +38,53 @@ class CryptoComprehensiveApi(BinanceApi, CoingeckoApi):
         exclude_coins.update(CoingeckoApi.get_exclude_coins(self, input_exclude_coins))
         return exclude_coins
 
-    @error_handling("coingecko", default_val=None)
-    def _match_binance_exchange_to_coingecko_coins(self) -> None:
-        """
-        Call if want to use Coingecko and Binance Api together
-        """
+    def _fetch_binance_coingecko_ids(self) -> Dict[str, str]:
+        base_coin_ids = {}
         page = 0
         while True:
             exchanges = self._cg.get_exchanges_tickers_by_id(
                 id="binance", coin_ids="bitcoin,first-digital-usd,tether,usd-coin,ethereum",
                 page=page).get("tickers", [])
             if not exchanges:
-                return
+                return base_coin_ids
 
             for exchange in exchanges:
-                BinanceExchange.add_base_coin_id_pair_to_dict(exchange["base"], exchange["coin_id"])
+                base_coin_ids[exchange["base"]] = exchange["coin_id"]
             page += 1
 
+    @error_handling("coingecko", default_val=None)
+    def _match_binance_exchange_to_coingecko_coins(self) -> None:
+        """
+        Call if want to use Coingecko and Binance Api together,
+        the mapping is served from the reference data store
+        """
+        base_coin_ids = ReferenceDataStore.get("binance_coingecko_ids", self._fetch_binance_coingecko_ids)
+        for base, coin_id in base_coin_ids.items():
+            BinanceExchange.add_base_coin_id_pair_to_dict(base, coin_id)
+
+    def _is_listed_before(self, listing: Optional[Dict[str, Any]], year: int, now: float) -> bool:
+        """
+        check the stored listing metadata of a coin, a genesis before <year> is final,
+        an atl/ath before <year> holds for LISTING_RECHECK_DAYS days since atl/ath dates only move forward
+        """
+        if not listing:
+            return False
+        if listing["genesis_date"] and int(listing["genesis_date"][:4]) < year:
+            return True
+        return now - listing["date"] < self.LISTING_RECHECK_DAYS * 86400 and \
+            bool(listing["atl_date"]) and bool(listing["ath_date"]) and \
+            min(int(listing["atl_date"][:4]), int(listing["ath_date"][:4])) < year
+
+    @error_handling("coingecko", default_val=[])
+    def _get_coins_markets_page(self, coins: List[CoingeckoCoin]) -> List[Dict[str, Any]]:
+        return self._cg.get_coins_markets(vs_currency='usd', ids=[coin.coin_id for coin in coins],
+                                          per_page=250, page=1)
+
+    def _get_coin_genesis_date(self, coin: CoingeckoCoin) -> Optional[str]:
+        coin_info = self.get_coin_info(coin)
+        # the error default of get_coin_info has no name, keep it out of the listing store
+        return (coin_info.get("genesis_date") or "") if coin_info.get("name") else None
+
     @error_handling("coingecko", default_val=([], []))
     def get_coins_with_daily_volume_threshold_later_than_2023(
             self, threshold: int = 3000000) -> Tuple[List[BinanceExchange], List[CoingeckoCoin]]:
@@ -58,54 +94,68 @@ class CryptoComprehensiveApi(BinanceApi, CoingeckoApi):
             [BinanceExchange, ...]
         if not on binance, get coin_id, and coin_name from coingeco:
             [CoingeckoCoin, ...]
+        The coins known to be listed before 2023 from the stored listing metadata are skipped,
+        the market pages and genesis dates of the others are requested concurrently.
+
         :param threshold: threshold of 24h volume in USD
 
         :return: [BinanceExchange, ...], [CoingeckoCoin, ...]
         """
         self._update_active_binance_spot_exchanges()
-        coins = self.get_all_coingecko_coins()
+        now = time.time()
+        listings = CoinListingDBUtils.get_listings()
+        coins = [coin for coin in self.get_all_coingecko_coins()
+                 if not self._is_listed_before(listings.get(coin.coin_id), 2023, now)]
 
         # pagination by 250
-        pages = math.ceil(len(coins) / 250)
+        pool = ThreadPool(self.LISTING_SCAN_THREADS)
+        markets = pool.map(self._get_coins_markets_page, [coins[i:i + 250] for i in range(0, len(coins), 250)])
+
+        market_dates, candidates = {}, []
+        for info in itertools.chain.from_iterable(markets):
+            market_dates[info['id']] = (info.get('atl_date') or "", info.get('ath_date') or "")
+            if not info.get('atl_date') or not info.get('ath_date'):
+                continue
+            atl_year = int(info['atl_date'][:4])
+            ath_year = int(info['ath_date'][:4])
+            if atl_year < 2023 or ath_year < 2023:
+                continue
+
+            if info['total_volume'] and int(info['total_volume']) > threshold:
+                candidates.append(CoingeckoCoin(info['id'], info['symbol']))
+        CoinListingDBUtils.update_market_dates(market_dates)
+
+        genesis_dates = {coin.coin_id: listings[coin.coin_id]["genesis_date"] for coin in candidates
+                         if listings.get(coin.coin_id, {}).get("genesis_date") is not None}
+        missing = [coin for coin in candidates if coin.coin_id not in genesis_dates]
+        fetched = dict(zip([coin.coin_id for coin in missing], pool.map(self._get_coin_genesis_date, missing)))
+        pool.close()
+        CoinListingDBUtils.update_genesis_dates({coin_id: genesis_date for coin_id, genesis_date in fetched.items()
+                                                 if genesis_date is not None})
+        genesis_dates.update(fetched)
+
         coingecko_coins = []
         binance_exchanges = []
-
         quotes = ['USDT', 'FDUSD', 'BTC', 'ETH']
-
-        for page in range(pages):
-            cur_coins_info = self._cg.get_coins_markets(
-                vs_currency='usd', ids=[coin.coin_id for coin in coins[page * 250:(page + 1) * 250]],
-                per_page=250, page=1)
-
-            for info in cur_coins_info:
-                symbol = info['symbol']
-                coin = CoingeckoCoin(info['id'], info['symbol'])
-                if 'atl_date' not in info or not info['atl_date'] \
-                        or 'ath_date' not in info or not info['ath_date']:
-                    continue
-                atl_year = int(info['atl_date'][:4])
-                ath_year = int(info['ath_date'][:4])
-                if atl_year < 2023 or ath_year < 2023:
-                    continue
-
-                if info['total_volume'] and int(info['total_volume']) > threshold:
-                    genesis_date = self.get_coin_info(coin)['genesis_date']
-                    if not genesis_date or genesis_date and int(genesis_date[:4]) >= 2023:
-                        binance_coin = False
-                        for quote in quotes:
-                            exchange = BinanceExchange(symbol, quote)
-                            if exchange in self.active_binance_spot_exchanges_set:
-                                binance_exchanges.append(BinanceExchange(symbol, quote))
-                                binance_coin = True
-                        if not binance_coin:
-                            coingecko_coins.append(coin)
+        for coin in candidates:
+            genesis_date = genesis_dates[coin.coin_id]
+            if not genesis_date or int(genesis_date[:4]) >= 2023:
+                binance_coin = False
+                for quote in quotes:
+                    exchange = BinanceExchange(coin.coin_symbol, quote)
+                    if exchange in self.active_binance_spot_exchanges_set:
+                        binance_exchanges.append(exchange)
+                        binance_coin = True
+                if not binance_coin:
+                    coingecko_coins.append(coin)
 
         return binance_exchanges, coingecko_coins
 
     @error_handling("coingecko", default_val=([], []))
     def get_top_market_cap_coins_with_volume_threshold(
             self, num: int = 300, daily_volume_threshold: Optional[int] = None,
-            weekly_volume_threshold: Optional[int] = None) \
+            weekly_volume_threshold: Optional[int] = None, market_list: Optional[List[CoingeckoCoin]] = None,
+            volume_checks: Optional[Dict[CoingeckoCoin, bool]] = None) \
             -> Tuple[List[BinanceExchange], List[CoingeckoCoin]]:
         """
         get the top <num> market cap
@@ -119,6 +169,10 @@ class CryptoComprehensiveApi(BinanceApi, CoingeckoApi):
         :param num: number of exchanges to get
         :param daily_volume_threshold: threshold of daily volume in USD
         :param weekly_volume_threshold: threshold of weekly volume in USD
+        :param market_list: coins sorted by market cap, e.g. a longer list fetched once for several <num>,
+                            the top <num> are fetched if None
+        :param volume_checks: {CoingeckoCoin: passed} of these thresholds, coins in it are not checked again,
+                              the checked coins are added to it
 
         :return: [BinanceExchange, ...], [CoingeckoCoin, ...]
         """
@@ -127,19 +181,22 @@ class CryptoComprehensiveApi(BinanceApi, CoingeckoApi):
         binance_exchanges = []
         coingeco_coins = []
 
-        market_list = self.get_top_n_market_cap_coins(n=num)
-
-        def filter_coin(coin):
-            time.sleep(0.5)
-            if weekly_volume_threshold or daily_volume_threshold:
-                # get weekly volume
-                data = self.get_coin_market_info(coin, ["total_volumes"], days=7, interval='daily')
-                weekly_volume = np.sum(np.array(data.get('total_volumes', [0, 0])))
-                daily_volume = data.get('total_volumes', [[0, 0]])[-1][1]
-                if weekly_volume_threshold and weekly_volume < weekly_volume_threshold or \
-                        daily_volume_threshold and daily_volume < daily_volume_threshold:
-                    return
-
+        market_list = self.get_top_n_market_cap_coins(n=num) if market_list is None else market_list[:num]
+        if weekly_volume_threshold or daily_volume_threshold:
+            volume_checks = {} if volume_checks is None else volume_checks
+            unchecked = [coin for coin in market_list if coin not in volume_checks]
+            if unchecked:
+                volumes = self.get_daily_volume_history(unchecked, days=7)
+                weekly_volume, daily_volume = volumes.sum(axis=1), volumes[:, -1]
+                passed = ~np.isnan(weekly_volume)
+                if weekly_volume_threshold:
+                    passed &= weekly_volume >= weekly_volume_threshold
+                if daily_volume_threshold:
+                    passed &= daily_volume >= daily_volume_threshold
+                volume_checks.update(zip(unchecked, passed.tolist()))
+            market_list = [coin for coin in market_list if volume_checks[coin]]
+
+        for coin in market_list:
             symbol = coin.coin_symbol
             if f"{symbol}USDT" not in self.active_binance_spot_exchanges_set and \
                     f"{symbol}BTC" not in self.active_binance_spot_exchanges_set and \
@@ -156,10 +213,6 @@ class CryptoComprehensiveApi(BinanceApi, CoingeckoApi):
                 if f"{symbol}ETH" in self.active_binance_spot_exchanges_set:
                     binance_exchanges.append(BinanceExchange(symbol, "ETH"))
 
-        pool = ThreadPool(4)
-        pool.map(filter_coin, market_list)
-        pool.close()
-
         return binance_exchanges, coingeco_coins
 
     @error_handling("coingecko", default_val=([], []))
@@ -182,29 +235,22 @@ class CryptoComprehensiveApi(BinanceApi, CoingeckoApi):
         """
         self._update_active_binance_spot_exchanges()
         market_list = self.get_top_n_market_cap_coins(num)
-        coin_volume_increase_detail = []
         coingeco_coins, binance_exchanges = [], []
 
-        def filter_coin(coin):
-            symbol = coin.coin_symbol
-            coin_id = coin.coin_id
-            # add alt/btc, alt/eth exchanges
+        # add alt/btc, alt/eth exchanges
+        for coin in market_list:
             for quote in ["BTC", "ETH"]:
-                if BinanceExchange(symbol, quote) in self.active_binance_spot_exchanges_set:
-                    binance_exchanges.append(BinanceExchange(symbol, quote))
-
-            # get volume increase ratio
-            data = self.get_coin_market_info(coin, ["total_volumes"], days=13, interval='daily')
-
-            data = np.array(data['total_volumes'])
-            volume_increase = 100 if np.sum(data[:7, 1]) == 0 else np.sum(data[7:, 1]) / np.sum(data[:7, 1])
-
-            if volume_increase >= volume_threshold:
-                coin_volume_increase_detail.append([volume_increase, symbol, coin_id])
-
-        pool = ThreadPool(6)
-        pool.map(filter_coin, market_list)
-        pool.close()
+                if BinanceExchange(coin.coin_symbol, quote) in self.active_binance_spot_exchanges_set:
+                    binance_exchanges.append(BinanceExchange(coin.coin_symbol, quote))
+
+        # volume increase ratio of the last 7 days over the 7 days before
+        volumes = self.get_daily_volume_history(market_list, days=13)
+        previous_volume, current_volume = volumes[:, :7].sum(axis=1), volumes[:, 7:].sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            volume_increase = np.where(previous_volume == 0, 100, current_volume / previous_volume)
+        coin_volume_increase_detail = [[increase, coin.coin_symbol, coin.coin_id]
+                                       for coin, increase in zip(market_list, volume_increase.tolist())
+                                       if increase >= volume_threshold]
 
         coin_volume_increase_detail = sorted(coin_volume_increase_detail, key=lambda x: x[0], reverse=True)
         for volume_increase, symbol, coin_id in coin_volume_increase_detail:
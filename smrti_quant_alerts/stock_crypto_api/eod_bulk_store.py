@@ -0,0 +1,250 @@
+import os
+import datetime
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, List, NamedTuple, Tuple
+
+import numpy as np
+
+from smrti_quant_alerts.settings import Config
+
+
+class EodSnapshot(NamedTuple):
+    """
+    columnar end of day snapshot of one exchange, codes[i] closed at prices[i] with volumes[i]
+    """
+    codes: np.ndarray
+    prices: np.ndarray
+    volumes: np.ndarray
+
+    @classmethod
+    def empty(cls) -> "EodSnapshot":
+        return cls(np.array([], dtype=str), np.array([], dtype=np.float64), np.array([], dtype=np.float64))
+
+
+class EodBulkStore:
+    """
+    Persistent columnar store of the EODHD eod-bulk-last-day snapshots, one compressed .npz file per date
+    in runtime_database/eod_bulk/<exchange>/.
+
+    Only finished days are stored, a day without trading (holiday) is stored as an empty snapshot once
+    it is old enough to be trusted, so it is not requested again. Snapshots older than RETENTION_DAYS
+    are deleted, the recently used ones are also kept in memory.
+
+    The adjusted closes of a snapshot only reflect the splits and dividends known when it was downloaded,
+    each snapshot keeps the newest stored date at that time as its as_of date. The later corporate actions
+    are recorded as per code adjustment factors keyed by the date they were detected at, in
+    runtime_database/eod_bulk/<exchange>/adjustments/, and applied to the snapshots as of an older date
+    when they are loaded.
+    """
+    # longest price change timeframe (10Y) plus the holiday walk back
+    RETENTION_DAYS = 365 * 10 + 30
+    MEMORY_CACHE_SIZE = 32
+
+    _memory_cache: "OrderedDict[str, Tuple[EodSnapshot, str]]" = OrderedDict()
+    # {exchange: (adjustment file names, (dates, codes, factors) of all the adjustments)}
+    _adjustments: Dict[str, Tuple[List[str], Tuple[np.ndarray, np.ndarray, np.ndarray]]] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_dir(exchange: str = "US") -> str:
+        """
+        get the directory of the snapshots of <exchange>
+
+        :param exchange: exchange code
+        :return: directory path
+        """
+        return os.path.join(Config.PROJECT_DIR, "runtime_database", "eod_bulk", exchange)
+
+    @classmethod
+    def get_path(cls, date: str, exchange: str = "US") -> str:
+        """
+        get the file path of the snapshot of <date>
+
+        :param date: "%Y-%m-%d"
+        :param exchange: exchange code
+        :return: file path
+        """
+        return os.path.join(cls.get_dir(exchange), f"{date}.npz")
+
+    @classmethod
+    def get_adjustment_dir(cls, exchange: str = "US") -> str:
+        """
+        get the directory of the adjustment factors of <exchange>
+
+        :param exchange: exchange code
+        :return: directory path
+        """
+        return os.path.join(cls.get_dir(exchange), "adjustments")
+
+    @classmethod
+    def get_dates(cls, exchange: str = "US") -> List[str]:
+        """
+        get the stored dates
+
+        :param exchange: exchange code
+        :return: ["%Y-%m-%d", ...], sorted
+        """
+        if not os.path.isdir(cls.get_dir(exchange)):
+            return []
+        return sorted(file[:-4] for file in os.listdir(cls.get_dir(exchange)) if file.endswith(".npz"))
+
+    @classmethod
+    def load(cls, date: str, exchange: str = "US") -> Optional[EodSnapshot]:
+        """
+        load the snapshot of <date>
+
+        :param date: "%Y-%m-%d"
+        :param exchange: exchange code
+        :return: EodSnapshot adjusted for the corporate actions recorded since, None if the date is not stored
+        """
+        path = cls.get_path(date, exchange)
+        with cls._lock:
+            cached = cls._memory_cache.get(path)
+            if cached is not None:
+                cls._memory_cache.move_to_end(path)
+        if cached is None:
+            if not os.path.exists(path):
+                return None
+            with np.load(path, allow_pickle=False) as data:
+                # snapshots stored before the as_of dates are as of their own date
+                cached = (EodSnapshot(data["codes"], data["prices"], data["volumes"]),
+                          str(data["as_of"]) if "as_of" in data.files else date)
+            cls._cache_in_memory(path, cached)
+        return cls._adjust(*cached, exchange)
+
+    @classmethod
+    def save(cls, date: str, snapshot: EodSnapshot, exchange: str = "US") -> None:
+        """
+        store the snapshot of a finished day just downloaded, as of the newest stored date,
+        the file is replaced atomically so concurrent alert processes never read a partial one
+
+        :param date: "%Y-%m-%d"
+        :param snapshot: EodSnapshot, empty for a holiday
+        :param exchange: exchange code
+        """
+        as_of = max([date] + cls.get_dates(exchange))
+        os.makedirs(cls.get_dir(exchange), exist_ok=True)
+        path = cls.get_path(date, exchange)
+        cls._save_npz(path, codes=snapshot.codes, prices=snapshot.prices, volumes=snapshot.volumes,
+                      as_of=np.array(as_of))
+        cls._cache_in_memory(path, (snapshot, as_of))
+
+    @classmethod
+    def save_adjustment(cls, date: str, codes: np.ndarray, factors: np.ndarray, exchange: str = "US") -> None:
+        """
+        record the adjustment factors of the corporate actions detected at <date>,
+        the snapshots as of an older date are multiplied by them when loaded
+
+        :param date: "%Y-%m-%d"
+        :param codes: np.ndarray of the adjusted codes
+        :param factors: np.ndarray of their adjustment factors
+        :param exchange: exchange code
+        """
+        os.makedirs(cls.get_adjustment_dir(exchange), exist_ok=True)
+        cls._save_npz(os.path.join(cls.get_adjustment_dir(exchange), f"{date}.npz"), codes=codes, factors=factors)
+
+    @classmethod
+    def prune(cls, today: datetime.datetime, exchange: str = "US") -> int:
+        """
+        delete the snapshots older than RETENTION_DAYS
+
+        :param today: datetime now
+        :param exchange: exchange code
+        :return: number of deleted snapshots
+        """
+        oldest_date = (today - datetime.timedelta(days=cls.RETENTION_DAYS)).strftime("%Y-%m-%d")
+        old_dates = [date for date in cls.get_dates(exchange) if date < oldest_date]
+        for date in old_dates:
+            os.remove(cls.get_path(date, exchange))
+        # the remaining snapshots are as of a newer date than these adjustments
+        for file in cls._get_adjustment_files(exchange):
+            if file[:-4] < oldest_date:
+                os.remove(os.path.join(cls.get_adjustment_dir(exchange), file))
+        return len(old_dates)
+
+    @classmethod
+    def clear(cls, exchange: str = "US") -> None:
+        """
+        delete all the snapshots of <exchange>
+
+        :param exchange: exchange code
+        """
+        for date in cls.get_dates(exchange):
+            os.remove(cls.get_path(date, exchange))
+        for file in cls._get_adjustment_files(exchange):
+            os.remove(os.path.join(cls.get_adjustment_dir(exchange), file))
+        with cls._lock:
+            cls._memory_cache = OrderedDict()
+            cls._adjustments.pop(exchange, None)
+
+    @staticmethod
+    def _save_npz(path: str, **arrays: np.ndarray) -> None:
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def _get_adjustment_files(cls, exchange: str) -> List[str]:
+        if not os.path.isdir(cls.get_adjustment_dir(exchange)):
+            return []
+        return sorted(file for file in os.listdir(cls.get_adjustment_dir(exchange)) if file.endswith(".npz"))
+
+    @classmethod
+    def _get_adjustments(cls, exchange: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        get all the recorded adjustments, reloaded only when another one was recorded
+
+        :param exchange: exchange code
+        :return: (dates, codes, factors), one entry per adjusted code and date
+        """
+        files = cls._get_adjustment_files(exchange)
+        with cls._lock:
+            cached_files, adjustments = cls._adjustments.get(exchange, ([], None))
+        if cached_files == files and adjustments is not None:
+            return adjustments
+
+        dates, codes, factors = [], [], []
+        for file in files:
+            with np.load(os.path.join(cls.get_adjustment_dir(exchange), file), allow_pickle=False) as data:
+                dates.append(np.full(len(data["codes"]), file[:-4]))
+                codes.append(data["codes"])
+                factors.append(data["factors"])
+        adjustments = (np.concatenate(dates) if dates else np.array([], dtype=str),
+                       np.concatenate(codes) if codes else np.array([], dtype=str),
+                       np.concatenate(factors) if factors else np.array([], dtype=np.float64))
+        with cls._lock:
+            cls._adjustments[exchange] = (files, adjustments)
+        return adjustments
+
+    @classmethod
+    def _adjust(cls, snapshot: EodSnapshot, as_of: str, exchange: str) -> EodSnapshot:
+        """
+        multiply the prices of <snapshot> by the adjustment factors recorded after <as_of>
+
+        :param snapshot: EodSnapshot as stored
+        :param as_of: "%Y-%m-%d", newest stored date when the snapshot was downloaded
+        :param exchange: exchange code
+        :return: adjusted EodSnapshot
+        """
+        dates, codes, factors = cls._get_adjustments(exchange)
+        newer = dates > as_of
+        if not newer.any() or not len(snapshot.codes):
+            return snapshot
+        codes, inverse = np.unique(codes[newer], return_inverse=True)
+        cumulative_factors = np.ones(len(codes))
+        np.multiply.at(cumulative_factors, inverse, factors[newer])
+        _, snapshot_index, factor_index = np.intersect1d(snapshot.codes, codes, assume_unique=True,
+                                                         return_indices=True)
+        prices = snapshot.prices.copy()
+        prices[snapshot_index] *= cumulative_factors[factor_index]
+        return EodSnapshot(snapshot.codes, prices, snapshot.volumes)
+
+    @classmethod
+    def _cache_in_memory(cls, path: str, cached: Tuple[EodSnapshot, str]) -> None:
+        with cls._lock:
+            cls._memory_cache[path] = cached
+            cls._memory_cache.move_to_end(path)
+            while len(cls._memory_cache) > cls.MEMORY_CACHE_SIZE:
+                cls._memory_cache.popitem(last=False)
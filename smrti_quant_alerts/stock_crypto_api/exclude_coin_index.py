@@ -0,0 +1,145 @@
+import os
+import threading
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from smrti_quant_alerts.settings import Config
+from smrti_quant_alerts.data_type import BinanceExchange, CoingeckoCoin
+from smrti_quant_alerts.stock_crypto_api.utility import read_exclude_coins_from_file
+
+
+class ExcludeCoinIndex:
+    """
+    Precomputed expansion of the exclude coins in stable_coins.json and exclude_coins.json.
+
+    The binance side indexes the exchanges by base and by symbol, the coingecko side the coin catalog
+    by symbol. Each side is rebuilt only when one of the json files changes (mtime checked) or when
+    a different exchange list/coin catalog is passed, otherwise the expansion is a few dict lookups.
+    """
+    QUOTES = ("USDT", "FDUSD", "BTC", "ETH")
+    FILES = ("stable_coins.json", "exclude_coins.json")
+
+    _lock = threading.Lock()
+    _files_key: Optional[Tuple] = None
+    _file_symbols: FrozenSet[str] = frozenset()
+
+    # indexed exchange lists, kept to compare by identity
+    _binance_key: Optional[Tuple] = None
+    # {base: (BinanceExchange, ...)} of the QUOTES quotes, in the QUOTES order
+    _base_exchanges: Dict[str, Tuple[BinanceExchange, ...]] = {}
+    _binance_excludes: FrozenSet[BinanceExchange] = frozenset()
+
+    # indexed coin catalog, kept to compare by identity
+    _coingecko_key: Optional[Tuple] = None
+    _coingecko_excludes: FrozenSet[CoingeckoCoin] = frozenset()
+    # file symbols without coingecko coin, looked up as binance exchanges
+    _unlisted_symbols: Tuple[str, ...] = ()
+
+    @classmethod
+    def get_file_symbols(cls) -> FrozenSet[str]:
+        """
+        get the symbols of stable_coins.json and exclude_coins.json, reread only when a file changes
+
+        :return: frozenset of symbols
+        """
+        files_key = []
+        for file in cls.FILES:
+            path = os.path.join(Config.PROJECT_DIR, file)
+            files_key.append((path, os.stat(path).st_mtime_ns if os.path.exists(path) else None))
+        files_key = tuple(files_key)
+        if files_key != cls._files_key:
+            with cls._lock:
+                cls._file_symbols = frozenset(symbol.upper() for symbol in read_exclude_coins_from_file())
+                cls._files_key = files_key
+        return cls._file_symbols
+
+    @classmethod
+    def _update_binance_index(cls, *exchange_lists: List[BinanceExchange]) -> None:
+        file_symbols = cls.get_file_symbols()
+        if cls._binance_key is not None and cls._binance_key[0] == cls._files_key and \
+                len(cls._binance_key[1]) == len(exchange_lists) and \
+                all(indexed is exchanges for indexed, exchanges in zip(cls._binance_key[1], exchange_lists)):
+            return
+
+        symbol_exchanges, base_quotes = {}, {}
+        for exchanges in exchange_lists:
+            for exchange in exchanges:
+                if isinstance(exchange, BinanceExchange):
+                    symbol_exchanges[exchange.exchange] = exchange
+                    if exchange.quote_symbol in cls.QUOTES:
+                        base_quotes.setdefault(exchange.base_symbol, {})[exchange.quote_symbol] = exchange
+        base_exchanges = {base: tuple(quotes[quote] for quote in cls.QUOTES if quote in quotes)
+                          for base, quotes in base_quotes.items()}
+
+        binance_excludes = set()
+        for symbol in file_symbols:
+            if symbol in symbol_exchanges:
+                binance_excludes.add(symbol_exchanges[symbol])
+            else:
+                binance_excludes.update(base_exchanges.get(symbol, ()))
+
+        with cls._lock:
+            cls._base_exchanges = base_exchanges
+            cls._binance_excludes = frozenset(binance_excludes)
+            cls._binance_key = (cls._files_key, exchange_lists)
+
+    @classmethod
+    def get_binance_excludes(cls, *exchange_lists: List[BinanceExchange]) -> FrozenSet[BinanceExchange]:
+        """
+        get the exchanges excluded by the json files, a symbol is either an exchange or a base
+        expanded to its QUOTES exchanges
+
+        :param exchange_lists: [BinanceExchange, ...] of each exchange type, e.g. spot and future
+        :return: frozenset of BinanceExchange
+        """
+        cls._update_binance_index(*exchange_lists)
+        return cls._binance_excludes
+
+    @classmethod
+    def get_exchanges_by_base(cls, base: str) -> Tuple[BinanceExchange, ...]:
+        """
+        get the exchanges of the QUOTES quotes of <base>, from the last indexed exchange lists
+
+        :param base: base symbol
+        :return: (BinanceExchange, ...)
+        """
+        return cls._base_exchanges.get(base.upper(), ())
+
+    @classmethod
+    def get_coingecko_excludes(cls, coins_catalog: List[List[str]]) -> FrozenSet[CoingeckoCoin]:
+        """
+        get the coins excluded by the json files, a symbol is either a coin symbol expanded to all its coins,
+        or a binance exchange/base mapped to the coingecko coin of its base
+
+        :param coins_catalog: [[coin_id, symbol, chains], ...], from CoingeckoApi.get_coins_catalog
+        :return: frozenset of CoingeckoCoin
+        """
+        file_symbols = cls.get_file_symbols()
+        if cls._coingecko_key is None or cls._coingecko_key[0] != cls._files_key or \
+                cls._coingecko_key[1] is not coins_catalog:
+            coingecko_excludes = [CoingeckoCoin(coin_id, symbol) for coin_id, symbol, *_ in coins_catalog
+                                  if symbol.upper() in file_symbols]
+            listed_symbols = {coin.coin_symbol for coin in coingecko_excludes}
+            with cls._lock:
+                cls._coingecko_excludes = frozenset(coingecko_excludes)
+                cls._unlisted_symbols = tuple(symbol for symbol in file_symbols if symbol not in listed_symbols)
+                cls._coingecko_key = (cls._files_key, coins_catalog)
+
+        # the binance base to coin id mapping is updated separately, so it is looked up on each call
+        excludes = set(cls._coingecko_excludes)
+        for symbol in cls._unlisted_symbols:
+            binance_exchange = BinanceExchange.get_symbol_object(symbol)
+            if binance_exchange:
+                coingecko_coin = CoingeckoCoin.get_symbol_object(binance_exchange.base_symbol, "binance")
+                if coingecko_coin:
+                    excludes.add(coingecko_coin)
+        return frozenset(excludes)
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        drop the index, the next lookup rebuilds it
+        """
+        with cls._lock:
+            cls._files_key = cls._binance_key = cls._coingecko_key = None
+            cls._file_symbols, cls._binance_excludes, cls._coingecko_excludes = frozenset(), frozenset(), frozenset()
+            cls._base_exchanges, cls._unlisted_symbols = {}, ()
@@ -0,0 +1,76 @@
+from collections import defaultdict
+from decimal import Decimal
+from typing import Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+class MovingAverageEngine:
+    """
+    NumPy moving average engine over the hourly close prices of many symbols.
+
+    The close prices are held in one (<num of symbols>, <num of hours>) matrix, newest first and padded
+    with NaN for the shorter histories. The moving average of (timeframe, window) is the mean of
+    the closes 0, timeframe, ..., (window - 1) * timeframe hours ago, e.g. (4, 200) for H4 MA200.
+    Each timeframe is sampled and cumulatively summed once, the moving averages of all its windows
+    are then read from the cumulative sums. A history shorter than the window is averaged over
+    the closes available, a symbol without close has a NaN moving average.
+    """
+    def __init__(self, close_prices: Union[np.ndarray, Sequence[Sequence[Union[float, Decimal]]]],
+                 current_prices: Optional[Sequence[Union[float, Decimal]]] = None) -> None:
+        """
+        :param close_prices: [[close_price, ...], ...] of each symbol from newest to oldest,
+                             or the NaN padded np.ndarray of them
+        :param current_prices: [current_price, ...] of each symbol, the newest closes by default
+        """
+        if isinstance(close_prices, np.ndarray):
+            self.close_prices = np.atleast_2d(close_prices.astype(np.float64))
+        else:
+            close_prices = [np.asarray(prices, dtype=np.float64) for prices in close_prices]
+            self.close_prices = np.full((len(close_prices), max((len(prices) for prices in close_prices),
+                                                                default=0)), np.nan)
+            for i, prices in enumerate(close_prices):
+                self.close_prices[i, :len(prices)] = prices
+
+        if current_prices is not None:
+            self.current_prices = np.asarray(current_prices, dtype=np.float64)
+        elif self.close_prices.shape[1]:
+            self.current_prices = self.close_prices[:, 0]
+        else:
+            self.current_prices = np.full(len(self.close_prices), np.nan)
+
+    def get_moving_averages(self, ma_specs: Iterable[Tuple[int, int]]) -> np.ndarray:
+        """
+        Get the moving averages of all the symbols for each (timeframe, window)
+
+        :param ma_specs: [(timeframe in hours, window), ...], e.g. [(1, 200), (4, 200)]
+        :return: np.ndarray of shape (<num of ma_specs>, <num of symbols>)
+        """
+        ma_specs = list(ma_specs)
+        moving_averages = np.full((len(ma_specs), len(self.close_prices)), np.nan)
+        windows_by_timeframe = defaultdict(list)
+        for i, (timeframe, window) in enumerate(ma_specs):
+            windows_by_timeframe[timeframe].append((i, window))
+
+        for timeframe, windows in windows_by_timeframe.items():
+            sampled = self.close_prices[:, ::timeframe]
+            if sampled.shape[1] == 0:
+                continue
+            found = ~np.isnan(sampled)
+            sums = np.cumsum(np.where(found, sampled, 0.0), axis=1)
+            counts = np.cumsum(found, axis=1)
+            for i, window in windows:
+                end = min(window, sampled.shape[1]) - 1
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    moving_averages[i] = sums[:, end] / counts[:, end]
+        return moving_averages
+
+    def get_spot_over_ma(self, ma_specs: Iterable[Tuple[int, int]]) -> np.ndarray:
+        """
+        Get whether the current price of each symbol is over its moving average for each (timeframe, window),
+        a symbol without current price or moving average is not over
+
+        :param ma_specs: [(timeframe in hours, window), ...], e.g. [(1, 200), (4, 200)]
+        :return: np.ndarray of bool of shape (<num of ma_specs>, <num of symbols>)
+        """
+        return self.current_prices > self.get_moving_averages(ma_specs)
@@ -0,0 +1,106 @@
+from typing import Dict, List, Tuple, Iterable, Optional
+
+import numpy as np
+
+from smrti_quant_alerts.data_type import StockSymbol
+from smrti_quant_alerts.stock_crypto_api.eod_bulk_store import EodSnapshot
+
+
+class PriceChangeEngine:
+    """
+    NumPy cross-sectional price change engine over all the US stocks.
+
+    The latest snapshot defines the symbol index (sorted unique codes), the snapshot of each timeframe
+    is aligned on it into one (1 + <num of timeframes>, <num of symbols>) price matrix,
+    row 0 holding the latest prices. The price changes of all the timeframes are computed at once,
+    a stock without price at the start of a timeframe has a change of 0.
+    """
+    def __init__(self, latest: EodSnapshot, history: Dict[str, EodSnapshot]) -> None:
+        """
+        :param latest: latest EodSnapshot
+        :param history: {timeframe: EodSnapshot at the start of the timeframe}, e.g. {"1D": ..., "5D": ...}
+        """
+        self.codes, first_index = np.unique(latest.codes, return_index=True)
+        self.timeframes = list(history.keys())
+        self.prices = np.full((len(self.timeframes) + 1, len(self.codes)), np.nan)
+        self.prices[0] = latest.prices[first_index]
+        for i, snapshot in enumerate(history.values(), 1):
+            index = self.get_index(snapshot.codes)
+            found = index >= 0
+            self.prices[i, index[found]] = snapshot.prices[found]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            changes = 100 * (self.prices[0] - self.prices[1:]) / self.prices[1:]
+        # percentage, 1 means 1%
+        self.changes = np.nan_to_num(changes, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def get_index(self, codes: Iterable[str]) -> np.ndarray:
+        """
+        look up the positions of <codes> in the symbol index
+
+        :param codes: ["AAPL", ...] or np.ndarray of codes
+        :return: np.ndarray of positions, -1 for unknown codes
+        """
+        codes = np.asarray(codes if isinstance(codes, np.ndarray) else list(codes), dtype=str)
+        if len(self.codes) == 0 or len(codes) == 0:
+            return np.full(len(codes), -1, dtype=np.int64)
+        index = np.minimum(np.searchsorted(self.codes, codes), len(self.codes) - 1)
+        return np.where(self.codes[index] == codes, index, -1)
+
+    def get_price_changes(self) -> Dict[StockSymbol, Dict[str, float]]:
+        """
+        Get the price changes of all the stocks
+
+        :return: {StockSymbol: {"1D": 0.01, "5D": 0.01, ...}}
+        """
+        changes = self.changes.T.tolist()
+        return {StockSymbol(code): dict(zip(self.timeframes, stock_changes))
+                for code, stock_changes in zip(self.codes.tolist(), changes)}
+
+    def get_sorted(self, timeframe: str) -> List[Tuple[StockSymbol, float]]:
+        """
+        Get all the stocks sorted by the price change of <timeframe>, the largest first
+
+        :param timeframe: e.g. "1D"
+        :return: [(StockSymbol, price_change), ...]
+        """
+        changes = self.changes[self.timeframes.index(timeframe)]
+        order = np.argsort(-changes, kind="stable")
+        return [(StockSymbol(code), change) for code, change in zip(self.codes[order].tolist(),
+                                                                    changes[order].tolist())]
+
+    def get_top_by_group(self, timeframe: str, groups: Dict[str, List[StockSymbol]],
+                         top_percent: Optional[float] = None) -> Dict[str, List[Tuple[StockSymbol, float]]]:
+        """
+        Get the top performers of each group (e.g. GICS sector) by the price change of <timeframe>,
+        the top <top_percent>% of the group size are selected with a partition and sorted,
+        equal changes keep the group order
+
+        :param timeframe: e.g. "5D"
+        :param groups: {group: [StockSymbol, ...]}
+        :param top_percent: percent of the group size to keep, None to keep all the stocks with price
+
+        :return: {group: [(StockSymbol, price_change), ...]}, the largest first,
+                 groups without any stock with price are omitted
+        """
+        changes = self.changes[self.timeframes.index(timeframe)]
+        res = {}
+        for group, stocks in groups.items():
+            index = self.get_index([stock.ticker for stock in stocks])
+            found = np.flatnonzero(index >= 0)
+            if len(found) == 0:
+                continue
+            group_changes = changes[index[found]]
+            num_kept = len(found) if top_percent is None else min(int(len(stocks) * top_percent / 100), len(found))
+            if num_kept == 0:
+                top = found[:0]
+            elif num_kept < len(found):
+                # the partition only finds the cut, the equal changes at the cut are kept in the group order
+                cut = -np.partition(-group_changes, num_kept - 1)[num_kept - 1]
+                above = np.flatnonzero(group_changes > cut)
+                top = np.concatenate([above, np.flatnonzero(group_changes == cut)[:num_kept - len(above)]])
+            else:
+                top = np.arange(len(found))
+            top = top[np.argsort(-group_changes[top], kind="stable")]
+            res[group] = [(stocks[found[i]], float(group_changes[i])) for i in top]
+        return res
@@ -0,0 +1,131 @@
+import json
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from smrti_quant_alerts.settings import Config
+from smrti_quant_alerts.db import init_database_cache, is_database_cache_initialized, ReferenceDataDBUtils
+
+
+class ReferenceDataStore:
+    """
+    Persistent store of the slowly changing reference datasets, e.g. the coingecko coin catalog,
+    in runtime_database/cache.db, the loaded datasets are also kept in memory.
+
+    Each dataset has its own time to live in hours, overridable by "providers.coingecko.reference_ttls"
+    in configs.json. Only a missing dataset is fetched in the caller thread, an expired one is still served
+    while a background thread refreshes it. Empty fetch results are never stored.
+    """
+    DEFAULT_TTLS = {
+        # coin id, symbol and chains of all the coingecko coins
+        "coingecko_coins": 24,
+        # binance base symbol to coingecko coin id
+        "binance_coingecko_ids": 24,
+    }
+
+    # {name: (timestamp of the update, data)}
+    _memory_cache: Dict[str, Tuple[float, Any]] = {}
+    # {name: refresh thread}
+    _refresh_threads: Dict[str, threading.Thread] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_ttl(cls, name: str) -> float:
+        """
+        get the time to live of the dataset <name> in hours
+
+        :param name: dataset name
+        :return: ttl in hours
+        """
+        ttls = {**cls.DEFAULT_TTLS, **Config.PROVIDER_SETTINGS.get("coingecko", {}).get("reference_ttls", {})}
+        return ttls.get(name, 24)
+
+    @classmethod
+    def _load(cls, name: str) -> Optional[Tuple[float, Any]]:
+        if name in cls._memory_cache:
+            return cls._memory_cache[name]
+        if not is_database_cache_initialized():
+            init_database_cache()
+        stored = ReferenceDataDBUtils.get_data(name)
+        if stored is None:
+            return None
+        data, timestamp = stored
+        with cls._lock:
+            cls._memory_cache[name] = (timestamp, json.loads(data))
+        return cls._memory_cache[name]
+
+    @classmethod
+    def get(cls, name: str, fetch: Callable[[], Any]) -> Any:
+        """
+        get the dataset <name>, fetch it if missing, refresh it in the background if expired
+
+        :param name: dataset name
+        :param fetch: function requesting the dataset, returning json serializable data
+        :return: dataset, the fetch result if missing
+        """
+        stored = cls._load(name)
+        if stored is None:
+            return cls.refresh(name, fetch)
+        timestamp, data = stored
+        if time.time() - timestamp >= cls.get_ttl(name) * 3600:
+            with cls._lock:
+                thread = cls._refresh_threads.get(name)
+                if thread is None or not thread.is_alive():
+                    thread = threading.Thread(target=cls._refresh_in_background, args=(name, fetch), daemon=True)
+                    cls._refresh_threads[name] = thread
+                    thread.start()
+        return data
+
+    @classmethod
+    def refresh(cls, name: str, fetch: Callable[[], Any]) -> Any:
+        """
+        fetch the dataset <name> and store it if not empty
+
+        :param name: dataset name
+        :param fetch: function requesting the dataset, returning json serializable data
+        :return: fetch result
+        """
+        data = fetch()
+        if data:
+            if not is_database_cache_initialized():
+                init_database_cache()
+            ReferenceDataDBUtils.set_data(name, json.dumps(data))
+            with cls._lock:
+                cls._memory_cache[name] = (time.time(), data)
+        return data
+
+    @classmethod
+    def _refresh_in_background(cls, name: str, fetch: Callable[[], Any]) -> None:
+        try:
+            cls.refresh(name, fetch)
+        except Exception as e:
+            logging.error(f"reference data {name} refresh error: {e}")
+
+    @classmethod
+    def wait_for_refreshes(cls, timeout: Optional[float] = None) -> None:
+        """
+        wait for the running background refreshes, e.g. before the process exits
+
+        :param timeout: max seconds to wait for each refresh
+        """
+        with cls._lock:
+            threads = list(cls._refresh_threads.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    @classmethod
+    def clear(cls, name: Optional[str] = None) -> None:
+        """
+        delete all the datasets or the one of <name>
+
+        :param name: dataset name
+        """
+        if not is_database_cache_initialized():
+            init_database_cache()
+        ReferenceDataDBUtils.clear(name)
+        with cls._lock:
+            if name:
+                cls._memory_cache.pop(name, None)
+            else:
+                cls._memory_cache = {}
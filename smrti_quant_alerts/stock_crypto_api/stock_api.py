@@ -1,19 +1,24 @@
+import math
 import datetime
 import warnings
+from array import array
 from functools import reduce
-from multiprocessing.pool import ThreadPool
-from typing import List, Dict, Union, Optional, Iterable, Tuple
+from typing import List, Dict, Union, Optional, Iterable, Tuple, Any
 from decimal import Decimal
 from collections import defaultdict
 
-import requests
 import numpy as np
 
 from smrti_quant_alerts.exception import error_handling
+from smrti_quant_alerts.http_api import HttpSessionPool, AsyncBatchFetcher, RequestCoalescer, iter_json_array
 from smrti_quant_alerts.settings import Config
-from smrti_quant_alerts.data_type import StockSymbol, FinancialMetricsData, FinancialDataType, FinancialMetricType
+from smrti_quant_alerts.data_type import StockSymbol, CompanyInfo, FinancialMetricsData, FinancialMetricType, \
+    FinancialMetricsFrame
 from smrti_quant_alerts.stock_crypto_api.utility import get_datetime_now, get_date_from_timestamp
-from smrti_quant_alerts.db import StockAlertDBUtils, init_database_runtime, is_database_runtime_initialized
+from smrti_quant_alerts.stock_crypto_api.eod_bulk_store import EodBulkStore, EodSnapshot
+from smrti_quant_alerts.stock_crypto_api.price_change_engine import PriceChangeEngine
+from smrti_quant_alerts.db import StockAlertDBUtils, init_database_runtime, is_database_runtime_initialized, \
+    init_database_cache, is_database_cache_initialized, StockBarDBUtils
 
 
 warnings.filterwarnings('ignore', category=RuntimeWarning)
@@ -32,15 +37,134 @@ class StockApi:
         "d": 1, "w": 7, "m": 30
     }
     timeframe_dict_reverse = {v: k for k, v in timeframe_dict.items()}
+    # max number of comma separated symbols per FMP batch request
+    BATCH_SIZE = 100
+    # quarterly statements are fetched once per ticker per run with the widest window (6 years for revenue cagr),
+    # narrower views are sliced from it, only the fields in use are kept in memory
+    STATEMENT_WINDOW = 24
+    STATEMENT_FIELDS = {"income-statement": ["revenue", "netIncome", "grossProfit", "operatingIncome"],
+                        "cash-flow-statement": ["freeCashFlow"]}
+    _statement_coalescers = {statement: RequestCoalescer() for statement in STATEMENT_FIELDS}
+    # bar length in minutes of the sma timeframes, daily and intraday bars are kept in the local bar store
+    BAR_MINUTES = {"1min": 1, "5min": 5, "15min": 15, "30min": 30, "1hour": 60, "4hour": 240, "1day": 1440}
+    # the bar store keeps at least this many bars of each timeframe, whatever the sma window of the caller
+    BAR_RETENTION_BARS = 400
+    # regular session of the trading days (weekdays) in US/Eastern, the intraday bars only cover it
+    MARKET_OPEN = datetime.time(9, 30)
+    MARKET_CLOSE = datetime.time(16, 0)
+    # max number of days to walk back from a day without trading
+    EOD_WALK_BACK_DAYS = 10
+    # an empty snapshot is only trusted as a holiday this many days after the date, a more recent one
+    # may just not be published yet, so it is requested again on the next run
+    EOD_EMPTY_SNAPSHOT_MIN_AGE_DAYS = 5
+    # relative change of a stored adjusted close recorded as a split or dividend adjustment
+    EOD_ADJUSTMENT_TOLERANCE = 1e-6
+    # the bulk end of day payload is parsed while it is downloaded, chunk by chunk
+    EOD_STREAM_CHUNK_SIZE = 64 * 1024
+    # metric columns of the financial metrics frames
+    STATS_METRICS = [FinancialMetricType.FREE_CASH_FLOW, FinancialMetricType.NET_INCOME,
+                     FinancialMetricType.FREE_CASH_FLOW_MARGIN, FinancialMetricType.REVENUE,
+                     FinancialMetricType.GROSS_MARGIN, FinancialMetricType.GROSS_PROFIT,
+                     FinancialMetricType.OPERATING_MARGIN]
+    STATS_PERCENTAGE_METRICS = [FinancialMetricType.FREE_CASH_FLOW_MARGIN, FinancialMetricType.GROSS_MARGIN,
+                                FinancialMetricType.OPERATING_MARGIN]
+    GROWTH_SCORE_METRICS = [FinancialMetricType.GROWTH_SCORE, FinancialMetricType.REVENUE_YOY_GROWTH_LATEST,
+                            FinancialMetricType.REVENUE_YOY_GROWTH_SECOND_LATEST,
+                            FinancialMetricType.REVENUE_YOY_GROWTH_SUM,
+                            FinancialMetricType.FREE_CASH_FLOW_MARGIN_LATEST,
+                            FinancialMetricType.FREE_CASH_FLOW_MARGIN_SECOND_LATEST,
+                            FinancialMetricType.FREE_CASH_FLOW_MARGIN_AVG]
 
     def __init__(self) -> None:
         if not is_database_runtime_initialized():
             init_database_runtime("test.db")
+        if not is_database_cache_initialized():
+            init_database_cache()
 
     @staticmethod
     def _parse_eodhd_symbol(symbol: StockSymbol) -> str:
         return f"{symbol.ticker}.{symbol.market}"
 
+    def _get_batched_records(self, endpoint: str, stock_list: Iterable[StockSymbol]) \
+            -> Dict[StockSymbol, Dict[str, Any]]:
+        """
+        Get the records of a FMP endpoint accepting comma separated symbols, e.g. "quote", "profile".
+        Symbols are grouped into batches of BATCH_SIZE, the batches are fetched concurrently
+        and the records are scattered back per ticker.
+
+        :param endpoint: FMP v3 endpoint
+        :param stock_list: [StockSymbol, ...]
+        :return: {StockSymbol: record}, stocks without record are omitted
+        """
+        stocks = {}
+        for stock in stock_list:
+            stocks.setdefault(stock.ticker.upper(), stock)
+        tickers = list(stocks.keys())
+        api_urls = {i: f"{self.FMP_API_URL}/v3/{endpoint}/{','.join(tickers[i:i + self.BATCH_SIZE])}"
+                       f"?apikey={self.FMP_API_KEY}" for i in range(0, len(tickers), self.BATCH_SIZE)}
+
+        res = {}
+        for response in AsyncBatchFetcher.fetch_json(api_urls, "fmp", self.TIMEOUT).values():
+            if not isinstance(response, list):
+                continue
+            for record in response:
+                stock = stocks.get(str(record.get("symbol", "")).upper())
+                if stock is not None:
+                    res[stock] = record
+        return res
+
+    def get_stocks_quotes(self, stock_list: Iterable[StockSymbol]) -> Dict[StockSymbol, Dict[str, Any]]:
+        """
+        Get the latest quotes in batches
+
+        :param stock_list: [StockSymbol, ...]
+        :return: {StockSymbol: {"price": <price>, "marketCap": <market_cap>, "name": <name>, ...}}
+        """
+        return self._get_batched_records("quote", stock_list)
+
+    @classmethod
+    def clear_quarterly_statements(cls) -> None:
+        """
+        drop the quarterly statements fetched in this run
+        """
+        for coalescer in cls._statement_coalescers.values():
+            coalescer.clear()
+
+    def _fetch_quarterly_statements(self, statement: str, stock_list: List[StockSymbol], limit: int) \
+            -> Dict[StockSymbol, Optional[List[Dict[str, float]]]]:
+        """
+        fetch the latest <limit> quarterly statements
+
+        :param statement: "income-statement" or "cash-flow-statement"
+        :param stock_list: [StockSymbol, ...]
+        :param limit: number of quarters
+        :return: {StockSymbol: [{<field>: <value>}, ...] or None if failed}
+        """
+        api_urls = {stock: f"{self.FMP_API_URL}/v3/{statement}/{stock.ticker}?"
+                           f"period=quarter&limit={limit}&apikey={self.FMP_API_KEY}" for stock in stock_list}
+        res = {}
+        for stock, response in AsyncBatchFetcher.fetch_json(api_urls, "fmp", self.TIMEOUT).items():
+            if isinstance(response, list):
+                res[stock] = [{field: quarter.get(field, 0) for field in self.STATEMENT_FIELDS[statement]}
+                              for quarter in response]
+        return res
+
+    def get_quarterly_statements(self, statement: str, stock_list: Iterable[StockSymbol], limit: int) \
+            -> Dict[StockSymbol, List[Dict[str, float]]]:
+        """
+        Get the latest <limit> quarterly statements, newest first.
+        Overlapping requests within a run, also from concurrent threads, share one fetch per ticker.
+
+        :param statement: "income-statement" or "cash-flow-statement"
+        :param stock_list: [StockSymbol, ...]
+        :param limit: number of quarters
+        :return: {StockSymbol: [{<field>: <value>}, ...]}, e.g. {StockSymbol: [{"revenue": 100, ...}, ...]}
+        """
+        statements = self._statement_coalescers[statement].get(
+            stock_list, max(limit, self.STATEMENT_WINDOW),
+            lambda stocks, window: self._fetch_quarterly_statements(statement, stocks, window))
+        return {stock: (response or [])[:limit] for stock, response in statements.items()}
+
     @error_handling("sp500", default_val=[])
     def get_sp_500_list(self) -> List[StockSymbol]:
         """
@@ -49,7 +173,7 @@ class StockApi:
         :return: [StockSymbol, ...]
         """
         api_url = f"{self.FMP_API_URL}/v3/sp500_constituent?apikey={self.FMP_API_KEY}"
-        response = requests.get(api_url, timeout=self.TIMEOUT)
+        response = HttpSessionPool.get(api_url, timeout=self.TIMEOUT)
         response = response.json()
 
         stock_list = [StockSymbol(stock["symbol"], stock["name"], stock["sector"],
@@ -67,7 +191,7 @@ class StockApi:
         :return: [StockSymbol, ...]
         """
         api_url = f"{self.FMP_API_URL}/v3/available-traded/list?apikey={self.FMP_API_KEY}"
-        response = requests.get(api_url, timeout=self.TIMEOUT)
+        response = HttpSessionPool.get(api_url, timeout=self.TIMEOUT)
         response = response.json()
 
         stock_list = [StockSymbol(stock["symbol"], stock["name"], nasdaq=True) for stock in response
@@ -84,7 +208,7 @@ class StockApi:
         :return: [StockSymbol, ...]
         """
         api_url = f"{self.FMP_API_URL}/v3/available-traded/list?apikey={self.FMP_API_KEY}"
-        response = requests.get(api_url, timeout=self.TIMEOUT)
+        response = HttpSessionPool.get(api_url, timeout=self.TIMEOUT)
         response = response.json()
 
         stock_list = [StockSymbol(stock["symbol"], stock["name"], nyse=True) for stock in response
@@ -108,42 +232,132 @@ class StockApi:
                 sector_dict[stock.gics_sector].append(stock)
         return sector_dict
 
-    @error_handling("eodhd", default_val=({}, {}))
-    def get_all_stock_price_volume_by_day_delta(self, day_delta: int = 0) \
-            -> Tuple[Dict[StockSymbol, Decimal], Dict[StockSymbol, Decimal]]:
-        """
-        Get all stock prices for the <day_delta> day from today
+    def _download_eod_bulk_snapshot(self, date: str) -> Optional[EodSnapshot]:
+        """
+        download the end of day snapshot of all US stocks traded on <date>,
+        the rows are filtered while the payload is streamed and written straight into compact arrays
+
+        :param date: "%Y-%m-%d"
+        :return: EodSnapshot, empty if there was no trading on <date>, None if the request failed
+        """
+        url = f"{self.EODHD_API_URL}/eod-bulk-last-day/US?api_token=" \
+              f"{self.EODHD_API_KEY}&date={date}&fmt=json"
+        response = HttpSessionPool.get(url, timeout=self.TIMEOUT, stream=True)
+        codes, prices, volumes = [], array("d"), array("d")
+        try:
+            if response.status_code != 200:
+                return None
+            for stock in iter_json_array(response.iter_content(chunk_size=self.EOD_STREAM_CHUNK_SIZE)):
+                if stock.get("exchange_short_name") == "US" and stock.get("date") == date and stock.get("code") \
+                        and (stock.get("adjusted_close") or 0) > 0 and (stock.get("volume") or 0) > 0:
+                    codes.append(stock["code"].upper())
+                    prices.append(stock["adjusted_close"])
+                    volumes.append(stock["volume"])
+        finally:
+            response.close()
+        return EodSnapshot(np.array(codes, dtype=str), np.frombuffer(prices, dtype=np.float64),
+                           np.frombuffer(volumes, dtype=np.float64))
+
+    def _update_eod_adjustments(self, date: str) -> bool:
+        """
+        Before the snapshot of a new newest trading <date> is stored, download the newest stored trading day
+        again, the changes of its adjusted closes are the splits and dividends since, they are recorded
+        as the adjustment factors of all the snapshots stored so far
+
+        :param date: "%Y-%m-%d"
+        :return: False if the newest stored trading day could not be downloaded
+        """
+        stored_dates = EodBulkStore.get_dates()
+        if stored_dates and stored_dates[-1] >= date:
+            return True
+        for reference_date in reversed(stored_dates):
+            stored = EodBulkStore.load(reference_date)
+            if len(stored.codes):
+                break
+        else:
+            return True
+
+        fresh = self._download_eod_bulk_snapshot(reference_date)
+        if fresh is None or not len(fresh.codes):
+            return False
+        codes, stored_index, fresh_index = np.intersect1d(stored.codes, fresh.codes,
+                                                          return_indices=True)
+        factors = fresh.prices[fresh_index] / stored.prices[stored_index]
+        adjusted = np.abs(factors - 1) > self.EOD_ADJUSTMENT_TOLERANCE
+        if adjusted.any():
+            EodBulkStore.save_adjustment(date, codes[adjusted], factors[adjusted])
+        return True
+
+    @error_handling("eodhd", default_val=("", EodSnapshot.empty()))
+    def get_eod_bulk_snapshot(self, day_delta: int = 0) -> Tuple[str, EodSnapshot]:
+        """
+        Get the end of day snapshot of all US stocks for the <day_delta> day from today,
+        walk back to the previous trading day on weekends and holidays.
+        Finished days are kept in EodBulkStore, so each of them is only downloaded once,
+        days without trading only once they are EOD_EMPTY_SNAPSHOT_MIN_AGE_DAYS days old.
+        The stored adjusted closes are kept up to date with the splits and dividends detected
+        whenever a new newest trading day is stored.
 
         :param day_delta: int
-        :return: {StockSymbol: price}, {StockSymbol: volume}
+        :return: (date, EodSnapshot), ("", empty EodSnapshot) if no trading day is found
         """
         today = get_datetime_now()
+        today_str = today.strftime("%Y-%m-%d")
+        holiday_date_str = (today - datetime.timedelta(days=self.EOD_EMPTY_SNAPSHOT_MIN_AGE_DAYS)).strftime("%Y-%m-%d")
         target_date = today - datetime.timedelta(days=day_delta)
-        if target_date.weekday() > 4:
-            target_date -= datetime.timedelta(days=target_date.weekday() - 4)
 
-        response = None
-        target_date_str = target_date.strftime("%Y-%m-%d")
-        while response is None or response.status_code != 200 or not response.json():
+        for _ in range(self.EOD_WALK_BACK_DAYS):
+            if target_date.weekday() > 4:
+                target_date -= datetime.timedelta(days=target_date.weekday() - 4)
             target_date_str = target_date.strftime("%Y-%m-%d")
-            url = f"{self.EODHD_API_URL}/eod-bulk-last-day/US?api_token=" \
-                  f"{self.EODHD_API_KEY}&date={target_date_str}&fmt=json"
-            response = requests.get(url, timeout=self.TIMEOUT)
+            snapshot = EodBulkStore.load(target_date_str)
+            if snapshot is None or (not len(snapshot.codes) and target_date_str > holiday_date_str):
+                snapshot = self._download_eod_bulk_snapshot(target_date_str)
+                # today's snapshot may still be incomplete, a recent empty one may not be published yet
+                if snapshot is not None and target_date_str < today_str and \
+                        (len(snapshot.codes) or target_date_str <= holiday_date_str) and \
+                        (not len(snapshot.codes) or self._update_eod_adjustments(target_date_str)):
+                    EodBulkStore.save(target_date_str, snapshot)
+                    EodBulkStore.prune(today)
+            if snapshot is not None and len(snapshot.codes):
+                return target_date_str, snapshot
             target_date -= datetime.timedelta(days=1)
+        return "", EodSnapshot.empty()
+
+    def get_all_stock_price_volume_by_day_delta(self, day_delta: int = 0) \
+            -> Tuple[Dict[StockSymbol, Decimal], Dict[StockSymbol, Decimal]]:
+        """
+        Get all stock prices for the <day_delta> day from today
 
+        :param day_delta: int
+        :return: {StockSymbol: price}, {StockSymbol: volume}
+        """
+        _, snapshot = self.get_eod_bulk_snapshot(day_delta)
         prices = {}
         volumes = {}
-        for stock in response.json():
-            if stock.get("code") and stock.get("adjusted_close") and \
-                    stock.get("adjusted_close") > 0 and stock.get("volume") > 0 and \
-                    stock.get("date") == target_date_str and stock.get("exchange_short_name") == "US":
-                prices[StockSymbol(stock["code"].upper())] = Decimal(stock["adjusted_close"])
-                volumes[StockSymbol(stock["code"].upper())] = Decimal(stock["volume"])
+        for code, price, volume in zip(snapshot.codes.tolist(), snapshot.prices.tolist(), snapshot.volumes.tolist()):
+            prices[StockSymbol(code)] = Decimal(price)
+            volumes[StockSymbol(code)] = Decimal(volume)
         return prices, volumes
 
+    def get_price_change_engine(self, timeframe_list: Optional[List[str]] = None) -> PriceChangeEngine:
+        """
+        Get the price change engine of all the US stocks over the timeframes
+
+        :param timeframe_list: ["1D", "5D", "1M", "3M", "6M", "1Y", "3Y", "5Y", "10Y"]
+        :return: PriceChangeEngine
+        """
+        if not timeframe_list:
+            timeframe_list = ["1D", "5D", "1M", "3M", "6M", "1Y", "3Y", "5Y", "10Y"]
+
+        _, latest = self.get_eod_bulk_snapshot(1)
+        history = {timeframe: self.get_eod_bulk_snapshot(self.timeframe_dict[timeframe] + 1)[1]
+                   for timeframe in timeframe_list}
+        return PriceChangeEngine(latest, history)
+
     def get_all_stock_price_change_percentage(
             self, timeframe_list: Optional[List[str]] = None) \
-            -> Dict[StockSymbol, Dict[str, Decimal]]:
+            -> Dict[StockSymbol, Dict[str, float]]:
         """
         Get adjusted stock price change percentage, 1D, 5D, 1M, 3M, 6M, 1Y, 3Y, 5Y
 
@@ -153,62 +367,22 @@ class StockApi:
                 {StockSymbol: {"1D": 0.01, "5D": 0.01, "1M": 0.01, "3M": 0.01,
                 "6M": 0.01, "1Y": 0.01, "3Y": 0.01}}
         """
-        if not timeframe_list:
-            timeframe_list = ["1D", "5D", "1M", "3M", "6M", "1Y", "3Y", "5Y", "10Y"]
-
-        timeframe_deltas = [self.timeframe_dict[timeframe] + 1 for timeframe in timeframe_list]
-
-        res = defaultdict(dict)
-
-        today_day_delta = 1
-        today_price_dict = {}
-        while not today_price_dict or all(value == Decimal("0.0") for value in today_price_dict.values()):
-            today_price_dict, _ = self.get_all_stock_price_volume_by_day_delta(1)
-            today_day_delta += 1
-        history_price_dicts = {}
-
-        for i, timeframe_delta in enumerate(timeframe_deltas):
-            history_price_dicts[timeframe_list[i]], _ = \
-                self.get_all_stock_price_volume_by_day_delta(timeframe_delta)
-
-        # post-processing
-        for stock, today_price in today_price_dict.items():
-            price_change = {}
-            for timeframe, history_price_dict in history_price_dicts.items():
-                if stock in history_price_dict:
-                    price_change[timeframe] = \
-                        100 * (today_price - history_price_dict[stock]) / history_price_dict[stock]
-                else:
-                    price_change[timeframe] = Decimal(0)
-            res[stock] = price_change
-        return res
+        return self.get_price_change_engine(timeframe_list).get_price_changes()
 
     def get_all_non_etf_stocks_price_change_percentage_by_gics_sector_timeframes(
-            self, timeframes: List[str]) -> Dict[str, Dict[str, List[Tuple[StockSymbol, Decimal]]]]:
+            self, timeframes: List[str], top_percent: Optional[float] = None) \
+            -> Dict[str, Dict[str, List[Tuple[StockSymbol, float]]]]:
         """
         Get sorted price change percentage for all non-ETF stocks grouped by GICS sector
 
         :param timeframes: ["1D", "5D", "1M", "3M", "6M", "1Y", "3Y", "5Y"]
+        :param top_percent: only keep the top <top_percent>% of each sector, None to keep all
 
         :return: {timeframe: {sector: [(StockSymbol, price_change_percentage), ...], ...}}
         """
         all_stocks = self.get_all_non_etf_stocks_by_gics_sector()
-        price_change_percentage = defaultdict(dict)
-        stock_price_change_percentage = self.get_all_stock_price_change_percentage(timeframes)
-        for sector, stock_list in all_stocks.items():
-            for stock in stock_list:
-                if stock in stock_price_change_percentage:
-                    for timeframe in timeframes:
-                        if sector not in price_change_percentage[timeframe]:
-                            price_change_percentage[timeframe][sector] = []
-
-                        price_change_percentage[timeframe][sector].append(
-                            (stock, stock_price_change_percentage[stock][timeframe]))
-        for timeframe in timeframes:
-            for sector in price_change_percentage[timeframe]:
-                price_change_percentage[timeframe][sector] = sorted(price_change_percentage[timeframe][sector],
-                                                                    key=lambda x: x[1], reverse=True)
-        return price_change_percentage
+        engine = self.get_price_change_engine(timeframes)
+        return {timeframe: engine.get_top_by_group(timeframe, all_stocks, top_percent) for timeframe in timeframes}
 
     @error_handling("financialmodelingprep", default_val=[])
     def get_stock_info(self, stock_list: Iterable[StockSymbol]) -> List[StockSymbol]:
@@ -225,9 +399,8 @@ class StockApi:
 
         if not stocks_without_info:
             # preserve the order
-            for stock in stock_list:
-                res.append(stocks_with_info[stocks_with_info.index(stock)])
-            return res
+            stocks_with_info = {stock: stock for stock in stocks_with_info}
+            return [stocks_with_info[stock] for stock in stock_list]
 
         # preprocess the StockSymbol list
         stocks = []
@@ -239,25 +412,18 @@ class StockApi:
                     stocks.append(StockSymbol(stock.ticker_alias))
                 stocks.append(stock)
 
-        for i in range(len(stocks) // 100 + 1):
-            stocks_sub = stocks[i * 100:(i + 1) * 100]
-            stock_str = ",".join([stock.ticker for stock in stocks_sub])
-
-            api_url = f"{self.FMP_API_URL}/v3/profile/{stock_str}?apikey={self.FMP_API_KEY}"
-            response = requests.get(api_url, timeout=self.TIMEOUT)
-            response = response.json()
-            res += [StockSymbol(stock["symbol"], stock["companyName"], stock["sector"],
-                                stock["industry"], f"{stock['city']}, {stock['state']}, {stock['country']}",
-                                stock["cik"], stock["ipoDate"])
-                    for stock in response]
-        StockAlertDBUtils.add_stocks_info(res)
+        company_info = {stock["symbol"]: CompanyInfo(stock["companyName"] or "", stock["sector"] or "",
+                                                     stock["industry"] or "",
+                                                     f"{stock['city']}, {stock['state']}, {stock['country']}",
+                                                     stock["cik"] or "", stock["ipoDate"] or "")
+                        for stock in self._get_batched_records("profile", stocks).values()}
+        StockSymbol.load_company_info(company_info)
+        fetched_stocks = [StockSymbol(ticker) for ticker in company_info]
+        StockAlertDBUtils.add_stocks_info(fetched_stocks)
+        res += fetched_stocks
         # preserve the order
-        res += stocks_with_info
-        result = []
-        for stock in stock_list:
-            result.append(res[res.index(stock)])
-
-        return result
+        res = {stock: stock for stock in res + stocks_with_info}
+        return [res[stock] for stock in stock_list]
 
     @error_handling("eodhd", default_val={})
     def get_top_market_cap_stocks(self, top_n: int = 100) -> List[List[Union[FinancialMetricsData, StockSymbol]]]:
@@ -281,7 +447,7 @@ class StockApi:
                           f'[["market_capitalization","<",{last_market_cap}],' \
                           f'["exchange","=","us"]]&limit=100&offset={offset}'
                 offset += 100 if n % 100 == 0 else n % 100
-                response = requests.get(api_url, timeout=self.TIMEOUT)
+                response = HttpSessionPool.get(api_url, timeout=self.TIMEOUT)
                 response = response.json().get("data", [])
 
                 for stock in response:
@@ -306,48 +472,146 @@ class StockApi:
         """
         all_stocks = self.get_nasdaq_list() + self.get_nyse_list()
         all_stocks = [stock for stock in all_stocks if stock.ticker and len(stock.ticker) < 5]
-        res = []
-        n = len(all_stocks) // 100 + 1
-        for i in range(n):
-            symbols = ",".join([stock.ticker for stock in all_stocks[i * 100:(i + 1) * 100]])
-            api_url = f"{self.FMP_API_URL}/v3/quote/{symbols}?apikey={self.FMP_API_KEY}"
-            response = requests.get(api_url, timeout=self.TIMEOUT)
-            response = response.json()
-            for stock in response:
-                if stock.get("marketCap", 0) >= market_cap_threshold:
-                    res.append(StockSymbol(stock["symbol"], stock["name"]))
+        return [StockSymbol(quote["symbol"], quote["name"]) for quote in self.get_stocks_quotes(all_stocks).values()
+                if (quote.get("marketCap") or 0) >= market_cap_threshold]
 
-        return res
+    @classmethod
+    def _get_bar_lookback_days(cls, timeframe: str, num_of_bars: int) -> int:
+        """
+        get the number of calendar days covering <num_of_bars> bars, a trading day has 6.5 hours
+
+        :param timeframe: "1day", "4hour", ...
+        :param num_of_bars: number of bars
+        :return: number of days
+        """
+        bars_per_day = 1 if timeframe == "1day" else math.ceil(390 / cls.BAR_MINUTES[timeframe])
+        # 5 trading days a week, plus holidays
+        return math.ceil(num_of_bars / bars_per_day) * 7 // 5 + 10
+
+    @classmethod
+    def _get_bar_end(cls, date: str, timeframe: str) -> datetime.datetime:
+        """
+        get the end time of a bar
+
+        :param date: start time of the bar, in US/Eastern
+        :param timeframe: "1day", "4hour", ...
+        :return: datetime in US/Eastern, without tzinfo
+        """
+        start = datetime.datetime.strptime(date, "%Y-%m-%d" if timeframe == "1day" else "%Y-%m-%d %H:%M:%S")
+        return start + datetime.timedelta(minutes=cls.BAR_MINUTES[timeframe])
+
+    @classmethod
+    def _get_next_bar_end(cls, date: str, timeframe: str) -> datetime.datetime:
+        """
+        get the end time of the bar after the one starting at <date>, the next daily bar is the one
+        of the next trading day, the next intraday bar starts at the next open after the end of the session
+
+        :param date: start time of the bar, in US/Eastern
+        :param timeframe: "1day", "4hour", ...
+        :return: datetime in US/Eastern, without tzinfo
+        """
+        end = cls._get_bar_end(date, timeframe)
+        if timeframe != "1day" and end.time() < cls.MARKET_CLOSE:
+            next_start = end
+        else:
+            next_day = end if timeframe == "1day" else end + datetime.timedelta(days=1)
+            while next_day.weekday() > 4:
+                next_day += datetime.timedelta(days=1)
+            next_start = next_day if timeframe == "1day" else \
+                datetime.datetime.combine(next_day.date(), cls.MARKET_OPEN)
+        return next_start + datetime.timedelta(minutes=cls.BAR_MINUTES[timeframe])
+
+    @classmethod
+    def _is_bar_store_stale(cls, latest_date: str, timeframe: str, now: datetime.datetime) -> bool:
+        """
+        only complete bars are stored, a new complete bar can only exist once the bar of the trading
+        session after the latest stored one has ended, so weekends do not make the bars stale
+
+        :param latest_date: start time of the latest stored bar, in US/Eastern
+        :param timeframe: "1day", "4hour", ...
+        :param now: datetime now in US/Eastern
+        :return: whether the stored bars need an update
+        """
+        return now.replace(tzinfo=None) >= cls._get_next_bar_end(latest_date, timeframe)
+
+    def update_stock_bars(self, stock_list: Iterable[StockSymbol], timeframe: str, num_of_bars: int) -> None:
+        """
+        Update the local bar store incrementally.
+        Stocks without bars get the latest <num_of_bars> bars, stocks with stale bars only get
+        the bars since the latest stored one, stocks with up-to-date bars are not requested.
+        The bar still forming is not stored, the bars older than the lookback window of
+        BAR_RETENTION_BARS bars, or <num_of_bars> if more, are deleted.
+
+        :param stock_list: [StockSymbol, ...]
+        :param timeframe: "1min", "5min", "15min", "30min", "1hour", "4hour" or "1day"
+        :param num_of_bars: number of bars needed
+        """
+        now = get_datetime_now()
+        to_date = now.strftime("%Y-%m-%d")
+        lookback_date = (now - datetime.timedelta(days=self._get_bar_lookback_days(timeframe, num_of_bars))) \
+            .strftime("%Y-%m-%d")
+        retention_bars = max(num_of_bars, self.BAR_RETENTION_BARS)
+        retention_date = (now - datetime.timedelta(days=self._get_bar_lookback_days(timeframe, retention_bars))) \
+            .strftime("%Y-%m-%d")
+        stocks = {stock.ticker: stock for stock in stock_list}
+        bar_stats = StockBarDBUtils.get_bar_stats(stocks.keys(), timeframe)
+
+        api_urls = {}
+        for ticker in stocks:
+            count, latest_date = bar_stats.get(ticker, (0, None))
+            if latest_date is None:
+                from_date = lookback_date
+            elif self._is_bar_store_stale(latest_date, timeframe, now):
+                from_date = lookback_date if count < num_of_bars else latest_date[:10]
+            else:
+                continue
+            if timeframe == "1day":
+                api_urls[ticker] = f"{self.FMP_API_URL}/v3/historical-price-full/{ticker}?serietype=line" \
+                                   f"&from={from_date}&to={to_date}&apikey={self.FMP_API_KEY}"
+            else:
+                api_urls[ticker] = f"{self.FMP_API_URL}/v3/historical-chart/{timeframe}/{ticker}" \
+                                   f"?from={from_date}&to={to_date}&apikey={self.FMP_API_KEY}"
+
+        bars = {}
+        now = now.replace(tzinfo=None)
+        for ticker, response in AsyncBatchFetcher.fetch_json(api_urls, "fmp", self.TIMEOUT).items():
+            if isinstance(response, dict):
+                response = response.get("historical")
+            if isinstance(response, list):
+                bars[ticker] = [(bar["date"], float(bar["close"])) for bar in response
+                                if bar.get("date") and bar.get("close") is not None
+                                and self._get_bar_end(bar["date"], timeframe) <= now]
+        StockBarDBUtils.add_bars(timeframe, bars, retention_date)
 
     @error_handling("financialmodelingprep", default_val={})
     def get_close_price_sma_status(self, stock_list: List[StockSymbol], num_of_days_list: List[int],
                                    timeframes: List[str]) -> Dict[StockSymbol, Dict[str, bool]]:
         """
-        Get the mapping for whether the close price is higher than sma
+        Get the mapping for whether the close price is higher than sma,
+        the sma is computed from the local bar store, stocks without enough bars are omitted
         :param stock_list: [StockSymbol, ...]
         :param num_of_days_list: [int, ...], e.g. [200, 400] for sma200, sma400
         :param timeframes: [str, ...], i.e. ["1min", "5min", "15min", "30min", "1hour", "4hour", "1day"]
         :return: {StockSymbol: {"1min": True, "5min": False, "15min": True, "30min": False}}
         """
         res = defaultdict(dict)
-        for stock in stock_list:
-            close_price_url = f"{self.FMP_API_URL}/v3/quote-short/{stock}?apikey={self.FMP_API_KEY}"
-            response = requests.get(close_price_url, timeout=self.TIMEOUT).json()
-            if not response:
+        close_prices = {stock: quote.get("price") or 0 for stock, quote in self.get_stocks_quotes(stock_list).items()}
+        stocks = list(close_prices.keys())
+        # the bars of a timeframe are fetched once for its longest sma
+        lookback_bars = defaultdict(int)
+        for num_of_bars, timeframe in zip(num_of_days_list, timeframes):
+            lookback_bars[timeframe] = max(lookback_bars[timeframe], num_of_bars)
+
+        for num_of_bars, timeframe in zip(num_of_days_list, timeframes):
+            self.update_stock_bars(stocks, timeframe, lookback_bars[timeframe])
+            closes = StockBarDBUtils.get_closes([stock.ticker for stock in stocks], timeframe, num_of_bars)
+            sma_stocks = [stock for stock in stocks if len(closes.get(stock.ticker, [])) == num_of_bars]
+            if not sma_stocks:
                 continue
-            close_price = response[0].get("price", 0)
-
-            for num_of_day, timeframe in zip(num_of_days_list, timeframes):
-                from_day = get_datetime_now() - datetime.timedelta(days=2)
-                sma_url = f"{self.FMP_API_URL}/v3/technical_indicator/{timeframe}/{stock}" \
-                          f"?type=sma&period={num_of_day}&apikey={self.FMP_API_KEY}" \
-                          f"&from={from_day.strftime('%Y-%m-%d')}"
-                response = requests.get(sma_url, timeout=self.TIMEOUT).json()
-                if not response:
-                    continue
-                sma = response[0].get("sma", 0)
-
-                res[stock][timeframe] = close_price > sma
+            sma = np.array([closes[stock.ticker] for stock in sma_stocks]).mean(axis=1)
+            above_sma = np.array([close_prices[stock] for stock in sma_stocks], dtype=float) > sma
+            for stock, is_above_sma in zip(sma_stocks, above_sma):
+                res[stock][timeframe] = bool(is_above_sma)
         return res
 
     @error_handling("financialmodelingprep", default_val={})
@@ -356,16 +620,54 @@ class StockApi:
         Get stock market cap
 
         :param stock_list: [StockSymbol, ...]
-        :return: {StockSymbol: market_cap}
+        :return: {StockSymbol: market_cap}, stocks without market cap are omitted
         """
         res = defaultdict(FinancialMetricsData)
-        for stock in stock_list:
-            api_url = f"{self.FMP_API_URL}/v3/market-capitalization/{stock.ticker}?apikey={self.FMP_API_KEY}"
-            response = requests.get(api_url, timeout=self.TIMEOUT).json()
-            if response:
-                res[stock] = FinancialMetricsData(response[0].get("marketCap", 0))
+        for stock, quote in self.get_stocks_quotes(stock_list).items():
+            market_cap = quote.get("marketCap", 0)
+            if market_cap is not None:
+                res[stock] = FinancialMetricsData(market_cap)
         return res
 
+    def get_stocks_stats_frame(self, stock_list: List[StockSymbol], timeframe: str, num: int) \
+            -> FinancialMetricsFrame:
+        """
+        Get stock free cash flow, net income, revenue, gross profit and the margins as a columnar frame,
+        the quarters are summed up into timeframes and the margins computed as whole-array expressions
+
+        :param stock_list: [StockSymbol, ...]
+        :param timeframe: str, "quarter" or "semi" or "annual"
+        :param num: int, number of timeframes
+        :return: FinancialMetricsFrame of STATS_METRICS, stocks without statements are all 0
+        """
+        frame = FinancialMetricsFrame(stock_list, num, self.STATS_METRICS, self.STATS_PERCENTAGE_METRICS)
+        step = {"quarter": 1, "semi": 2, "annual": 4}[timeframe]
+        income_statements = self.get_quarterly_statements("income-statement", stock_list, step * num)
+        cash_flow_statements = self.get_quarterly_statements("cash-flow-statement", stock_list, step * num)
+
+        income_fields = self.STATEMENT_FIELDS["income-statement"]
+        # (stocks, quarters, income fields + free cash flow)
+        quarters = np.zeros((len(frame), step * num, len(income_fields) + 1))
+        for i, stock in enumerate(frame.stocks):
+            income_statement, cash_flow_statement = income_statements.get(stock), cash_flow_statements.get(stock)
+            if not income_statement or not cash_flow_statement:
+                continue
+            for j, quarter in enumerate(income_statement):
+                quarters[i, j, :-1] = [quarter.get(field) or 0 for field in income_fields]
+            for j, quarter in enumerate(cash_flow_statement):
+                quarters[i, j, -1] = quarter.get("freeCashFlow") or 0
+        revenues, net_incomes, gross_profits, operating_incomes, free_cash_flows = \
+            np.moveaxis(quarters.reshape(len(frame), num, step, -1).sum(axis=2), -1, 0)
+
+        frame[FinancialMetricType.REVENUE] = revenues
+        frame[FinancialMetricType.NET_INCOME] = net_incomes
+        frame[FinancialMetricType.GROSS_PROFIT] = gross_profits
+        frame[FinancialMetricType.FREE_CASH_FLOW] = free_cash_flows
+        frame[FinancialMetricType.GROSS_MARGIN] = frame.safe_divide(gross_profits, revenues)
+        frame[FinancialMetricType.OPERATING_MARGIN] = frame.safe_divide(operating_incomes, revenues)
+        frame[FinancialMetricType.FREE_CASH_FLOW_MARGIN] = frame.safe_divide(free_cash_flows, revenues)
+        return frame
+
     def get_stocks_stats_by_num_of_timeframe(self, stock_list: List[StockSymbol], timeframe: str, num: int) \
             -> Dict[StockSymbol, List[Dict[str, FinancialMetricsData]]]:
         """
@@ -378,66 +680,7 @@ class StockApi:
                   "free_cash_flow_margin": FinancialMetricsData, "revenue": FinancialMetricsData,
                   "gross_margin": FinancialMetricsData, "operating_margin": FinancialMetricsData}}
         """
-        res = defaultdict(list)
-        timeframes = {"quarter": 1, "semi": 2, "annual": 4}
-        empty_res = [{FinancialMetricType.FREE_CASH_FLOW: FinancialMetricsData(has_percentage=False),
-                     FinancialMetricType.NET_INCOME: FinancialMetricsData(has_percentage=False),
-                     FinancialMetricType.FREE_CASH_FLOW_MARGIN: FinancialMetricsData(has_percentage=True),
-                     FinancialMetricType.REVENUE: FinancialMetricsData(has_percentage=False),
-                     FinancialMetricType.GROSS_MARGIN: FinancialMetricsData(has_percentage=True),
-                     FinancialMetricType.GROSS_PROFIT: FinancialMetricsData(has_percentage=False),
-                     FinancialMetricType.OPERATING_MARGIN: FinancialMetricsData(has_percentage=True)}]
-
-        @error_handling("financialmodelingprep", default_val=None)
-        def get_stock_stats_by_num_of_quarter(stock: StockSymbol) -> None:
-            api_url = f"{self.FMP_API_URL}/v3/income-statement/{stock.ticker}?" \
-                      f"period=quarter&limit={timeframes[timeframe] * num}&apikey={self.FMP_API_KEY}"
-            response = requests.get(api_url, timeout=self.TIMEOUT).json()
-            if not response:
-                res[stock] = empty_res * num
-                return
-            revenues, net_incomes, gross_profits, operating_incomes = \
-                np.zeros(num), np.zeros(num), np.zeros(num), np.zeros(num)
-
-            for i, quarter in enumerate(response):
-                revenues[i // timeframes[timeframe]] += quarter.get("revenue", 0)
-                net_incomes[i // timeframes[timeframe]] += quarter.get("netIncome", 0)
-                gross_profits[i // timeframes[timeframe]] += quarter.get("grossProfit", 0)
-                operating_incomes[i // timeframes[timeframe]] += quarter.get("operatingIncome", 0)
-
-            gross_margins = gross_profits / revenues
-            operating_margins = operating_incomes / revenues
-
-            api_url = f"{self.FMP_API_URL}/v3/cash-flow-statement/{stock.ticker}?" \
-                      f"period=quarter&limit={timeframes[timeframe] * num}&apikey={self.FMP_API_KEY}"
-            response = requests.get(api_url, timeout=self.TIMEOUT).json()
-            if not response:
-                res[stock] = empty_res * num
-                return
-            free_cash_flows = np.zeros(num)
-            for i, quarter in enumerate(response):
-                free_cash_flows[i // timeframes[timeframe]] += quarter.get("freeCashFlow", 0)
-
-            free_cash_flow_margins = free_cash_flows / revenues
-            res[stock] = [{FinancialMetricType.FREE_CASH_FLOW: FinancialMetricsData(free_cash_flow),
-                           FinancialMetricType.NET_INCOME: FinancialMetricsData(net_income),
-                           FinancialMetricType.FREE_CASH_FLOW_MARGIN:
-                               FinancialMetricsData(free_cash_flow_margin, has_percentage=True),
-                           FinancialMetricType.REVENUE: FinancialMetricsData(revenue),
-                           FinancialMetricType.GROSS_MARGIN: FinancialMetricsData(gross_margin, has_percentage=True),
-                           FinancialMetricType.GROSS_PROFIT: FinancialMetricsData(gross_profit),
-                           FinancialMetricType.OPERATING_MARGIN:
-                               FinancialMetricsData(operating_margin, has_percentage=True)}
-                          for free_cash_flow, net_income, free_cash_flow_margin,
-                          revenue, gross_margin, gross_profit, operating_margin in
-                          zip(free_cash_flows, net_incomes, free_cash_flow_margins,
-                              revenues, gross_margins, gross_profits, operating_margins)]
-        pool = ThreadPool(8)
-        pool.map(get_stock_stats_by_num_of_quarter, stock_list)
-        pool.close()
-        pool.join()
-
-        return res
+        return defaultdict(list, self.get_stocks_stats_frame(stock_list, timeframe, num).to_dict())
 
     def get_stocks_revenue_cagr(self, stock_list: List[StockSymbol]) \
             -> Dict[StockSymbol, Dict[str, FinancialMetricsData]]:
@@ -448,12 +691,11 @@ class StockApi:
         :return: {StockSymbol: {"revenue_1y_cagr": str, "revenue_3y_cagr": str, "revenue_5y_cagr": str}}
         """
         res = defaultdict(dict)
+        responses = self.get_quarterly_statements("income-statement", stock_list, 24)
 
         @error_handling("financialmodelingprep", default_val=None)
         def get_stock_revenue_cagr(stock: StockSymbol) -> None:
-            api_url = f"{self.FMP_API_URL}/v3/income-statement/{stock.ticker}?" \
-                      f"period=quarter&limit=24&apikey={self.FMP_API_KEY}"
-            response = requests.get(api_url, timeout=self.TIMEOUT).json()
+            response = responses.get(stock)
             res[stock] = {f"revenue_{i}y_cagr": FinancialMetricsData(has_percentage=True) for i in [1, 3, 5]}
             if not response:
                 return
@@ -471,10 +713,8 @@ class StockApi:
                         if not isinstance(division, complex):
                             res[stock][f"revenue_{i}y_cagr"] = FinancialMetricsData(division - 1, has_percentage=True)
 
-        pool = ThreadPool(8)
-        pool.map(get_stock_revenue_cagr, stock_list)
-        pool.close()
-        pool.join()
+        for stock in stock_list:
+            get_stock_revenue_cagr(stock)
 
         return res
 
@@ -495,7 +735,7 @@ class StockApi:
         from_str = from_date.strftime("%Y-%m-%d")
         api_url = f"{self.EODHD_API_URL}/eod/{self._parse_eodhd_symbol(stock)}?api_token={self.EODHD_API_KEY}" \
                   f"&fmt=json&from={from_str}&period={timeframe}"
-        response = requests.get(api_url, timeout=self.TIMEOUT).json()[::-1]
+        response = HttpSessionPool.get(api_url, timeout=self.TIMEOUT).json()[::-1]
         res = [(tick["date"], float(tick["adjusted_close"]))
                for i, tick in enumerate(response)][:num_of_ticks]
         # prepend latest close price
@@ -514,7 +754,7 @@ class StockApi:
         """
         api_url = f"{self.EODHD_API_URL}/real-time/{self._parse_eodhd_symbol(stock)}?api_token={self.EODHD_API_KEY}" \
                   f"&fmt=json"
-        response = requests.get(api_url, timeout=self.TIMEOUT).json()
+        response = HttpSessionPool.get(api_url, timeout=self.TIMEOUT).json()
         if not isinstance(response["timestamp"], int):
             return "", 0
         return get_date_from_timestamp(response["timestamp"] * 1000), float(response["close"])
@@ -533,7 +773,7 @@ class StockApi:
         res = []
         while True:
             url = f"{api_url}&page={page}"
-            response = requests.get(url, timeout=self.TIMEOUT).json()
+            response = HttpSessionPool.get(url, timeout=self.TIMEOUT).json()
             if not response:
                 break
 
@@ -565,9 +805,9 @@ class StockApi:
         :return: {StockSymbol: [date_new, shares_new, date_old, shares_old]}
         """
         res = defaultdict(dict)
-        for stock in stock_list:
-            api_url = f"{self.FMP_API_URL}/v4/historical/shares_float?symbol={stock.ticker}&apikey={self.FMP_API_KEY}"
-            response = requests.get(api_url, timeout=self.TIMEOUT).json()
+        api_urls = {stock: f"{self.FMP_API_URL}/v4/historical/shares_float?symbol={stock.ticker}"
+                           f"&apikey={self.FMP_API_KEY}" for stock in stock_list}
+        for stock, response in AsyncBatchFetcher.fetch_json(api_urls, "fmp", self.TIMEOUT).items():
             if response:
                 try:
                     date_now, floating_shares_now = \
@@ -601,10 +841,9 @@ class StockApi:
         """
         res = defaultdict(FinancialMetricsData)
         market_caps = self.get_stocks_market_cap(stock_list)
-        for stock in stock_list:
-            api_url = f"{self.FMP_API_URL}/v3/balance-sheet-statement/{stock.ticker}?" \
-                      f"period=quarter&apikey={self.FMP_API_KEY}"
-            response = requests.get(api_url, timeout=self.TIMEOUT).json()
+        api_urls = {stock: f"{self.FMP_API_URL}/v3/balance-sheet-statement/{stock.ticker}?"
+                           f"period=quarter&apikey={self.FMP_API_KEY}" for stock in stock_list}
+        for stock, response in AsyncBatchFetcher.fetch_json(api_urls, "fmp", self.TIMEOUT).items():
             if response:
                 res[stock] = FinancialMetricsData(
                     response[0].get("totalLiabilities", 0) + market_caps[stock].float_data -
@@ -625,12 +864,10 @@ class StockApi:
             if stats and len(stats) > 0:
                 gross_profits[stock] = stats[0].get(FinancialMetricType.GROSS_PROFIT, 0)
         estimated_revenue_growth = defaultdict(lambda: FinancialMetricsData(0, has_percentage=True))
-        for stock in stock_list:
-            if gross_profits[stock] == 0 or enterprise_values[stock] == 0:
-                continue
-            estimated_revenue_url = f"{self.FMP_API_URL}/v3/analyst-estimates/" \
-                                    f"{stock.ticker}?apikey={self.FMP_API_KEY}"
-            response = requests.get(estimated_revenue_url, timeout=self.TIMEOUT).json()
+        estimated_revenue_urls = {stock: f"{self.FMP_API_URL}/v3/analyst-estimates/"
+                                         f"{stock.ticker}?apikey={self.FMP_API_KEY}" for stock in stock_list
+                                  if gross_profits[stock] != 0 and enterprise_values[stock] != 0}
+        for stock, response in AsyncBatchFetcher.fetch_json(estimated_revenue_urls, "fmp", self.TIMEOUT).items():
             top, bottom = 0, 0
 
             if response and len(response) > 0:
@@ -659,14 +896,40 @@ class StockApi:
         :return: {StockSymbol: revenue}
         """
         res = defaultdict(FinancialMetricsData)
-        for stock in stock_list:
-            api_url = f"{self.FMP_API_URL}/v3/income-statement/{stock.ticker}?" \
-                      f"period=quarter&limit=1&apikey={self.FMP_API_KEY}"
-            response = requests.get(api_url, timeout=self.TIMEOUT).json()
+        for stock, response in self.get_quarterly_statements("income-statement", stock_list, 1).items():
             if response and len(response) > 0:
                 res[stock] = FinancialMetricsData(response[0].get("revenue", 0))
         return res
 
+    def get_stocks_growth_score_frame(self, stock_list: List[StockSymbol]) -> FinancialMetricsFrame:
+        """
+        Get stock growth score and its components as a one period frame
+        Growth Score = most 2 recent quarterly revenue YOY growth + avg(2 recent quarterly FCF margin)
+
+        :param stock_list: [StockSymbol, ...]
+        :return: FinancialMetricsFrame of GROWTH_SCORE_METRICS,
+                 all 0 for stocks without positive revenue 4 and 5 quarters ago
+        """
+        frame = FinancialMetricsFrame(stock_list, 1, self.GROWTH_SCORE_METRICS, self.GROWTH_SCORE_METRICS)
+        stats = self.get_stocks_stats_frame(stock_list, "quarter", 6)
+        revenues = stats[FinancialMetricType.REVENUE]
+        fcf_margins = stats[FinancialMetricType.FREE_CASH_FLOW_MARGIN]
+        valid = (revenues[:, 4] > 0) & (revenues[:, 5] > 0)
+
+        revenue_yoy_growth = np.where(valid[:, None], frame.safe_divide(revenues[:, :2], revenues[:, 4:6]) - 1, 0)
+        fcf_margins = np.where(valid[:, None], fcf_margins[:, :2], 0)
+        avg_fcf_margin = fcf_margins.mean(axis=1)
+        growth_score = revenue_yoy_growth.sum(axis=1) + avg_fcf_margin
+
+        frame[FinancialMetricType.GROWTH_SCORE] = growth_score[:, None]
+        frame[FinancialMetricType.REVENUE_YOY_GROWTH_LATEST] = revenue_yoy_growth[:, :1]
+        frame[FinancialMetricType.REVENUE_YOY_GROWTH_SECOND_LATEST] = revenue_yoy_growth[:, 1:]
+        frame[FinancialMetricType.REVENUE_YOY_GROWTH_SUM] = revenue_yoy_growth.sum(axis=1)[:, None]
+        frame[FinancialMetricType.FREE_CASH_FLOW_MARGIN_LATEST] = fcf_margins[:, :1]
+        frame[FinancialMetricType.FREE_CASH_FLOW_MARGIN_SECOND_LATEST] = fcf_margins[:, 1:]
+        frame[FinancialMetricType.FREE_CASH_FLOW_MARGIN_AVG] = avg_fcf_margin[:, None]
+        return frame
+
     @error_handling("financialmodelingprep", default_val=defaultdict(dict))
     def get_stocks_growth_score(self, stock_list: List[StockSymbol], full: bool = False) \
             -> Dict[StockSymbol, Dict[str, FinancialMetricsData]]:
@@ -678,34 +941,35 @@ class StockApi:
         :param full: bool, whether to return full stats
         :return: {StockSymbol: {"growth_score": FinancialMetricsData}}
         """
+        frame = self.get_stocks_growth_score_frame(stock_list)
         res = defaultdict(dict)
-        stock_stats = self.get_stocks_stats_by_num_of_timeframe(stock_list, "quarter", 6)
-        revenue_str = FinancialMetricType.REVENUE
-        for stock, stats in stock_stats.items():
-            res[stock][FinancialMetricType.GROWTH_SCORE] = FinancialMetricsData(0, has_percentage=True)
-            if stats and len(stats) == 6 and stats[4][FinancialMetricType.REVENUE] > 0 and stats[5][revenue_str] > 0:
-                revenue_yoy_growth_0 = FinancialMetricsData(stats[0][revenue_str] / stats[4][revenue_str] - 1,
-                                                            has_percentage=True)
-                revenue_yoy_growth_1 = FinancialMetricsData(stats[1][revenue_str] / stats[5][revenue_str] - 1,
-                                                            has_percentage=True)
-                revenue_yoy_sum = revenue_yoy_growth_0 + revenue_yoy_growth_1
-                fcf_margin_0 = stats[0][FinancialMetricType.FREE_CASH_FLOW_MARGIN]
-                fcf_margin_1 = stats[1][FinancialMetricType.FREE_CASH_FLOW_MARGIN]
-                avg_fcf_margin = (fcf_margin_0 + fcf_margin_1) / 2
-                growth_score = revenue_yoy_growth_0 + revenue_yoy_growth_1 + avg_fcf_margin
-
-                if growth_score < float("inf"):
-                    res[stock][FinancialMetricType.GROWTH_SCORE] = growth_score
-                if full:
-                    res[stock][FinancialMetricType.REVENUE_YOY_GROWTH_LATEST] = revenue_yoy_growth_0
-                    res[stock][FinancialMetricType.REVENUE_YOY_GROWTH_SECOND_LATEST] = revenue_yoy_growth_1
-                    res[stock][FinancialMetricType.REVENUE_YOY_GROWTH_SUM] = revenue_yoy_sum
-                    res[stock][FinancialMetricType.FREE_CASH_FLOW_MARGIN_LATEST] = fcf_margin_0
-                    res[stock][FinancialMetricType.FREE_CASH_FLOW_MARGIN_SECOND_LATEST] = fcf_margin_1
-                    res[stock][FinancialMetricType.FREE_CASH_FLOW_MARGIN_AVG] = avg_fcf_margin
-
+        for stock in frame.stocks:
+            stats = frame.to_metrics_data(stock)
+            res[stock] = stats if full else {FinancialMetricType.GROWTH_SCORE: stats[FinancialMetricType.GROWTH_SCORE]}
         return res
 
+    def get_stocks_quarterly_revenue_yoy_growth_frame(self, stock_list: List[StockSymbol], num_of_quarters: int) \
+            -> FinancialMetricsFrame:
+        """
+        Get stock quarterly revenue yoy growth as a columnar frame
+
+        :param stock_list: [StockSymbol, ...]
+        :param num_of_quarters: int
+        :return: FinancialMetricsFrame of REVENUE_YOY_GROWTH, 0 where the revenue a year before is unknown or 0
+        """
+        frame = FinancialMetricsFrame(stock_list, num_of_quarters, [FinancialMetricType.REVENUE_YOY_GROWTH],
+                                      [FinancialMetricType.REVENUE_YOY_GROWTH])
+        income_statements = self.get_quarterly_statements("income-statement", stock_list, num_of_quarters + 4)
+        revenues = np.zeros((len(frame), num_of_quarters + 4))
+        for i, stock in enumerate(frame.stocks):
+            for j, quarter in enumerate(income_statements.get(stock) or []):
+                revenues[i, j] = quarter.get("revenue") or 0
+
+        revenues, last_year_revenues = revenues[:, :num_of_quarters], revenues[:, 4:]
+        frame[FinancialMetricType.REVENUE_YOY_GROWTH] = \
+            np.where(last_year_revenues != 0, frame.safe_divide(revenues, last_year_revenues) - 1, 0)
+        return frame
+
     @error_handling("financialmodelingprep", default_val=defaultdict(list))
     def get_stocks_quarterly_revenue_yoy_growth(self, stock_list: List[StockSymbol], num_of_quarters: int) \
             -> Dict[StockSymbol, List[FinancialMetricsData]]:
@@ -716,20 +980,6 @@ class StockApi:
         :param num_of_quarters: int
         :return: {StockSymbol: ["<revenue_growth>", ...]}
         """
-        res = defaultdict(list)
-        for stock in stock_list:
-            res[stock] = [FinancialMetricsData(has_percentage=True) for _ in range(num_of_quarters)]
-            api_url = f"{self.FMP_API_URL}/v3/income-statement/{stock.ticker}?" \
-                      f"period=quarter&limit={num_of_quarters + 4}&apikey={self.FMP_API_KEY}"
-            response = requests.get(api_url, timeout=self.TIMEOUT).json()
-            if not response:
-                continue
-
-            revenues = [quarter.get("revenue", 0) for quarter in response]
-            for i in range(min(num_of_quarters, len(response) - 4)):
-                if revenues[i + 4] == 0:
-                    continue
-                revenue_growth = (revenues[i] / revenues[i + 4] - 1)
-                res[stock][i].update_data(revenue_growth, FinancialDataType.FLOAT)
-
-        return res
+        frame = self.get_stocks_quarterly_revenue_yoy_growth_frame(stock_list, num_of_quarters)
+        return defaultdict(list, {stock: [stats[FinancialMetricType.REVENUE_YOY_GROWTH] for stats in quarters]
+                                  for stock, quarters in frame.to_dict().items()})
@@ -1,12 +1,12 @@
 import os
 import time
 import threading
-import requests
 import csv
 from typing import List, Any
 
 from smrti_quant_alerts.exception import error_handling
 from smrti_quant_alerts.settings import Config
+from smrti_quant_alerts.http_api import HttpSessionPool, RateLimiter
 
 
 class TelegramBot:
@@ -49,7 +49,8 @@ class TelegramBot:
                   f'sendMessage?chat_id={self.telegram_chat_id}&text={message}'
         if blue_text:
             api_url += '&parse_mode=Markdown'
-        requests.get(api_url, timeout=80)
+        RateLimiter.acquire(f"telegram:{self.telegram_chat_id}")
+        HttpSessionPool.get(api_url, timeout=80)
 
     def _release_msg_from_queue(self) -> None:
         """
@@ -60,9 +61,9 @@ class TelegramBot:
             msg = self.msg_queue.pop(0)
             blue_text = msg[1]
             msg = msg[0]
-            self._send_message(msg, blue_text)
             self.msg_queue_lock.release()
-            time.sleep(3.1)  # 20 msg/min
+            # paced by the rate limit of the chat, 20 msg/min
+            self._send_message(msg, blue_text)
             self.msg_queue_lock.acquire()
         self.running = False
         self.msg_queue_lock.release()
@@ -106,7 +107,8 @@ class TelegramBot:
                   f'sendDocument?'
         files = {'document': open(file_path, 'rb')}
         data = {'chat_id': self.telegram_chat_id, 'caption': output_file_name, 'parse_mode': 'HTML'}
-        return requests.post(api_url, data=data, files=files, stream=True, timeout=1000)
+        RateLimiter.acquire(f"telegram:{self.telegram_chat_id}")
+        return HttpSessionPool.post(api_url, data=data, files=files, stream=True, timeout=1000)
 
     @error_handling("telegram", default_val=None)
     def send_data_as_csv_file(self, output_file_name: str, headers: List[str], data: List[List[Any]]) -> Any:
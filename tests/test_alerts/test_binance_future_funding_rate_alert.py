@@ -1,4 +1,6 @@
+import json
 import unittest
+from decimal import Decimal
 from unittest.mock import patch
 
 from smrti_quant_alerts.alerts import FutureFundingRate
@@ -10,27 +12,24 @@ class TestFutureFundingRate(unittest.TestCase):
         self.alert = FutureFundingRate("<funding_rate_example_name>", rate_threshold=0.001, tg_type="TEST")
 
     def test_exchange_funding_rate_over_threshold(self) -> None:
-        with patch.object(FutureFundingRate, 'get_future_exchange_funding_rate', return_value=0.0002):
-            self.alert._exchange_funding_rate_over_threshold(BinanceExchange("BTC", "USDT"))
-            self.assertEqual(self.alert._pass_threshold_exchanges, [])
+        self.alert._exchange_funding_rate_over_threshold(BinanceExchange("BTC", "USDT"), 0.0002)
+        self.assertEqual(self.alert._pass_threshold_exchanges, [])
 
-        with patch.object(FutureFundingRate, 'get_future_exchange_funding_rate', return_value=0.002):
-            self.alert._exchange_funding_rate_over_threshold(BinanceExchange("BTC", "USDT"))
-            self.assertEqual(self.alert._pass_threshold_exchanges, [["BTCUSDT", "0.2%"]])
+        self.alert._exchange_funding_rate_over_threshold(BinanceExchange("BTC", "USDT"), 0.002)
+        self.assertEqual(self.alert._pass_threshold_exchanges, [["BTCUSDT", "0.2%"]])
 
-        with patch.object(FutureFundingRate, 'get_future_exchange_funding_rate', return_value=-0.002):
-            self.alert._exchange_funding_rate_over_threshold(BinanceExchange("BTC", "USDT"))
-            self.assertEqual(self.alert._pass_threshold_exchanges, [["BTCUSDT", "0.2%"], ["BTCUSDT", "-0.2%"]])
+        self.alert._exchange_funding_rate_over_threshold(BinanceExchange("BTC", "USDT"), -0.002)
+        self.assertEqual(self.alert._pass_threshold_exchanges, [["BTCUSDT", "0.2%"], ["BTCUSDT", "-0.2%"]])
 
     def test_run(self) -> None:
         return_value = {BinanceExchange("BTC", "USDT"): 0.002, BinanceExchange("ETH", "USDT"): -0.0001}
         with patch.object(self.alert._tg_bot, "send_message") as mock_method:
             with patch.object(FutureFundingRate, 'get_all_binance_exchanges',
                               return_value=[BinanceExchange("BTC", "USDT"), BinanceExchange("ETH", "USDT")]):
-                with patch.object(FutureFundingRate, 'get_future_exchange_funding_rate',
-                                  side_effect=lambda x: return_value[x]):
+                with patch.object(FutureFundingRate, 'get_all_future_exchanges_funding_rate',
+                                  return_value=return_value) as mock_funding_rate:
                     self.alert.run()
-                    mock_method.assert_called()
+                    mock_funding_rate.assert_called_once()
                     mock_method.assert_called_once_with(
                         "Bi-hourly Funding Rate Alert: \n"
                         f"[[{BinanceExchange('BTC', 'USDT')}, '0.2%']]")
@@ -41,3 +40,27 @@ class TestFutureFundingRate(unittest.TestCase):
                 self.alert.run()
                 mock_method.assert_not_called()
                 self.assertEqual(self.alert._pass_threshold_exchanges, [])
+
+    def test_handle_mark_price_message(self) -> None:
+        BinanceExchange("BTC", "USDT")
+        BinanceExchange("ETH", "USDT")
+        with patch.object(self.alert._tg_bot, "send_message") as mock_method:
+            self.alert._handle_mark_price_message(None, json.dumps({"result": None, "id": 1}))
+            mock_method.assert_not_called()
+
+            msg = [{"e": "markPriceUpdate", "s": "BTCUSDT", "r": "0.00200000"},
+                   {"e": "markPriceUpdate", "s": "ETHUSDT", "r": "0.00010000"},
+                   {"e": "markPriceUpdate", "s": "UNKNOWNUSDT", "r": "0.01000000"}]
+            self.alert._handle_mark_price_message(None, json.dumps(msg))
+            mock_method.assert_called_once_with(f"Funding Rate Alert: \n[[{BinanceExchange('BTC', 'USDT')}, "
+                                                f"'{round(Decimal('0.002') * 100, 3)}%']]")
+
+            # alerted again only after going back under the threshold
+            mock_method.reset_mock()
+            self.alert._handle_mark_price_message(None, json.dumps(msg))
+            mock_method.assert_not_called()
+            msg[0]["r"] = "0.00010000"
+            self.alert._handle_mark_price_message(None, json.dumps(msg))
+            msg[0]["r"] = "-0.00300000"
+            self.alert._handle_mark_price_message(None, json.dumps(msg))
+            mock_method.assert_called_once()
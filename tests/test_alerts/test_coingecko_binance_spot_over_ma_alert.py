@@ -1,5 +1,6 @@
+import threading
 import unittest
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 
 from smrti_quant_alerts.alerts.crypto_alerts.coingecko_binance_spot_over_ma_alert \
     import SpotOverMABase, BinanceSpotOverMA, CoingeckoSpotOverMA, SpotOverMAAlert
@@ -9,4 +10,46 @@ from smrti_quant_alerts.data_type import CoingeckoCoin, BinanceExchange, Trading
 
 
 class TestSpotOverMABase(unittest.TestCase):
-    pass
+    def test_set_tier(self) -> None:
+        coins = [CoingeckoCoin("a", "A"), CoingeckoCoin("b", "B"), CoingeckoCoin("c", "C")]
+        with patch.object(CoingeckoSpotOverMA, "_match_binance_exchange_to_coingecko_coins"), \
+                patch.object(CoingeckoSpotOverMA, "get_exclude_coins", side_effect=set), \
+                patch.object(CoingeckoSpotOverMA, "get_coins_current_price") as mock_prices, \
+                patch.object(CoingeckoSpotOverMA, "_get_coin_prices",
+                             side_effect=lambda coin: (1, [2] if coin.coin_id == "b" else [0, 1])) as mock_get_prices:
+            alert = CoingeckoSpotOverMA(set(), coins[:2])
+            alert._coins_spot_over_ma()
+            self.assertEqual(alert._spot_over_ma, {coins[0]: 1})
+            self.assertEqual(mock_get_prices.call_count, 2)
+
+            # the results of the previous tier are reused
+            alert.set_tier({coins[0]}, coins, "alert_500")
+            alert._coins_spot_over_ma()
+            self.assertEqual(alert._spot_over_ma, {coins[2]: 1})
+            self.assertEqual(mock_get_prices.call_count, 3)
+            mock_prices.assert_called_with([coins[2]])
+
+
+class TestSpotOverMAAlert(unittest.TestCase):
+    def test_get_top_market_cap_coins(self) -> None:
+        with patch("smrti_quant_alerts.alerts.base_alert.init_database_runtime"), \
+                patch.object(SpotOverMAAlert, "_match_binance_exchange_to_coingecko_coins"):
+            alert = SpotOverMAAlert("<sequential_example_name>", "sequential", 1, 200, tg_type="TEST")
+        coins = [CoingeckoCoin(f"coin{i}", f"C{i}") for i in range(500)]
+        with patch.object(SpotOverMAAlert, "get_top_n_market_cap_coins", return_value=coins) as mock_get_coins, \
+                patch.object(SpotOverMAAlert, "record_daily_volume_snapshot") as mock_record:
+            self.assertEqual(alert._get_top_market_cap_coins(100), coins[:100])
+            self.assertEqual(alert._get_top_market_cap_coins(300), coins[:300])
+            # the top 500 are fetched once for all the tiers, their volumes are recorded once
+            mock_get_coins.assert_called_once_with(500)
+            mock_record.assert_called_once()
+
+    def test_run_legs(self) -> None:
+        # both legs have to be running at the same time to pass the barrier
+        barrier = threading.Barrier(2, timeout=5)
+        legs = []
+        for i in range(2):
+            leg = MagicMock(alert_type="alert_100", trading_symbols=[])
+            leg.run.side_effect = lambda i=i: (barrier.wait(), ([], [i], []))[1]
+            legs.append(leg)
+        self.assertEqual(SpotOverMAAlert._run_legs(*legs), [([], [0], []), ([], [1], [])])
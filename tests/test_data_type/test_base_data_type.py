@@ -1,3 +1,4 @@
+import pickle
 import unittest
 
 from smrti_quant_alerts.data_type import Tick, TradingSymbol
@@ -63,6 +64,13 @@ class TestTradingSymbol(unittest.TestCase):
         for symbol in [TradingSymbol("tEsT"), TradingSymbol("TEST"), TradingSymbol("test")]:
             self.assertEqual(hash(symbol), hash("TEST"))
 
+    def test_interned(self) -> None:
+        symbol = TradingSymbol("test")
+        self.assertIs(symbol, TradingSymbol("TEST"))
+        self.assertIs(pickle.loads(pickle.dumps(symbol)), symbol)
+        self.assertIs(TradingSymbol.get_interned("TEST"), symbol)
+        self.assertFalse(hasattr(symbol, "__dict__"))
+
     def test_get_symbol_object(self) -> None:
         with self.assertRaises(NotImplementedError) as e:
             TradingSymbol.get_symbol_object("TEST")
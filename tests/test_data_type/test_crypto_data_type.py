@@ -1,4 +1,5 @@
 import unittest
+from unittest import mock
 from collections import defaultdict
 
 from smrti_quant_alerts.data_type import BinanceExchange, CoingeckoCoin, ExchangeTick, TradingSymbol
@@ -23,6 +24,17 @@ class TestBinanceExchange(unittest.TestCase):
         self.assertEqual(exchange, BinanceExchange("BTC", "USDT"))
         self.assertIsNone(BinanceExchange.get_symbol_object("BTCUSD"))
 
+    def test_interned(self) -> None:
+        exchange = BinanceExchange("btc", "usdt")
+        self.assertIs(exchange, BinanceExchange("BTC", "USDT"))
+        self.assertIs(exchange, BinanceExchange.get_symbol_object("btcusdt"))
+        self.assertIsNot(exchange, TradingSymbol("BTCUSDT"))
+        self.assertEqual(hash(exchange), hash("BTCUSDT"))
+
+        with mock.patch.object(BinanceExchange, "symbol_base_quote_map", {}):
+            self.assertIs(BinanceExchange("BTC", "USDT"), exchange)
+            self.assertIs(BinanceExchange.get_symbol_object("BTCUSDT"), exchange)
+
     def test_add_base_coin_id_pair_to_dict(self) -> None:
         BinanceExchange.add_base_coin_id_pair_to_dict("BTC", "bitcoin")
         self.assertEqual(BinanceExchange.symbol_base_coingecko_id_map["BTC"], "bitcoin")
@@ -46,6 +58,13 @@ class TestCoingeckoCoin(unittest.TestCase):
         coin = CoingeckoCoin.get_symbol_object("BTC", "other")
         self.assertEqual(set(coin), {CoingeckoCoin("bitcoin1", "BTC"), CoingeckoCoin("bitcoin", "BTC")})
 
+    def test_interned(self) -> None:
+        coin = CoingeckoCoin("bitcoin", "btc")
+        self.assertIs(coin, CoingeckoCoin("bitcoin", "BTC"))
+        self.assertIs(coin, CoingeckoCoin.get_symbol_object("BTC&&bitcoin"))
+        self.assertIsNot(coin, CoingeckoCoin("bitcoin1", "BTC"))
+        self.assertEqual(hash(coin), hash("BTCbitcoin"))
+
     def test_equal(self) -> None:
         self.assertTrue(CoingeckoCoin("bitcoin", "BTC") == "BTC")
         self.assertFalse(CoingeckoCoin("bitcoin", "BTC") == "BTC1")
@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+from smrti_quant_alerts.data_type import FinancialMetricsFrame, FinancialMetricsData, FinancialMetricType, \
+    StockSymbol
+
+
+class TestFinancialMetricsFrame(unittest.TestCase):
+    def setUp(self) -> None:
+        self.stocks = [StockSymbol("AAPL"), StockSymbol("MSFT"), StockSymbol("NVDA")]
+        self.frame = FinancialMetricsFrame(self.stocks, 2, [FinancialMetricType.REVENUE,
+                                                            FinancialMetricType.OPERATING_MARGIN],
+                                           [FinancialMetricType.OPERATING_MARGIN])
+
+    def test_set_get(self) -> None:
+        self.frame[FinancialMetricType.REVENUE] = [[10, 8], [0, 5], [np.nan, np.inf]]
+        self.assertEqual(self.frame[FinancialMetricType.REVENUE].tolist(), [[10, 8], [0, 5], [0, 0]])
+        self.assertEqual(self.frame[FinancialMetricType.OPERATING_MARGIN].shape, (3, 2))
+        self.assertEqual(self.frame.get_stock_index(StockSymbol("MSFT")), 1)
+        self.assertEqual(self.frame.get_stock_index(StockSymbol("TSLA")), -1)
+        self.assertIn(StockSymbol("NVDA"), self.frame)
+        self.assertEqual(len(self.frame), 3)
+
+    def test_safe_divide(self) -> None:
+        self.assertEqual(FinancialMetricsFrame.safe_divide(np.array([1, 2, 3]), np.array([2, 0, 3])).tolist(),
+                         [0.5, 0, 1])
+
+    def test_select(self) -> None:
+        self.frame[FinancialMetricType.OPERATING_MARGIN] = [[0.1, 0], [0.5, 0], [0.3, 0]]
+        margins = self.frame[FinancialMetricType.OPERATING_MARGIN][:, 0]
+        self.assertEqual(self.frame.select(margins > 0.2), self.stocks[1:])
+        self.assertEqual(self.frame.select(margins > 0, sort_by=margins),
+                         [StockSymbol("MSFT"), StockSymbol("NVDA"), StockSymbol("AAPL")])
+
+    def test_to_metrics_data(self) -> None:
+        self.frame[FinancialMetricType.REVENUE] = [[10, 8], [0, 5], [0, 0]]
+        self.frame[FinancialMetricType.OPERATING_MARGIN] = [[0.1, 0.2], [0.5, 0], [0.3, 0]]
+        stats = self.frame.to_metrics_data(StockSymbol("AAPL"), 1)
+        self.assertEqual(stats, {FinancialMetricType.REVENUE: FinancialMetricsData(8),
+                                 FinancialMetricType.OPERATING_MARGIN: FinancialMetricsData(0.2, has_percentage=True)})
+        self.assertEqual(str(stats[FinancialMetricType.OPERATING_MARGIN]), "20.0%")
+        self.assertEqual(self.frame.to_metrics_data(StockSymbol("TSLA"))[FinancialMetricType.REVENUE], 0)
+        self.assertEqual(len(self.frame.to_dict()[StockSymbol("MSFT")]), 2)
@@ -1,9 +1,17 @@
 import unittest
+from unittest import mock
 
-from smrti_quant_alerts.data_type import StockSymbol
+from smrti_quant_alerts.data_type import StockSymbol, CompanyInfo
 
 
 class TestStockSymbol(unittest.TestCase):
+    def setUp(self) -> None:
+        # the symbols are interned, each test starts from an empty registry and info map
+        for name in ["_instances", "symbol_info_map"]:
+            patcher = mock.patch.object(StockSymbol, name, {})
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
     def test_ticker(self) -> None:
         symbol = StockSymbol("AAPL")
         self.assertEqual(symbol.ticker, "AAPL")
@@ -50,3 +58,32 @@ class TestStockSymbol(unittest.TestCase):
         self.assertEqual(symbol.ticker_alias, "AAPL-")
         symbol = StockSymbol("AAPL-", sp500=True)
         self.assertEqual(symbol.ticker_alias, "AAPL.")
+
+    def test_interned(self) -> None:
+        symbol = StockSymbol("MSFT")
+        self.assertIs(symbol, StockSymbol("msft"))
+        self.assertIsNot(symbol, StockSymbol("MSFT@HK"))
+        self.assertEqual(hash(symbol), hash("MSFT"))
+
+        StockSymbol("MSFT", security_name="Microsoft", nasdaq=True)
+        self.assertEqual(symbol.security_name, "Microsoft")
+        self.assertTrue(symbol.is_nasdaq)
+        StockSymbol("MSFT")
+        self.assertEqual(symbol.security_name, "Microsoft")
+        self.assertFalse(hasattr(symbol, "__dict__"))
+
+    def test_load_company_info(self) -> None:
+        symbol = StockSymbol("NVDA")
+        info = CompanyInfo("NVIDIA", "Information Technology", "Semiconductors",
+                           "Santa Clara, California", "0001045810", "1993")
+        StockSymbol.load_company_info({"NVDA": info, "AMD": CompanyInfo("AMD")})
+        self.assertTrue(symbol.has_stock_info)
+        self.assertIs(symbol.company_info, info)
+        self.assertIs(StockSymbol("NVDA@HK").company_info, info)
+        self.assertEqual(StockSymbol("AMD").security_name, "AMD")
+        self.assertFalse(StockSymbol("AMD").has_stock_info)
+
+        StockSymbol.load_company_info({"NVDA": CompanyInfo("Other")})
+        self.assertIs(symbol.company_info, info)
+        with self.assertRaises(AttributeError):
+            info.security_name = "Other"
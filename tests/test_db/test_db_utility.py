@@ -6,7 +6,8 @@ from unittest.mock import patch
 from typing import Dict, Tuple
 
 from smrti_quant_alerts.db import init_database_runtime, PriceVolumeDBUtils, \
-    SpotOverMaDBUtils, StockAlertDBUtils, close_database
+    SpotOverMaDBUtils, StockAlertDBUtils, close_database, init_database_cache, is_database_cache_initialized, \
+    ResponseCacheDBUtils, StockBarDBUtils
 from smrti_quant_alerts.data_type import BinanceExchange, CoingeckoCoin, TradingSymbol, StockSymbol
 from smrti_quant_alerts.settings import Config
 
@@ -224,3 +225,69 @@ class TestStockAlertDBUtils(unittest.TestCase):
             StockAlertDBUtils.reset_stocks()
             stocks = StockAlertDBUtils.get_stocks()
             self.assertEqual(stocks, set())
+
+
+class TestResponseCacheDBUtils(unittest.TestCase):
+    def setUp(self) -> None:
+        if not is_database_cache_initialized():
+            init_database_cache()
+        ResponseCacheDBUtils.clear()
+
+    def tearDown(self) -> None:
+        ResponseCacheDBUtils.clear()
+
+    def test_get_set_response(self) -> None:
+        ResponseCacheDBUtils.set_response("test_url", "income-statement", "[1]")
+        self.assertEqual(ResponseCacheDBUtils.get_response("test_url", 100), "[1]")
+        self.assertIsNone(ResponseCacheDBUtils.get_response("test_url_1", 100))
+        with patch("time.time", return_value=time.time() + 200):
+            self.assertIsNone(ResponseCacheDBUtils.get_response("test_url", 100))
+
+        ResponseCacheDBUtils.set_response("test_url", "income-statement", "[2]")
+        self.assertEqual(ResponseCacheDBUtils.get_response("test_url", 100), "[2]")
+
+        ResponseCacheDBUtils.clear("analyst-estimates")
+        self.assertEqual(ResponseCacheDBUtils.get_response("test_url", 100), "[2]")
+        ResponseCacheDBUtils.clear("income-statement")
+        self.assertIsNone(ResponseCacheDBUtils.get_response("test_url", 100))
+
+    def test_evict(self) -> None:
+        for i in range(5):
+            with patch("time.time", return_value=1000 + i):
+                ResponseCacheDBUtils.set_response(f"test_url_{i}", "income-statement", "1" * 10)
+        self.assertEqual(ResponseCacheDBUtils.evict(50), 0)
+        self.assertEqual(ResponseCacheDBUtils.evict(25), 3)
+        with patch("time.time", return_value=1010):
+            self.assertIsNone(ResponseCacheDBUtils.get_response("test_url_2", 100))
+            self.assertEqual(ResponseCacheDBUtils.get_response("test_url_3", 100), "1" * 10)
+
+
+class TestStockBarDBUtils(unittest.TestCase):
+    def setUp(self) -> None:
+        if not is_database_cache_initialized():
+            init_database_cache()
+        StockBarDBUtils.clear()
+
+    def tearDown(self) -> None:
+        StockBarDBUtils.clear()
+
+    def test_add_get_bars(self) -> None:
+        StockBarDBUtils.add_bars("1day", {"AAPL": [("2024-05-16", 1), ("2024-05-17", 2)], "MSFT": [("2024-05-17", 3)]})
+        StockBarDBUtils.add_bars("4hour", {"AAPL": [("2024-05-17 09:30:00", 4)]})
+        self.assertEqual(StockBarDBUtils.get_bar_stats(["AAPL", "MSFT", "TSLA"], "1day"),
+                         {"AAPL": (2, "2024-05-17"), "MSFT": (1, "2024-05-17")})
+        self.assertEqual(StockBarDBUtils.get_closes(["AAPL", "MSFT"], "1day", 1), {"AAPL": [2], "MSFT": [3]})
+
+        # partial bar is overwritten
+        StockBarDBUtils.add_bars("1day", {"AAPL": [("2024-05-17", 5)]})
+        self.assertEqual(StockBarDBUtils.get_closes(["AAPL"], "1day", 5), {"AAPL": [5, 1]})
+        self.assertEqual(StockBarDBUtils.get_closes(["AAPL", "MSFT"], "1day", 2), {"AAPL": [5, 1], "MSFT": [3]})
+
+        # bars dated before oldest_date are deleted, only for the timeframe
+        StockBarDBUtils.add_bars("1day", {"MSFT": [("2024-05-18", 6)]}, "2024-05-17")
+        self.assertEqual(StockBarDBUtils.get_closes(["AAPL", "MSFT"], "1day", 5), {"AAPL": [5], "MSFT": [6, 3]})
+        self.assertEqual(StockBarDBUtils.get_closes(["AAPL"], "4hour", 5), {"AAPL": [4]})
+
+        StockBarDBUtils.clear("1day")
+        self.assertEqual(StockBarDBUtils.get_closes(["AAPL"], "1day", 5), {})
+        self.assertEqual(StockBarDBUtils.get_closes(["AAPL"], "4hour", 5), {"AAPL": [4]})
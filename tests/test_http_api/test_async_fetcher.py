@@ -0,0 +1,59 @@
+import unittest
+import asyncio
+import threading
+import time
+from unittest import mock
+
+from smrti_quant_alerts.settings import Config
+from smrti_quant_alerts.http_api import AsyncBatchFetcher
+
+
+class TestAsyncBatchFetcher(unittest.TestCase):
+    def setUp(self) -> None:
+        AsyncBatchFetcher.shutdown()
+        self.provider_settings = Config.PROVIDER_SETTINGS
+        Config.PROVIDER_SETTINGS = {"fmp": {"max_in_flight": 3}}
+
+    def tearDown(self) -> None:
+        AsyncBatchFetcher.shutdown()
+        Config.PROVIDER_SETTINGS = self.provider_settings
+
+    def test_get_max_in_flight(self) -> None:
+        self.assertEqual(AsyncBatchFetcher.get_max_in_flight("fmp"), 3)
+        self.assertEqual(AsyncBatchFetcher.get_max_in_flight("eodhd"), AsyncBatchFetcher.DEFAULT_MAX_IN_FLIGHT)
+
+    def test_fetch_json(self) -> None:
+        in_flight, max_in_flight = [0], [0]
+        lock = threading.Lock()
+
+        def mock_get(url: str, timeout: int) -> mock.Mock:
+            with lock:
+                in_flight[0] += 1
+                max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+            return mock.Mock(json=lambda: [{"url": url}])
+
+        urls = {i: f"https://financialmodelingprep.com/api/{i}" for i in range(10)}
+        with mock.patch("requests.Session.get", side_effect=mock_get):
+            res = AsyncBatchFetcher.fetch_json(urls, "fmp")
+        self.assertEqual(res, {i: [{"url": url}] for i, url in urls.items()})
+        self.assertEqual(list(res.keys()), list(urls.keys()))
+        self.assertEqual(max_in_flight[0], 3)
+
+        self.assertEqual(AsyncBatchFetcher.fetch_json({}, "fmp"), {})
+
+    def test_async_fetch_json(self) -> None:
+        urls = {"AAPL": "https://financialmodelingprep.com/api/AAPL"}
+        with mock.patch("requests.Session.get", return_value=mock.Mock(json=lambda: [1])):
+            res = asyncio.run(AsyncBatchFetcher.async_fetch_json(urls, "fmp"))
+        self.assertEqual(res, {"AAPL": [1]})
+
+    @mock.patch("time.sleep", return_value=None)
+    def test_fetch_json_failure(self, _) -> None:
+        urls = {"AAPL": "https://financialmodelingprep.com/api/AAPL"}
+        with mock.patch("requests.Session.get", side_effect=Exception("error")) as mock_get:
+            res = AsyncBatchFetcher.fetch_json(urls, "fmp")
+        self.assertEqual(res, {"AAPL": None})
+        self.assertEqual(mock_get.call_count, 5)
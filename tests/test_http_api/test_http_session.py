@@ -0,0 +1,48 @@
+import unittest
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from smrti_quant_alerts.http_api import HttpSessionPool
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class TestHttpSessionPool(unittest.TestCase):
+    def setUp(self) -> None:
+        HttpSessionPool.close_all()
+        self.server = HTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/test"
+
+    def tearDown(self) -> None:
+        HttpSessionPool.close_all()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_get_session(self) -> None:
+        session = HttpSessionPool.get_session(self.url)
+        self.assertIs(session, HttpSessionPool.get_session(f"{self.url}?a=1"))
+        self.assertIsNot(session, HttpSessionPool.get_session("https://financialmodelingprep.com/api"))
+
+    def test_get_stats(self) -> None:
+        for _ in range(5):
+            self.assertEqual(HttpSessionPool.get(self.url, timeout=5).json(), {"ok": True})
+        stats = HttpSessionPool.get_stats()[f"127.0.0.1:{self.server.server_port}"]
+        self.assertEqual(stats, {"requests": 5, "connections": 1, "reused": 4})
+
+        HttpSessionPool.close_all()
+        self.assertEqual(HttpSessionPool.get_stats(), {})
@@ -0,0 +1,25 @@
+import json
+import unittest
+
+from smrti_quant_alerts.http_api import iter_json_array
+
+
+class TestJsonStream(unittest.TestCase):
+    def test_iter_json_array(self) -> None:
+        items = [{"code": "AAPL", "close": 1.5, "name": "Apple é"}, {"code": "MSFT", "close": 12},
+                 [1, 2], "]", 123456]
+        payload = json.dumps(items, ensure_ascii=False).encode()
+        for chunk_size in [1, 3, 7, len(payload)]:
+            chunks = [payload[i:i + chunk_size] for i in range(0, len(payload), chunk_size)]
+            self.assertEqual(list(iter_json_array(chunks)), items)
+
+        self.assertEqual(list(iter_json_array([" [ ", "] "])), [])
+        self.assertEqual(list(iter_json_array(['[{"a": 1}', "\n, ", '{"a": 2}]'])), [{"a": 1}, {"a": 2}])
+
+    def test_iter_json_array_invalid(self) -> None:
+        with self.assertRaises(ValueError):
+            list(iter_json_array(['{"error": "invalid api token"}']))
+        with self.assertRaises(ValueError):
+            list(iter_json_array(['[{"a": 1}, {"a"']))
+        with self.assertRaises(ValueError):
+            list(iter_json_array([]))
@@ -0,0 +1,77 @@
+import unittest
+import threading
+import time
+from unittest import mock
+
+import requests
+
+from smrti_quant_alerts.settings import Config
+from smrti_quant_alerts.http_api import RateLimiter, RateLimitedHTTPAdapter
+from smrti_quant_alerts.http_api.rate_limiter import TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_acquire(self) -> None:
+        bucket = TokenBucket(rate_per_minute=600, burst=2)
+        start = time.monotonic()
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertGreater(bucket.acquire(), 0)
+        bucket.acquire()
+        self.assertGreater(time.monotonic() - start, 0.19)
+
+    def test_acquire_multithreading(self) -> None:
+        bucket = TokenBucket(rate_per_minute=1200, burst=1)
+        start = time.monotonic()
+        threads = [threading.Thread(target=bucket.acquire) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 1 token at start, 4 more at 20 tokens/s
+        self.assertGreater(time.monotonic() - start, 0.19)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self) -> None:
+        RateLimiter.reset()
+        self.provider_settings = Config.PROVIDER_SETTINGS
+        Config.PROVIDER_SETTINGS = {"coingecko": {"rate_per_minute": 1000}}
+
+    def tearDown(self) -> None:
+        RateLimiter.reset()
+        Config.PROVIDER_SETTINGS = self.provider_settings
+
+    def test_get_provider(self) -> None:
+        self.assertEqual(RateLimiter.get_provider("https://financialmodelingprep.com/api/v3/quote"), "fmp")
+        self.assertEqual(RateLimiter.get_provider("https://fapi.binance.com/fapi/v1/premiumIndex"), "binance")
+        self.assertEqual(RateLimiter.get_provider("api.telegram.org"), "telegram")
+        self.assertIsNone(RateLimiter.get_provider("http://127.0.0.1:8000/test"))
+
+    def test_get_limits(self) -> None:
+        self.assertEqual(RateLimiter.get_limits("coingecko"), {"rate_per_minute": 1000, "burst": 10})
+        self.assertEqual(RateLimiter.get_limits("binance"), RateLimiter.DEFAULT_LIMITS["binance"])
+        self.assertIs(RateLimiter.get_bucket("coingecko"), RateLimiter.get_bucket("coingecko"))
+
+        # the limits scoped to a key have their own buckets
+        self.assertEqual(RateLimiter.get_limits("telegram:-1"), RateLimiter.KEYED_LIMITS["telegram"])
+        self.assertEqual(RateLimiter.get_limits("telegram"), RateLimiter.DEFAULT_LIMITS["telegram"])
+        self.assertIsNot(RateLimiter.get_bucket("telegram:-1"), RateLimiter.get_bucket("telegram:-2"))
+        Config.PROVIDER_SETTINGS = {"telegram": {"burst": 20, "per_key": {"rate_per_minute": 10}}}
+        self.assertEqual(RateLimiter.get_limits("telegram:-1"), {"rate_per_minute": 10, "burst": 1})
+        self.assertEqual(RateLimiter.get_limits("telegram"), {"rate_per_minute": 1800, "burst": 20})
+
+    def test_rate_limited_http_adapter(self) -> None:
+        session = requests.Session()
+        session.mount("https://", RateLimitedHTTPAdapter("coingecko"))
+        with mock.patch("requests.adapters.HTTPAdapter.send", side_effect=Exception("sent")), \
+                mock.patch.object(RateLimiter, "acquire") as mock_acquire:
+            with self.assertRaises(Exception):
+                session.get("https://api.coingecko.com/api/v3/ping")
+            mock_acquire.assert_called_once_with("coingecko")
+
+            mock_acquire.reset_mock()
+            session.mount("https://", RateLimitedHTTPAdapter())
+            with self.assertRaises(Exception):
+                session.get("https://eodhd.com/api/eod")
+            mock_acquire.assert_called_once_with("eodhd")
@@ -0,0 +1,53 @@
+import unittest
+import threading
+import time
+from typing import List, Dict
+
+from smrti_quant_alerts.http_api import RequestCoalescer
+
+
+class TestRequestCoalescer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.coalescer = RequestCoalescer()
+        self.fetches = []
+        self.fetches_lock = threading.Lock()
+
+    def fetch(self, keys: List[str], window: int) -> Dict[str, List[int]]:
+        with self.fetches_lock:
+            self.fetches.append((sorted(keys), window))
+        time.sleep(0.1)
+        return {key: list(range(window)) for key in keys if key != "failed"}
+
+    def test_get(self) -> None:
+        res = self.coalescer.get(["AAPL", "MSFT"], 8, self.fetch)
+        self.assertEqual(res, {"AAPL": list(range(8)), "MSFT": list(range(8))})
+        res = self.coalescer.get(["AAPL", "TSLA"], 4, self.fetch)
+        self.assertEqual(res, {"AAPL": list(range(8)), "TSLA": list(range(4))})
+        res = self.coalescer.get(["AAPL"], 12, self.fetch)
+        self.assertEqual(res, {"AAPL": list(range(12))})
+        self.assertEqual(self.fetches, [(["AAPL", "MSFT"], 8), (["TSLA"], 4), (["AAPL"], 12)])
+
+        self.coalescer.clear()
+        self.coalescer.get(["AAPL"], 4, self.fetch)
+        self.assertEqual(self.fetches[-1], (["AAPL"], 4))
+
+    def test_get_failed(self) -> None:
+        self.assertEqual(self.coalescer.get(["failed"], 4, self.fetch), {"failed": None})
+        self.coalescer.get(["failed"], 4, self.fetch)
+        self.assertEqual(len(self.fetches), 2)
+
+        def failed_fetch(keys: List[str], window: int) -> Dict[str, List[int]]:
+            raise Exception("error")
+        self.assertEqual(self.coalescer.get(["AAPL"], 4, failed_fetch), {"AAPL": None})
+        self.assertEqual(self.coalescer.get(["AAPL"], 4, self.fetch), {"AAPL": list(range(4))})
+
+    def test_get_multithreading(self) -> None:
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.coalescer.get(["AAPL"], 4, self.fetch)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.fetches, [(["AAPL"], 4)])
+        self.assertEqual(results, [{"AAPL": list(range(4))}] * 8)
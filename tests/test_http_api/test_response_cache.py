@@ -0,0 +1,46 @@
+import unittest
+from unittest import mock
+
+from smrti_quant_alerts.settings import Config
+from smrti_quant_alerts.http_api import ResponseCache, AsyncBatchFetcher
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self) -> None:
+        ResponseCache.clear()
+        self.provider_settings = Config.PROVIDER_SETTINGS
+        Config.PROVIDER_SETTINGS = {"fmp": {"cache_ttls": {"analyst-estimates": 0}}}
+        self.url = "https://financialmodelingprep.com/api/v3/income-statement/AAPL?period=quarter&limit=8&apikey=key"
+
+    def tearDown(self) -> None:
+        ResponseCache.clear()
+        Config.PROVIDER_SETTINGS = self.provider_settings
+
+    def test_get_endpoint(self) -> None:
+        self.assertEqual(ResponseCache.get_endpoint(self.url), "income-statement")
+        self.assertIsNone(ResponseCache.get_endpoint("https://financialmodelingprep.com/api/v3/analyst-estimates/A"))
+        self.assertIsNone(ResponseCache.get_endpoint("https://financialmodelingprep.com/api/v3/quote/AAPL"))
+
+    def test_get_key(self) -> None:
+        self.assertEqual(ResponseCache.get_key(self.url),
+                         "financialmodelingprep.com/api/v3/income-statement/AAPL?limit=8&period=quarter")
+
+    def test_get_set(self) -> None:
+        self.assertIsNone(ResponseCache.get(self.url))
+        ResponseCache.set(self.url, [])
+        ResponseCache.set(self.url, {"Error Message": "Limit Reach"})
+        self.assertIsNone(ResponseCache.get(self.url))
+
+        ResponseCache.set(self.url, [{"revenue": 1}])
+        self.assertEqual(ResponseCache.get(self.url), [{"revenue": 1}])
+        self.assertEqual(ResponseCache.get(self.url.replace("apikey=key", "apikey=key1")), [{"revenue": 1}])
+
+        url = "https://financialmodelingprep.com/api/v3/quote/AAPL?apikey=key"
+        ResponseCache.set(url, [{"price": 1}])
+        self.assertIsNone(ResponseCache.get(url))
+
+    def test_fetch_json_with_cache(self) -> None:
+        with mock.patch("requests.Session.get", return_value=mock.Mock(json=lambda: [{"revenue": 1}])) as mock_get:
+            self.assertEqual(AsyncBatchFetcher.fetch_json({"AAPL": self.url}, "fmp"), {"AAPL": [{"revenue": 1}]})
+            self.assertEqual(AsyncBatchFetcher.fetch_json({"AAPL": self.url}, "fmp"), {"AAPL": [{"revenue": 1}]})
+            self.assertEqual(mock_get.call_count, 1)
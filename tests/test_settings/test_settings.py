@@ -121,3 +121,12 @@ class TestConfig(unittest.TestCase):
         with patch("builtins.open", new_callable=mock_open, read_data=dummy_config_str):
             config.reload_settings()
             self.assertEqual(config.SETTINGS, dummy_config_json)
+
+    def test_provider_settings(self) -> None:
+        config = Config()
+        configs_str = json.dumps({"providers": {"fmp": {"max_in_flight": 16}}, **dummy_config_json})
+        with patch("builtins.open", new_callable=mock_open, read_data=configs_str):
+            config.reload_settings()
+            self.assertEqual(config.SETTINGS, dummy_config_json)
+            self.assertEqual(Config.PROVIDER_SETTINGS, {"fmp": {"max_in_flight": 16}})
+        Config.PROVIDER_SETTINGS = {}
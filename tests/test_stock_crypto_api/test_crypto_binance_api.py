@@ -9,11 +9,16 @@ from binance.um_futures import UMFutures
 from smrti_quant_alerts.stock_crypto_api import BinanceApi
 from smrti_quant_alerts.settings import Config
 from smrti_quant_alerts.data_type import BinanceExchange, CoingeckoCoin
+from smrti_quant_alerts.db import ExchangeKlineDBUtils
+from smrti_quant_alerts.stock_crypto_api.exclude_coin_index import ExcludeCoinIndex
 
 
 class TestCryptoBinanceApi(unittest.TestCase):
     def setUp(self) -> None:
         self.binance_api = BinanceApi()
+        BinanceApi.clear_ticker_snapshots()
+        BinanceApi.clear_exchange_lists()
+        ExcludeCoinIndex.clear()
 
     def test_update_active_binance_spot_exchanges(self) -> None:
         self.binance_api._reset_timestamp()
@@ -43,6 +48,17 @@ class TestCryptoBinanceApi(unittest.TestCase):
                                              BinanceExchange("USDT", "BTC"), BinanceExchange("TEST", "TEST"),
                                              BinanceExchange("ALT", "USDT")})
 
+    def test_get_recent_binance_exchanges(self) -> None:
+        return_value = {"symbols": [{"status": "TRADING", "baseAsset": "BTC", "quoteAsset": "USDT"}]}
+        with mock.patch.object(Spot, 'exchange_info', return_value=return_value) as mock_exchange_info:
+            self.assertEqual(self.binance_api.get_recent_binance_exchanges(), [BinanceExchange("BTC", "USDT")])
+            self.assertEqual(self.binance_api.get_recent_binance_exchanges(), [BinanceExchange("BTC", "USDT")])
+            self.assertEqual(mock_exchange_info.call_count, 1)
+
+            with mock.patch.object(BinanceApi, "EXCHANGE_LIST_TTL", 0):
+                self.binance_api.get_recent_binance_exchanges()
+                self.assertEqual(mock_exchange_info.call_count, 2)
+
     def test_get_all_binance_exchanges(self) -> None:
         return_value = {
             "symbols": [{
@@ -106,6 +122,18 @@ class TestCryptoBinanceApi(unittest.TestCase):
             self.assertEqual(self.binance_api.get_future_exchange_funding_rate(BinanceExchange("BTC", "USDT")),
                              Decimal(0))
 
+    def test_get_all_future_exchanges_funding_rate(self) -> None:
+        BinanceExchange("BTC", "USDT")
+        premium_indexes = [{"symbol": "BTCUSDT", "lastFundingRate": "0.00010000"},
+                           {"symbol": "UNKNOWNUSDT", "lastFundingRate": "0.00010000"}]
+        with mock.patch.object(UMFutures, 'mark_price', return_value=premium_indexes) as mock_mark_price:
+            self.assertEqual(self.binance_api.get_all_future_exchanges_funding_rate(),
+                             {BinanceExchange("BTC", "USDT"): Decimal("0.0001")})
+            mock_mark_price.assert_called_once_with()
+
+        with mock.patch.object(UMFutures, 'mark_price', side_effect=Exception):
+            self.assertEqual(self.binance_api.get_all_future_exchanges_funding_rate(), {})
+
     def test_get_exchange_current_price(self) -> None:
         self.assertEqual(self.binance_api.get_exchange_current_price(None), Decimal(0))
 
@@ -121,16 +149,91 @@ class TestCryptoBinanceApi(unittest.TestCase):
             self.assertEqual(self.binance_api.get_exchange_current_price(BinanceExchange("BTC", "USDT")),
                              Decimal("100"))
 
+    def test_get_ticker_snapshot(self) -> None:
+        prices = [{"symbol": "BTCUSDT", "price": "100"}, {"symbol": "ETHUSDT", "price": "10"}]
+        with mock.patch.object(Spot, 'ticker_price', return_value=prices) as mock_ticker_price:
+            self.assertEqual(self.binance_api.get_exchange_current_price(BinanceExchange("BTC", "USDT")),
+                             Decimal("100"))
+            self.assertEqual(self.binance_api.get_exchange_current_price(BinanceExchange("ETH", "USDT")),
+                             Decimal("10"))
+            self.assertEqual(self.binance_api.get_all_spot_current_prices(),
+                             {"BTCUSDT": Decimal("100"), "ETHUSDT": Decimal("10")})
+            self.assertEqual(mock_ticker_price.call_count, 1)
+
+            # exchanges missing from the snapshot are requested one by one
+            mock_ticker_price.return_value = {"symbol": "BNBUSDT", "price": "5"}
+            self.assertEqual(self.binance_api.get_exchange_current_price(BinanceExchange("BNB", "USDT")),
+                             Decimal("5"))
+            mock_ticker_price.assert_called_with(symbol="BNBUSDT")
+
+            BinanceApi.clear_ticker_snapshots()
+            mock_ticker_price.return_value = [{"symbol": "BTCUSDT", "price": "200"}]
+            self.assertEqual(self.binance_api.get_exchange_current_price(BinanceExchange("BTC", "USDT")),
+                             Decimal("200"))
+
+        tickers = [{"symbol": "BTCUSDT", "priceChangePercent": "1.5", "quoteVolume": "1000"}]
+        with mock.patch.object(Spot, 'ticker_24hr', return_value=tickers) as mock_ticker_24hr:
+            self.assertEqual(self.binance_api.get_exchange_24hr_ticker(BinanceExchange("BTC", "USDT")), tickers[0])
+            self.assertEqual(self.binance_api.get_exchange_24hr_ticker(BinanceExchange("ETH", "USDT")), {})
+            self.assertEqual(self.binance_api.get_exchange_24hr_ticker(None), {})
+            self.assertEqual(mock_ticker_24hr.call_count, 1)
+
     def test_get_exchange_history_hourly_close_price(self) -> None:
         self.assertEqual(self.binance_api.get_exchange_history_hourly_close_price(None), [])
+        ExchangeKlineDBUtils.clear()
+        hour = 3600 * 1000
+        now = 1700000000
+        market = [[now * 1000 - i * hour, 0, 0, 0, str(i)] for i in range(48)][::-1]
 
-        price = [[i] * 5 for i in range(24)]
-        return_value = [Decimal(i) for i in range(23, -1, -1)]
+        def mock_klines(symbol: str, interval: str, startTime: int, limit: int) -> list:
+            return [kline for kline in market if kline[0] >= startTime][:limit]
 
-        with mock.patch.object(Spot, 'klines', return_value=price):
+        with mock.patch.object(Spot, 'klines', side_effect=mock_klines) as mock_get_klines, \
+                mock.patch("smrti_quant_alerts.stock_crypto_api.crypto_binance_api.time.time",
+                           return_value=now) as mock_time:
             self.assertEqual(self.binance_api.get_exchange_history_hourly_close_price(BinanceExchange("T", "T"), 1),
-                             return_value)
+                             [Decimal(i) for i in range(25)])
+            self.assertEqual(mock_get_klines.call_args.kwargs["startTime"], (now - 86400) * 1000)
+
+            # only the klines since the newest stored one are fetched
+            market[-1][4] = "100"
+            market += [[now * 1000 + hour, 0, 0, 0, "101"], [now * 1000 + 2 * hour, 0, 0, 0, "102"]]
+            now += 7200
+            mock_time.return_value = now
+            prices = self.binance_api.get_exchange_history_hourly_close_price(BinanceExchange("T", "T"), 1)
+            self.assertEqual(prices, [Decimal(102), Decimal(101), Decimal(100)] + [Decimal(i) for i in range(1, 23)])
+            self.assertEqual(mock_get_klines.call_args.kwargs["startTime"], (now - 7200) * 1000)
+            self.assertEqual(mock_get_klines.call_args.kwargs["limit"], 4)
+            self.assertEqual(mock_get_klines.call_count, 2)
 
         with mock.patch.object(Spot, 'klines', side_effect=Exception):
             self.assertEqual(self.binance_api.get_exchange_history_hourly_close_price(BinanceExchange("T", "T")),
                              [])
+        ExchangeKlineDBUtils.clear()
+
+    def test_update_exchange_klines_dormant(self) -> None:
+        ExchangeKlineDBUtils.clear()
+        hour = 3600 * 1000
+        now = 1700000000
+        market = [[now * 1000 - i * hour, 0, 0, 0, str(i)] for i in range(2500)][::-1]
+
+        def mock_klines(symbol: str, interval: str, startTime: int, limit: int) -> list:
+            return [kline for kline in market if kline[0] >= startTime][:limit]
+
+        # the newest stored kline is more than KLINE_LIMIT hours old, e.g. an exchange back in the top-N
+        stored = [(int(kline[0]), float(kline[4])) for kline in market[:1200]]
+        ExchangeKlineDBUtils.add_klines("DT", "1h", stored)
+        with mock.patch.object(Spot, 'klines', side_effect=mock_klines) as mock_get_klines, \
+                mock.patch("smrti_quant_alerts.stock_crypto_api.crypto_binance_api.time.time", return_value=now):
+            self.binance_api.update_exchange_klines(BinanceExchange("D", "T"), "1h", (now - 100 * 86400) * 1000)
+            self.assertEqual(mock_get_klines.call_count, 2)
+            self.assertEqual(ExchangeKlineDBUtils.get_klines("DT", "1h")[0], (now * 1000, 0))
+            self.assertEqual(len(ExchangeKlineDBUtils.get_klines("DT", "1h")), BinanceApi.KLINE_LIMIT + 1)
+
+            # all the stored klines are older than <start_time>
+            ExchangeKlineDBUtils.clear()
+            ExchangeKlineDBUtils.add_klines("DT", "1h", stored[:10])
+            prices = self.binance_api.get_exchange_history_hourly_close_price(BinanceExchange("D", "T"), 1)
+            self.assertEqual(prices, [Decimal(i) for i in range(25)])
+            self.assertEqual(mock_get_klines.call_args.kwargs["startTime"], (now - 86400) * 1000)
+        ExchangeKlineDBUtils.clear()
@@ -4,24 +4,30 @@ from unittest import mock
 from decimal import Decimal
 from collections import defaultdict
 
+import numpy as np
 
 from smrti_quant_alerts.stock_crypto_api import CoingeckoApi
+from smrti_quant_alerts.stock_crypto_api.reference_data_store import ReferenceDataStore
+from smrti_quant_alerts.stock_crypto_api.exclude_coin_index import ExcludeCoinIndex
 from smrti_quant_alerts.settings import Config
 from smrti_quant_alerts.data_type import BinanceExchange, CoingeckoCoin
+from smrti_quant_alerts.db import CoinChartDBUtils, CoinVolumeDBUtils
 
 
 class TestCryptoCoingeckoApi(unittest.TestCase):
     def setUp(self) -> None:
         self.coingecko_api = CoingeckoApi()
+        CoingeckoApi.clear_current_prices()
+        ReferenceDataStore.clear()
 
     def test_get_exclude_coins(self) -> None:
         Config.PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
         CoingeckoCoin.symbol_id_map = defaultdict(set)
-        with mock.patch.object(CoingeckoApi, 'get_all_coingecko_coins',
-                               return_value=[CoingeckoCoin("bitcoin", "BTC"), CoingeckoCoin("tether", "USDT"),
-                                             CoingeckoCoin("test", "TEST"), CoingeckoCoin("alt", "ALT"),
-                                             BinanceExchange("TEST", "TEST"), CoingeckoCoin("test1", "TEST1"),
-                                             CoingeckoCoin("test2", "TEST1")]):
+        ExcludeCoinIndex.clear()
+        BinanceExchange("TEST", "TEST")
+        with mock.patch.object(CoingeckoApi, 'get_coins_catalog',
+                               return_value=[["bitcoin", "btc", ""], ["tether", "usdt", ""], ["test", "test", ""],
+                                             ["alt", "alt", ""], ["test1", "test1", ""], ["test2", "test1", ""]]):
             BinanceExchange.symbol_base_coingecko_id_map["TEST"] = "test"
             exclude_coins = self.coingecko_api.get_exclude_coins([])
             self.assertEqual(exclude_coins, {CoingeckoCoin("bitcoin", "BTC"), CoingeckoCoin("tether", "USDT"),
@@ -54,6 +60,12 @@ class TestCryptoCoingeckoApi(unittest.TestCase):
                              [CoingeckoCoin("bitcoin", "BTC"), CoingeckoCoin("ethereum", "ETH"),
                               CoingeckoCoin("test", "TEST")])
 
+        # served from the reference data store
+        with mock.patch("pycoingecko.CoinGeckoAPI.get_coins_list", return_value=[]) as mock_coins_list:
+            self.assertEqual(len(self.coingecko_api.get_all_coingecko_coins()), 3)
+            mock_coins_list.assert_not_called()
+
+        ReferenceDataStore.clear()
         with mock.patch("pycoingecko.CoinGeckoAPI.get_coins_list", return_value=[]):
             self.assertEqual(self.coingecko_api.get_all_coingecko_coins(), [])
 
@@ -182,23 +194,95 @@ class TestCryptoCoingeckoApi(unittest.TestCase):
                                                                      ["prices", "market_caps", "total_volumes"],
                                                                      3, "daily"), {})
 
+    def test_get_coin_market_info_from_store(self) -> None:
+        CoinChartDBUtils.clear()
+        day = 86400 * 1000
+        now = 1700000000
+        today = now * 1000 // day * day
+        market = [[today - i * day, i] for i in range(100, -1, -1)] + [[now * 1000, 1000]]
+
+        def mock_chart_range(id: str, vs_currency: str, from_timestamp: int, to_timestamp: int,
+                             precision: str) -> dict:
+            prices = [point for point in market if from_timestamp * 1000 <= point[0] <= to_timestamp * 1000]
+            return {"prices": prices, "total_volumes": [[timestamp, price * 10] for timestamp, price in prices]}
+
+        with mock.patch("pycoingecko.CoinGeckoAPI.get_coin_market_chart_range_by_id",
+                        side_effect=mock_chart_range) as mock_get_chart, \
+                mock.patch("pycoingecko.CoinGeckoAPI.get_coin_market_chart_by_id") as mock_get_live_chart, \
+                mock.patch("smrti_quant_alerts.stock_crypto_api.crypto_coingecko_api.time.time", return_value=now):
+            coin = CoingeckoCoin("bitcoin", "BTC")
+            self.assertEqual(self.coingecko_api.get_coin_market_info(coin, ["total_volumes"], days=2),
+                             {"total_volumes": [[today - day, 10], [today, 0], [now * 1000, 10000]]})
+            self.assertEqual(self.coingecko_api.get_coin_market_info(coin, ["prices", "total_volumes"], days=1),
+                             {"prices": [[today, 0], [now * 1000, 1000]],
+                              "total_volumes": [[today, 0], [now * 1000, 10000]]})
+            self.assertEqual(mock_get_chart.call_count, 1)
+            self.assertEqual(mock_get_chart.call_args.kwargs["from_timestamp"], now - 91 * 86400)
+            mock_get_live_chart.assert_not_called()
+        CoinChartDBUtils.clear()
+
     def test_get_coin_history_hourly_close_price(self) -> None:
-        with mock.patch("pycoingecko.CoinGeckoAPI.get_coin_market_chart_by_id", return_value={
-            "prices": [[1613846400000, 10000], [1613932800000, 20000], [1614019200000, 30000]]
-        }):
+        self.assertEqual(self.coingecko_api.get_coin_history_hourly_close_price(), [])
+        CoinChartDBUtils.clear()
+        hour = 3600 * 1000
+        now = 1700000000
+        market = [[now * 1000 - i * hour, i] for i in range(120, -1, -1)]
+
+        def mock_chart_range(id: str, vs_currency: str, from_timestamp: int, to_timestamp: int,
+                             precision: str) -> dict:
+            prices = [point for point in market if from_timestamp * 1000 <= point[0] <= to_timestamp * 1000]
+            return {"prices": prices, "total_volumes": [[timestamp, 1] for timestamp, _ in prices]}
+
+        with mock.patch("pycoingecko.CoinGeckoAPI.get_coin_market_chart_range_by_id",
+                        side_effect=mock_chart_range) as mock_get_chart, \
+                mock.patch("smrti_quant_alerts.stock_crypto_api.crypto_coingecko_api.time.time",
+                           return_value=now) as mock_time:
             self.assertEqual(self.coingecko_api.get_coin_history_hourly_close_price(CoingeckoCoin("bitcoin", "BTC"),
                                                                                     3),
-                             [Decimal(30000), Decimal(20000), Decimal(10000)])
-
-            self.assertEqual(self.coingecko_api.get_coin_history_hourly_close_price(), [])
-
-        with mock.patch("pycoingecko.CoinGeckoAPI.get_coin_market_chart_by_id", return_value=Exception):
-            self.assertEqual(self.coingecko_api.get_coin_history_hourly_close_price(CoingeckoCoin("bitcoin", "BTC"),
+                             [Decimal(i) for i in range(73)])
+            self.assertEqual(mock_get_chart.call_args.kwargs["from_timestamp"], now - 3 * 86400)
+
+            # fresh charts are served from the store
+            self.assertEqual(len(self.coingecko_api.get_coin_history_hourly_close_price(
+                CoingeckoCoin("bitcoin", "BTC"), 2)), 49)
+            self.assertEqual(mock_get_chart.call_count, 1)
+
+            # stale charts are refilled with the minimum hourly range, replacing the live last point
+            market[-1][1] = 100
+            market += [[now * 1000 + hour, 101], [now * 1000 + 2 * hour, 102]]
+            now += 7200
+            mock_time.return_value = now
+            prices = self.coingecko_api.get_coin_history_hourly_close_price(CoingeckoCoin("bitcoin", "BTC"), 3)
+            self.assertEqual(prices, [Decimal(102), Decimal(101), Decimal(100)] + [Decimal(i) for i in range(1, 71)])
+            self.assertEqual(mock_get_chart.call_args.kwargs["from_timestamp"], now - 2 * 86400)
+            self.assertEqual(mock_get_chart.call_count, 2)
+
+        with mock.patch("pycoingecko.CoinGeckoAPI.get_coin_market_chart_range_by_id", side_effect=Exception):
+            self.assertEqual(self.coingecko_api.get_coin_history_hourly_close_price(CoingeckoCoin("test", "TEST"),
                                                                                     3), [])
 
-        with mock.patch("pycoingecko.CoinGeckoAPI.get_coin_market_chart_by_id", return_value={}):
-            self.assertEqual(self.coingecko_api.get_coin_history_hourly_close_price(CoingeckoCoin("bitcoin", "BTC"),
+        with mock.patch("pycoingecko.CoinGeckoAPI.get_coin_market_chart_range_by_id", return_value={}):
+            self.assertEqual(self.coingecko_api.get_coin_history_hourly_close_price(CoingeckoCoin("test", "TEST"),
                                                                                     3), [])
+        CoinChartDBUtils.clear()
+
+    def test_update_coin_chart_empty_response(self) -> None:
+        CoinChartDBUtils.clear()
+        now = 1700000000
+        coin = CoingeckoCoin("newcoin", "NEW")
+        with mock.patch("pycoingecko.CoinGeckoAPI.get_coin_market_chart_range_by_id",
+                        return_value={}) as mock_get_chart, \
+                mock.patch("smrti_quant_alerts.stock_crypto_api.crypto_coingecko_api.time.time", return_value=now):
+            self.coingecko_api.update_coin_chart(coin, "hourly", now - 86400)
+            self.assertEqual(CoinChartDBUtils.get_time_range("newcoin", "hourly"), (None, None))
+
+            # nothing stored, the history is fetched again from the start time
+            mock_get_chart.return_value = {"prices": [[now * 1000, 1]], "total_volumes": [[now * 1000, 2]]}
+            self.coingecko_api.update_coin_chart(coin, "hourly", now - 86400)
+            self.assertEqual(mock_get_chart.call_count, 2)
+            self.assertEqual(mock_get_chart.call_args.kwargs["from_timestamp"], now - 2 * 86400)
+            self.assertEqual(CoinChartDBUtils.get_points("newcoin", "hourly", 0), [(now * 1000, 1, 2)])
+        CoinChartDBUtils.clear()
 
     def test_get_coin_current_price(self) -> None:
         with mock.patch("pycoingecko.CoinGeckoAPI.get_price", return_value={
@@ -209,6 +293,7 @@ class TestCryptoCoingeckoApi(unittest.TestCase):
 
             self.assertEqual(self.coingecko_api.get_coin_current_price(), Decimal(0))
 
+        CoingeckoApi.clear_current_prices()
         with mock.patch("pycoingecko.CoinGeckoAPI.get_price", return_value=Exception):
             self.assertEqual(self.coingecko_api.get_coin_current_price(CoingeckoCoin("bitcoin", "BTC")),
                              Decimal(0))
@@ -216,3 +301,81 @@ class TestCryptoCoingeckoApi(unittest.TestCase):
         with mock.patch("pycoingecko.CoinGeckoAPI.get_price", return_value={}):
             self.assertEqual(self.coingecko_api.get_coin_current_price(CoingeckoCoin("bitcoin", "BTC")),
                              Decimal(0))
+
+    def test_get_coins_current_price(self) -> None:
+        coins = [CoingeckoCoin(f"coin{i}", f"C{i}") for i in range(5)]
+
+        def mock_get_price(ids: list, vs_currencies: str, precision: str) -> dict:
+            return {coin_id: {"usd": int(coin_id[4:])} for coin_id in ids if coin_id != "coin4"}
+
+        with mock.patch.object(CoingeckoApi, "PRICE_BATCH_SIZE", 2), \
+                mock.patch("pycoingecko.CoinGeckoAPI.get_price", side_effect=mock_get_price) as mock_price:
+            self.assertEqual(self.coingecko_api.get_coins_current_price(coins),
+                             {coins[i]: Decimal(i) for i in range(4)})
+            self.assertEqual(mock_price.call_count, 3)
+
+            # served from memory
+            self.assertEqual(self.coingecko_api.get_coin_current_price(coins[1]), Decimal(1))
+            self.assertEqual(self.coingecko_api.get_coins_current_price(coins[:2]),
+                             {coins[0]: Decimal(0), coins[1]: Decimal(1)})
+            self.assertEqual(mock_price.call_count, 3)
+
+        with mock.patch("pycoingecko.CoinGeckoAPI.get_price", side_effect=Exception):
+            self.assertEqual(self.coingecko_api.get_coins_current_price([CoingeckoCoin("test", "TEST")]), {})
+
+    def test_get_daily_volume_history(self) -> None:
+        CoinVolumeDBUtils.clear()
+        CoingeckoApi.clear_latest_volumes()
+        day = 86400 * 1000
+        now = 1700000000
+        today = now * 1000 // day * day
+        coins = [CoingeckoCoin("bitcoin", "BTC"), CoingeckoCoin("ethereum", "ETH")]
+        charts = {"bitcoin": {"total_volumes": [[today - i * day, 10 - i] for i in range(3, -1, -1)] +
+                              [[now * 1000, 11]]},
+                  "ethereum": {}}
+
+        with mock.patch("smrti_quant_alerts.stock_crypto_api.crypto_coingecko_api.time.time",
+                        return_value=now) as mock_time, \
+                mock.patch.object(CoingeckoApi, "get_coin_market_info",
+                                  side_effect=lambda coin, _, **kwargs: charts[coin.coin_id]) as mock_chart:
+            volumes = self.coingecko_api.get_daily_volume_history(coins, days=3)
+            self.assertEqual(volumes[0].tolist(), [8, 9, 10, 11])
+            self.assertTrue(np.isnan(volumes[1]).all())
+            self.assertEqual(mock_chart.call_count, 2)
+
+            # backfilled, the daily point at 00:00 is the volume of the day before,
+            # the market snapshot is only the latest 24h volume until it is recorded
+            with mock.patch("pycoingecko.CoinGeckoAPI.get_coins_markets", return_value=[
+                    {"id": "bitcoin", "symbol": "btc", "total_volume": 12},
+                    {"id": "ethereum", "symbol": "eth", "total_volume": 5}]):
+                self.coingecko_api.get_top_n_market_cap_coins(2)
+            volumes = self.coingecko_api.get_daily_volume_history(coins[:1], days=3)
+            self.assertEqual(volumes.tolist(), [[8, 9, 10, 12]])
+            self.assertEqual(mock_chart.call_count, 2)
+            backfilled = {CoingeckoApi._get_utc_date((today - i * day) / 1000 - 1): 10 - i for i in range(4)}
+            self.assertEqual(CoinVolumeDBUtils.get_volumes(["bitcoin"], "2000-01-01"), {"bitcoin": backfilled})
+
+            # the snapshot taken late in the day is recorded as the volume of the day
+            self.coingecko_api.record_daily_volume_snapshot()
+            today_str = CoingeckoApi._get_utc_date(now)
+            self.assertEqual(CoinVolumeDBUtils.get_volumes(["bitcoin", "ethereum"], "2000-01-01"),
+                             {"bitcoin": {**backfilled, today_str: 12}, "ethereum": {today_str: 5}})
+
+            # only the first snapshot of the day is recorded, whenever the next run is
+            mock_time.return_value = (today + day) / 1000 + 600
+            with mock.patch("pycoingecko.CoinGeckoAPI.get_coins_markets", return_value=[
+                    {"id": "bitcoin", "symbol": "btc", "total_volume": 13}]):
+                self.coingecko_api.get_top_n_market_cap_coins(1)
+            self.coingecko_api.record_daily_volume_snapshot()
+            volumes = self.coingecko_api.get_daily_volume_history(coins[:1], days=3)
+            self.assertEqual(volumes.tolist(), [[9, 10, 12, 13]])
+            self.assertEqual(mock_chart.call_count, 2)
+
+            # the latest 24h volume is requested again once expired
+            mock_time.return_value += CoingeckoApi.LATEST_VOLUME_TTL
+            charts["bitcoin"]["total_volumes"] = [[today, 10], [today + day, 13], [today + day + 4200 * 1000, 14]]
+            volumes = self.coingecko_api.get_daily_volume_history(coins[:1], days=3)
+            self.assertEqual(volumes.tolist(), [[9, 10, 13, 14]])
+            self.assertEqual(mock_chart.call_count, 3)
+        CoinVolumeDBUtils.clear()
+        CoingeckoApi.clear_latest_volumes()
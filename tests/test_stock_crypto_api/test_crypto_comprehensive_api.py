@@ -1,16 +1,30 @@
 import os
+import time
 import unittest
 from unittest import mock
 from decimal import Decimal
 
 
-from smrti_quant_alerts.stock_crypto_api import CryptoComprehensiveApi
+from smrti_quant_alerts.stock_crypto_api import CryptoComprehensiveApi, CoingeckoApi
+from smrti_quant_alerts.stock_crypto_api.reference_data_store import ReferenceDataStore
+from smrti_quant_alerts.db import CoinListingDBUtils, CoinVolumeDBUtils
 from smrti_quant_alerts.settings import Config
 from smrti_quant_alerts.data_type import BinanceExchange, CoingeckoCoin
 
 
+def to_volume_chart(volumes: list) -> dict:
+    """
+    daily market chart of the completed days of <volumes> and the latest 24h volume, <volumes>[-1]
+    """
+    day = 86400 * 1000
+    today = int(time.time()) * 1000 // day * day
+    return {"total_volumes": [[today - (len(volumes) - 2 - i) * day, volume] for i, volume in enumerate(volumes[:-1])] +
+            [[int(time.time() * 1000), volumes[-1]]]}
+
+
 class TestCryptoComprehensiveApi(unittest.TestCase):
     def setUp(self) -> None:
+        CoingeckoApi.clear_latest_volumes()
         with mock.patch("smrti_quant_alerts.stock_crypto_api.CryptoComprehensiveApi."
                         "_match_binance_exchange_to_coingecko_coins",
                         side_effect=lambda: print("test")):
@@ -29,6 +43,7 @@ class TestCryptoComprehensiveApi(unittest.TestCase):
 
     def test_match_binance_exchange_to_coingecko_coins(self) -> None:
         BinanceExchange.symbol_base_coingecko_id_map = {}
+        ReferenceDataStore.clear()
         with mock.patch("pycoingecko.CoinGeckoAPI.get_exchanges_tickers_by_id", return_value=[]):
             self.crypto_comprehensive_api._match_binance_exchange_to_coingecko_coins()
             self.assertEqual(BinanceExchange.symbol_base_coingecko_id_map, {})
@@ -39,7 +54,16 @@ class TestCryptoComprehensiveApi(unittest.TestCase):
             self.crypto_comprehensive_api._match_binance_exchange_to_coingecko_coins()
             self.assertEqual(BinanceExchange.symbol_base_coingecko_id_map, {"BTC": "bitcoin"})
 
+        # hydrated from the reference data store
+        BinanceExchange.symbol_base_coingecko_id_map = {}
+        with mock.patch("pycoingecko.CoinGeckoAPI.get_exchanges_tickers_by_id") as mock_tickers:
+            self.crypto_comprehensive_api._match_binance_exchange_to_coingecko_coins()
+            self.assertEqual(BinanceExchange.symbol_base_coingecko_id_map, {"BTC": "bitcoin"})
+            mock_tickers.assert_not_called()
+        ReferenceDataStore.clear()
+
     def test_get_coins_with_daily_volume_threshold_later_than_2023(self) -> None:
+        CoinListingDBUtils.clear()
         with mock.patch.object(CryptoComprehensiveApi, 'get_all_coingecko_coins',
                                return_value=[CoingeckoCoin("alt", "ALT")]):
             with mock.patch("pycoingecko.CoinGeckoAPI.get_coins_markets",
@@ -50,7 +74,7 @@ class TestCryptoComprehensiveApi(unittest.TestCase):
                                           {"id": "test", "symbol": "TEST", "total_volume": 1000000,
                                            "atl_date": "2023", "ath_date": None}]):
                 with mock.patch.object(CryptoComprehensiveApi, "get_coin_info",
-                                       return_value={"genesis_date": "2023"}):
+                                       return_value={"name": "alt", "genesis_date": "2023"}):
                     with mock.patch.object(CryptoComprehensiveApi, 'get_all_binance_exchanges',
                                            return_value=[BinanceExchange("ALT", "USDT"),
                                                          BinanceExchange("ALT", "TEST")]):
@@ -75,11 +99,31 @@ class TestCryptoComprehensiveApi(unittest.TestCase):
                         self.assertEqual(binance_exchanges, [])
                         self.assertEqual(coingecko_coins, [CoingeckoCoin("alt", "ALT")])
 
+        # genesis dates are stored, coins listed before 2023 are skipped
+        listings = CoinListingDBUtils.get_listings()
+        self.assertEqual(listings["alt"]["genesis_date"], "2023")
+        self.assertEqual(listings["tether"]["ath_date"], "2021")
+        CoinListingDBUtils.update_genesis_dates({"alt": "2020"})
+        with mock.patch.object(CryptoComprehensiveApi, 'get_all_coingecko_coins',
+                               return_value=[CoingeckoCoin("alt", "ALT"), CoingeckoCoin("tether", "USDT"),
+                                             CoingeckoCoin("new", "NEW")]), \
+                mock.patch("pycoingecko.CoinGeckoAPI.get_coins_markets",
+                           return_value=[{"id": "new", "symbol": "NEW", "atl_date": "2024",
+                                          "ath_date": "2024", "total_volume": 1000}]) as mock_markets, \
+                mock.patch.object(CryptoComprehensiveApi, "get_coin_info",
+                                  return_value={"name": "new", "genesis_date": ""}) as mock_coin_info:
+            self.assertEqual(self.crypto_comprehensive_api.get_coins_with_daily_volume_threshold_later_than_2023(100),
+                             ([], [CoingeckoCoin("new", "NEW")]))
+            self.assertEqual(mock_markets.call_args.kwargs["ids"], ["new"])
+            mock_coin_info.assert_called_once_with(CoingeckoCoin("new", "NEW"))
+        CoinListingDBUtils.clear()
+
     def test_get_top_market_cap_coins_with_volume_threshold(self):
-        return_value = {"ALT": {"total_volumes": [[0, 100], [0, 200]]},
-                        "BTC": {"total_volumes": [[0, 100], [0, 2]]},
-                        "USDT": {"total_volumes": [[0, 100], [0, 200]]},
-                        "TEST": {"total_volumes": [[0, 100], [0, 200]]}}
+        CoinVolumeDBUtils.clear()
+        return_value = {"ALT": to_volume_chart([100, 200]),
+                        "BTC": to_volume_chart([100, 2]),
+                        "USDT": to_volume_chart([100, 200]),
+                        "TEST": to_volume_chart([100, 200])}
         with mock.patch.object(CryptoComprehensiveApi, 'get_top_n_market_cap_coins',
                                return_value=[CoingeckoCoin("alt", "ALT"), CoingeckoCoin("bitcoin", "BTC"),
                                              CoingeckoCoin("tether", "USDT"), CoingeckoCoin("test", "TEST")]):
@@ -96,6 +140,18 @@ class TestCryptoComprehensiveApi(unittest.TestCase):
                                       BinanceExchange("ALT", "ETH"), BinanceExchange("TEST", "USDT")})
                     self.assertEqual(coingecko_coins, [CoingeckoCoin("tether", "USDT")])
 
+                    # coins of <volume_checks> are not checked again
+                    volume_checks = {CoingeckoCoin("tether", "USDT"): False}
+                    binance_exchanges, coingecko_coins = \
+                        self.crypto_comprehensive_api.get_top_market_cap_coins_with_volume_threshold(
+                            2, 50, 50, market_list=[CoingeckoCoin("tether", "USDT"), CoingeckoCoin("bitcoin", "BTC"),
+                                                    CoingeckoCoin("alt", "ALT")], volume_checks=volume_checks)
+                    self.assertEqual((binance_exchanges, coingecko_coins), ([], []))
+                    self.assertEqual(volume_checks, {CoingeckoCoin("tether", "USDT"): False,
+                                                     CoingeckoCoin("bitcoin", "BTC"): False})
+
+                CoinVolumeDBUtils.clear()
+                CoingeckoApi.clear_latest_volumes()
                 with mock.patch("smrti_quant_alerts.stock_crypto_api.CoingeckoApi.get_coin_market_info",
                                 side_effect=Exception):
                     binance_exchanges, coingecko_coins = \
@@ -104,18 +160,11 @@ class TestCryptoComprehensiveApi(unittest.TestCase):
                     self.assertEqual(coingecko_coins, [])
 
     def test_get_coins_with_weekly_volume_increase(self) -> None:
-        return_value = {"ALT": {"total_volumes": [[0, 0], [0, 0], [0, 0], [0, 0], [0, 0],
-                                                  [0, 0], [0, 0], [0, 100], [0, 200], [0, 300],
-                                                  [0, 400], [0, 500], [0, 600], [0, 700]]},
-                        "BTC": {"total_volumes": [[0, 1], [0, 0], [0, 0], [0, 0], [0, 0],
-                                                  [0, 0], [0, 0], [0, 100], [0, 200], [0, 300],
-                                                  [0, 400], [0, 500], [0, 600], [0, 700]]},
-                        "USDT": {"total_volumes": [[0, 10000000000], [0, 0], [0, 0], [0, 0], [0, 0],
-                                                   [0, 0], [0, 0], [0, 100], [0, 200], [0, 300],
-                                                   [0, 400], [0, 500], [0, 600], [0, 700]]},
-                        "TEST": {"total_volumes": [[0, 2], [0, 0], [0, 0], [0, 0], [0, 0],
-                                                   [0, 0], [0, 0], [0, 100], [0, 200], [0, 300],
-                                                   [0, 400], [0, 500], [0, 600], [0, 700]]}}
+        CoinVolumeDBUtils.clear()
+        return_value = {"ALT": to_volume_chart([0, 0, 0, 0, 0, 0, 0, 100, 200, 300, 400, 500, 600, 700]),
+                        "BTC": to_volume_chart([1, 0, 0, 0, 0, 0, 0, 100, 200, 300, 400, 500, 600, 700]),
+                        "USDT": to_volume_chart([10000000000, 0, 0, 0, 0, 0, 0, 100, 200, 300, 400, 500, 600, 700]),
+                        "TEST": to_volume_chart([2, 0, 0, 0, 0, 0, 0, 100, 200, 300, 400, 500, 600, 700])}
         with mock.patch.object(CryptoComprehensiveApi, 'get_top_n_market_cap_coins',
                                return_value=[CoingeckoCoin("alt", "ALT"), CoingeckoCoin("bitcoin", "BTC"),
                                              CoingeckoCoin("tether", "USDT"), CoingeckoCoin("test", "TEST")]):
@@ -132,6 +181,8 @@ class TestCryptoComprehensiveApi(unittest.TestCase):
                                       BinanceExchange("ALT", "ETH"), BinanceExchange("BTC", "USDT")})
                     self.assertEqual(coingecko_coins, [CoingeckoCoin("test", "TEST")])
 
+                CoinVolumeDBUtils.clear()
+                CoingeckoApi.clear_latest_volumes()
                 with mock.patch("smrti_quant_alerts.stock_crypto_api.CoingeckoApi.get_coin_market_info",
                                 return_value=Exception):
                     binance_exchanges, coingecko_coins = \
@@ -0,0 +1,55 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from smrti_quant_alerts.settings import Config
+from smrti_quant_alerts.data_type import BinanceExchange, CoingeckoCoin
+from smrti_quant_alerts.stock_crypto_api.exclude_coin_index import ExcludeCoinIndex
+
+
+class TestExcludeCoinIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.project_dir = Config.PROJECT_DIR
+        Config.PROJECT_DIR = tempfile.mkdtemp()
+        with open(os.path.join(Config.PROJECT_DIR, "stable_coins.json"), "w") as f:
+            json.dump(["USDT"], f)
+        ExcludeCoinIndex.clear()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(Config.PROJECT_DIR)
+        Config.PROJECT_DIR = self.project_dir
+        ExcludeCoinIndex.clear()
+
+    def test_get_binance_excludes(self) -> None:
+        spot = [BinanceExchange("USDT", "BTC"), BinanceExchange("ALT", "USDT"), BinanceExchange("ALT", "ETH"),
+                BinanceExchange("ALT", "TRY")]
+        future = [BinanceExchange("ALTS", "USDT")]
+        self.assertEqual(ExcludeCoinIndex.get_binance_excludes(spot, future), {BinanceExchange("USDT", "BTC")})
+        self.assertEqual(ExcludeCoinIndex.get_exchanges_by_base("alt"),
+                         (BinanceExchange("ALT", "USDT"), BinanceExchange("ALT", "ETH")))
+
+        # rebuilt when a json file changes
+        with open(os.path.join(Config.PROJECT_DIR, "exclude_coins.json"), "w") as f:
+            json.dump(["alt", "ALTSUSDT"], f)
+        self.assertEqual(ExcludeCoinIndex.get_binance_excludes(spot, future),
+                         {BinanceExchange("USDT", "BTC"), BinanceExchange("ALT", "USDT"),
+                          BinanceExchange("ALT", "ETH"), BinanceExchange("ALTS", "USDT")})
+
+        # rebuilt when the exchange lists change
+        self.assertEqual(ExcludeCoinIndex.get_binance_excludes(spot[1:], future), {
+            BinanceExchange("ALT", "USDT"), BinanceExchange("ALT", "ETH"), BinanceExchange("ALTS", "USDT")})
+
+    def test_get_coingecko_excludes(self) -> None:
+        catalog = [["tether", "usdt", ""], ["tether-2", "usdt", ""], ["bitcoin", "btc", ""]]
+        self.assertEqual(ExcludeCoinIndex.get_coingecko_excludes(catalog),
+                         {CoingeckoCoin("tether", "USDT"), CoingeckoCoin("tether-2", "USDT")})
+
+        with open(os.path.join(Config.PROJECT_DIR, "exclude_coins.json"), "w") as f:
+            json.dump(["ALTUSDT"], f)
+        BinanceExchange("ALT", "USDT")
+        BinanceExchange.add_base_coin_id_pair_to_dict("ALT", "alt")
+        self.assertEqual(ExcludeCoinIndex.get_coingecko_excludes(catalog),
+                         {CoingeckoCoin("tether", "USDT"), CoingeckoCoin("tether-2", "USDT"),
+                          CoingeckoCoin("alt", "ALT")})
@@ -0,0 +1,30 @@
+import unittest
+from decimal import Decimal
+
+import numpy as np
+
+from smrti_quant_alerts.stock_crypto_api.moving_average_engine import MovingAverageEngine
+
+
+class TestMovingAverageEngine(unittest.TestCase):
+    def setUp(self) -> None:
+        # newest first
+        self.engine = MovingAverageEngine([[6, 5, 4, 3, 2, 1], [Decimal(1), Decimal(3)], []], [5, 3, 1])
+
+    def test_get_moving_averages(self) -> None:
+        moving_averages = self.engine.get_moving_averages([(1, 2), (2, 3), (1, 10), (4, 2)])
+        np.testing.assert_array_equal(moving_averages[:, :2], [[5.5, 2], [4, 1], [3.5, 2], [4, 1]])
+        self.assertTrue(np.isnan(moving_averages[:, 2]).all())
+
+    def test_get_spot_over_ma(self) -> None:
+        self.assertEqual(self.engine.get_spot_over_ma([(1, 2), (2, 3)]).tolist(),
+                         [[False, True, False], [True, True, False]])
+        # the newest closes are the current prices by default
+        engine = MovingAverageEngine(np.array([[3, 1, 2], [1, 3, np.nan]]))
+        self.assertEqual(engine.get_spot_over_ma([(1, 3)]).tolist(), [[True, False]])
+
+    def test_empty(self) -> None:
+        engine = MovingAverageEngine([])
+        self.assertEqual(engine.get_spot_over_ma([(1, 200)]).shape, (1, 0))
+        engine = MovingAverageEngine([[], []])
+        self.assertEqual(engine.get_spot_over_ma([(1, 200), (4, 200)]).tolist(), [[False, False], [False, False]])
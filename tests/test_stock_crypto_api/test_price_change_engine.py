@@ -0,0 +1,53 @@
+import unittest
+
+import numpy as np
+
+from smrti_quant_alerts.data_type import StockSymbol
+from smrti_quant_alerts.stock_crypto_api.eod_bulk_store import EodSnapshot
+from smrti_quant_alerts.stock_crypto_api.price_change_engine import PriceChangeEngine
+
+
+def to_snapshot(prices: dict) -> EodSnapshot:
+    return EodSnapshot(np.array(list(prices.keys()), dtype=str),
+                       np.array(list(prices.values()), dtype=np.float64), np.ones(len(prices)))
+
+
+class TestPriceChangeEngine(unittest.TestCase):
+    def setUp(self) -> None:
+        latest = to_snapshot({"MSFT": 300, "AAPL": 100, "TSLA": 50, "BRK-B": 120})
+        history = {"1D": to_snapshot({"AAPL": 50, "MSFT": 300, "TSLA": 100, "GONE": 10}),
+                   "1M": to_snapshot({"BRK-B": 100})}
+        self.engine = PriceChangeEngine(latest, history)
+
+    def test_price_changes(self) -> None:
+        self.assertEqual(self.engine.codes.tolist(), ["AAPL", "BRK-B", "MSFT", "TSLA"])
+        self.assertEqual(self.engine.get_index(["TSLA", "GONE", "AAPL", "A"]).tolist(), [3, -1, 0, -1])
+        self.assertEqual(self.engine.get_price_changes(),
+                         {StockSymbol("AAPL"): {"1D": 100, "1M": 0}, StockSymbol("BRK-B"): {"1D": 0, "1M": 20},
+                          StockSymbol("MSFT"): {"1D": 0, "1M": 0}, StockSymbol("TSLA"): {"1D": -50, "1M": 0}})
+
+    def test_get_sorted(self) -> None:
+        self.assertEqual(self.engine.get_sorted("1D"), [("AAPL", 100), ("BRK-B", 0), ("MSFT", 0), ("TSLA", -50)])
+        self.assertEqual(self.engine.get_sorted("1M")[0], ("BRK-B", 20))
+
+    def test_get_top_by_group(self) -> None:
+        groups = {"a": [StockSymbol("TSLA"), StockSymbol("MSFT"), StockSymbol("AAPL"), StockSymbol("BRK-B")],
+                  "b": [StockSymbol("GONE")]}
+        self.assertEqual(self.engine.get_top_by_group("1D", groups, 50), {"a": [("AAPL", 100), ("MSFT", 0)]})
+        self.assertEqual(self.engine.get_top_by_group("1D", groups, 10), {"a": []})
+        self.assertEqual(self.engine.get_top_by_group("1D", groups),
+                         {"a": [("AAPL", 100), ("MSFT", 0), ("BRK-B", 0), ("TSLA", -50)]})
+
+        # the equal changes at the cut keep the group order
+        codes = [f"S{i:02d}" for i in range(40)]
+        engine = PriceChangeEngine(to_snapshot({code: 2 if code == "S39" else 1 for code in codes}),
+                                   {"1D": to_snapshot({code: 1 for code in codes})})
+        group = [StockSymbol(code) for code in reversed(codes)]
+        self.assertEqual(engine.get_top_by_group("1D", {"a": group}, 25),
+                         {"a": [("S39", 100)] + [(code, 0) for code in ["S38", "S37", "S36", "S35", "S34",
+                                                                        "S33", "S32", "S31", "S30"]]})
+
+    def test_empty(self) -> None:
+        engine = PriceChangeEngine(EodSnapshot.empty(), {"1D": EodSnapshot.empty()})
+        self.assertEqual(engine.get_sorted("1D"), [])
+        self.assertEqual(engine.get_top_by_group("1D", {"a": [StockSymbol("AAPL")]}, 50), {})
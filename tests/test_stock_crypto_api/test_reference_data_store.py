@@ -0,0 +1,42 @@
+import unittest
+from unittest import mock
+
+from smrti_quant_alerts.stock_crypto_api.reference_data_store import ReferenceDataStore
+
+
+class TestReferenceDataStore(unittest.TestCase):
+    def setUp(self) -> None:
+        ReferenceDataStore.clear()
+
+    def tearDown(self) -> None:
+        ReferenceDataStore.clear()
+
+    def test_get(self) -> None:
+        fetch = mock.MagicMock(return_value=[["bitcoin", "btc", ""]])
+        now = 1700000000
+        with mock.patch("smrti_quant_alerts.stock_crypto_api.reference_data_store.time.time",
+                        return_value=now) as mock_time:
+            self.assertEqual(ReferenceDataStore.get("coingecko_coins", fetch), [["bitcoin", "btc", ""]])
+            self.assertEqual(fetch.call_count, 1)
+
+            # served from disk in a new process
+            ReferenceDataStore._memory_cache = {}
+            self.assertEqual(ReferenceDataStore.get("coingecko_coins", fetch), [["bitcoin", "btc", ""]])
+            self.assertEqual(fetch.call_count, 1)
+
+            # expired, served while refreshed in the background
+            fetch.return_value = [["ethereum", "eth", ""]]
+            mock_time.return_value = now + ReferenceDataStore.get_ttl("coingecko_coins") * 3600
+            self.assertEqual(ReferenceDataStore.get("coingecko_coins", fetch), [["bitcoin", "btc", ""]])
+            ReferenceDataStore.wait_for_refreshes()
+            self.assertEqual(fetch.call_count, 2)
+            self.assertEqual(ReferenceDataStore.get("coingecko_coins", fetch), [["ethereum", "eth", ""]])
+
+            # empty results are not stored
+            ReferenceDataStore.clear()
+            fetch.return_value = []
+            self.assertEqual(ReferenceDataStore.get("coingecko_coins", fetch), [])
+            self.assertIsNone(ReferenceDataStore._load("coingecko_coins"))
+
+        with mock.patch.dict(ReferenceDataStore.DEFAULT_TTLS, {"coingecko_coins": 1}):
+            self.assertEqual(ReferenceDataStore.get_ttl("coingecko_coins"), 1)
@@ -1,8 +1,10 @@
+import json
 import unittest
 import datetime
 import importlib
 from unittest import mock
 
+import numpy as np
 import pandas as pd
 import pytz
 
@@ -10,6 +12,8 @@ import smrti_quant_alerts.stock_crypto_api.stock_api
 from smrti_quant_alerts.stock_crypto_api import StockApi
 from smrti_quant_alerts.data_type import StockSymbol, FinancialMetricsData, FinancialDataType, FinancialMetricType
 from smrti_quant_alerts.stock_crypto_api.utility import get_datetime_now
+from smrti_quant_alerts.db import StockBarDBUtils
+from smrti_quant_alerts.stock_crypto_api.eod_bulk_store import EodBulkStore, EodSnapshot
 
 
 class MockStock:
@@ -23,27 +27,22 @@ class TestStockApi(unittest.TestCase):
         self.stock_api = StockApi()
 
     def test_get_sp_500_list(self) -> None:
-        with mock.patch("requests.get", return_value=mock.Mock(json=lambda: [{"symbol": "SPGI", "name": "S&P Global",
-                                                                              "sector": "Financials",
-                                                                              "subSector": "Financial Exchanges & Data",
-                                                                              "headQuarter": "New York City, New York",
-                                                                              "dateFirstAdded": "1957-03-04",
-                                                                              "cik": "0000064040",
-                                                                              "founded": "1917"}])):
+        return_value = [{"symbol": "SPGI", "name": "S&P Global", "sector": "Financials",
+                         "subSector": "Financial Exchanges & Data", "headQuarter": "New York City, New York",
+                         "dateFirstAdded": "1957-03-04", "cik": "0000064040", "founded": "1917"}]
+        with mock.patch("requests.Session.get", return_value=mock.Mock(json=lambda: return_value)):
             stock_list = self.stock_api.get_sp_500_list()
             self.assertEqual(stock_list, [StockSymbol("SPGI", "S&P Global", sp500=True)])
 
     def test_get_nasdaq_list(self) -> None:
-        with mock.patch("requests.get", return_value=mock.Mock(json=lambda: [{"symbol": "AAPL", "name": "Apple Inc.",
-                                                                              "exchangeShortName": "NASDAQ",
-                                                                              "type": "stock"}])):
+        return_value = [{"symbol": "AAPL", "name": "Apple Inc.", "exchangeShortName": "NASDAQ", "type": "stock"}]
+        with mock.patch("requests.Session.get", return_value=mock.Mock(json=lambda: return_value)):
             stock_list = self.stock_api.get_nasdaq_list()
             self.assertEqual(stock_list, [StockSymbol("AAPL", "Apple Inc.", nasdaq=True)])
 
     def test_get_nyse_list(self) -> None:
-        with mock.patch("requests.get", return_value=mock.Mock(json=lambda: [{"symbol": "AAPL", "name": "Apple Inc.",
-                                                                              "exchangeShortName": "NYSE",
-                                                                              "type": "stock"}])):
+        return_value = [{"symbol": "AAPL", "name": "Apple Inc.", "exchangeShortName": "NYSE", "type": "stock"}]
+        with mock.patch("requests.Session.get", return_value=mock.Mock(json=lambda: return_value)):
             stock_list = self.stock_api.get_nyse_list()
             self.assertEqual(stock_list, [StockSymbol("AAPL", "Apple Inc.", nyse=True)])
 
@@ -54,31 +53,131 @@ class TestStockApi(unittest.TestCase):
                          "volume": 180, "exchange_short_name": "US"},
                         {"code": "AAPL", "date": "2024-05-17", "adjusted_close": 100,
                          "volume": 2, "exchange_short_name": "US"}]
-        with mock.patch("requests.get", return_value=mock.Mock(json=lambda: return_value, status_code=200)):
+        EodBulkStore.clear()
+        response = mock.Mock(iter_content=lambda chunk_size: [json.dumps(return_value).encode()], status_code=200)
+        with mock.patch("requests.Session.get", return_value=response):
             prices, volumes = self.stock_api.get_all_stock_price_volume_by_day_delta(1)
             self.assertEqual(prices, {StockSymbol("MSFT"): 300, StockSymbol("AAPL"): 100})
             self.assertEqual(volumes, {StockSymbol("MSFT"): 180, StockSymbol("AAPL"): 2})
 
-        with mock.patch("requests.get", return_value=Exception):
+        # finished days are served from the store
+        with mock.patch("requests.Session.get", return_value=Exception):
+            prices, volumes = self.stock_api.get_all_stock_price_volume_by_day_delta(1)
+            self.assertEqual(prices, {StockSymbol("MSFT"): 300, StockSymbol("AAPL"): 100})
+
+            EodBulkStore.clear()
             prices, volumes = self.stock_api.get_all_stock_price_volume_by_day_delta(1)
             self.assertEqual(prices, {})
             self.assertEqual(volumes, {})
 
     @mock.patch("smrti_quant_alerts.stock_crypto_api.stock_api.get_datetime_now")
-    def test_get_all_stock_price_change_percentage(self, mock_time_now) -> None:
-        mock_time_now.return_value = datetime.datetime(2024, 5, 19, 5, 0, 0)
-        return_value = {1: ({StockSymbol("MSFT"): 300, StockSymbol("AAPL"): 100, StockSymbol("TEST"): 90}, {}),
-                        2: ({StockSymbol("MSFT"): 150, StockSymbol("AAPL"): 100}, {})}
-        with mock.patch("smrti_quant_alerts.stock_crypto_api.stock_api."
-                        "StockApi.get_all_stock_price_volume_by_day_delta",
-                        side_effect=lambda date_delta: return_value[date_delta]):
+    def test_get_eod_bulk_snapshot(self, mock_time_now) -> None:
+        EodBulkStore.clear()
+        mock_time_now.return_value = datetime.datetime(2024, 5, 28, 5, 0, 0)
+        requested_dates = []
+
+        def mock_get(url: str, timeout: int, stream: bool) -> mock.Mock:
+            date = url.split("date=")[1][:10]
+            requested_dates.append(date)
+            # 2024-05-27 is a holiday
+            rows = [] if date == "2024-05-27" else [{"code": "aapl", "date": date, "adjusted_close": 100,
+                                                     "volume": 2, "exchange_short_name": "US"}]
+            return mock.Mock(iter_content=lambda chunk_size: [json.dumps(rows).encode()], status_code=200)
+
+        with mock.patch("requests.Session.get", side_effect=mock_get):
+            date, snapshot = self.stock_api.get_eod_bulk_snapshot(1)
+            self.assertEqual(date, "2024-05-24")
+            self.assertEqual(snapshot.codes.tolist(), ["AAPL"])
+            self.assertEqual(requested_dates, ["2024-05-27", "2024-05-24"])
+            # the recent holiday may just not be published yet, it is not stored
+            self.assertEqual(EodBulkStore.get_dates(), ["2024-05-24"])
+
+            # the stored day is not requested again, today is not stored
+            requested_dates.clear()
+            self.assertEqual(self.stock_api.get_eod_bulk_snapshot(1)[0], "2024-05-24")
+            self.assertEqual(self.stock_api.get_eod_bulk_snapshot(0)[0], "2024-05-28")
+            self.assertEqual(requested_dates, ["2024-05-27", "2024-05-28"])
+            self.assertEqual(EodBulkStore.get_dates(), ["2024-05-24"])
+
+            # a recent empty snapshot stored before is requested again
+            EodBulkStore.save("2024-05-27", EodSnapshot.empty())
+            requested_dates.clear()
+            self.assertEqual(self.stock_api.get_eod_bulk_snapshot(1)[0], "2024-05-24")
+            self.assertEqual(requested_dates, ["2024-05-27"])
+
+            # once old enough, the holiday is stored and not requested again
+            EodBulkStore.clear()
+            mock_time_now.return_value = datetime.datetime(2024, 6, 3, 5, 0, 0)
+            requested_dates.clear()
+            self.assertEqual(self.stock_api.get_eod_bulk_snapshot(7)[0], "2024-05-24")
+            self.assertEqual(requested_dates, ["2024-05-27", "2024-05-24"])
+            self.assertEqual(EodBulkStore.get_dates(), ["2024-05-24", "2024-05-27"])
+            requested_dates.clear()
+            self.assertEqual(self.stock_api.get_eod_bulk_snapshot(7)[0], "2024-05-24")
+            self.assertEqual(requested_dates, [])
+        EodBulkStore.clear()
+
+    @mock.patch("smrti_quant_alerts.stock_crypto_api.stock_api.get_datetime_now")
+    def test_get_eod_bulk_snapshot_corporate_actions(self, mock_time_now) -> None:
+        EodBulkStore.clear()
+        mock_time_now.return_value = datetime.datetime(2024, 5, 23, 5, 0, 0)
+        # AAPL splits 2:1 on 2024-05-23
+        adjusted_closes = {"2024-05-21": {"aapl": 200, "msft": 300}, "2024-05-22": {"aapl": 210, "msft": 310}}
+        requested_dates = []
+
+        def mock_get(url: str, timeout: int, stream: bool) -> mock.Mock:
+            date = url.split("date=")[1][:10]
+            requested_dates.append(date)
+            rows = [{"code": code, "date": date, "adjusted_close": price, "volume": 1, "exchange_short_name": "US"}
+                    for code, price in adjusted_closes.get(date, {}).items()]
+            return mock.Mock(iter_content=lambda chunk_size: [json.dumps(rows).encode()], status_code=200)
+
+        with mock.patch("requests.Session.get", side_effect=mock_get):
+            self.assertEqual(self.stock_api.get_eod_bulk_snapshot(2)[1].prices.tolist(), [200, 300])
+            self.assertEqual(self.stock_api.get_eod_bulk_snapshot(1)[1].prices.tolist(), [210, 310])
+
+            # the newest stored day is downloaded again before a new newest day is stored
+            mock_time_now.return_value = datetime.datetime(2024, 5, 24, 5, 0, 0)
+            adjusted_closes = {"2024-05-21": {"aapl": 100, "msft": 300}, "2024-05-22": {"aapl": 105, "msft": 310},
+                               "2024-05-23": {"aapl": 106, "msft": 311}, "2024-05-20": {"aapl": 99, "msft": 290}}
+            requested_dates.clear()
+            self.assertEqual(self.stock_api.get_eod_bulk_snapshot(1)[1].prices.tolist(), [106, 311])
+            self.assertEqual(requested_dates, ["2024-05-23", "2024-05-22"])
+
+            # the stored snapshots are adjusted, the ones downloaded since are not
+            requested_dates.clear()
+            self.assertEqual(self.stock_api.get_eod_bulk_snapshot(2)[1].prices.tolist(), [105, 310])
+            self.assertEqual(self.stock_api.get_eod_bulk_snapshot(3)[1].prices.tolist(), [100, 300])
+            self.assertEqual(self.stock_api.get_eod_bulk_snapshot(4)[1].prices.tolist(), [99, 290])
+            self.assertEqual(requested_dates, ["2024-05-20"])
+            self.assertEqual(self.stock_api.get_eod_bulk_snapshot(4)[1].prices.tolist(), [99, 290])
+
+            # without the newest stored day, the new one is not stored
+            EodBulkStore.clear()
+            adjusted_closes = {"2024-05-22": {"aapl": 105, "msft": 310}}
+            self.stock_api.get_eod_bulk_snapshot(2)
+            mock_time_now.return_value = datetime.datetime(2024, 5, 25, 5, 0, 0)
+            adjusted_closes = {"2024-05-24": {"aapl": 107, "msft": 312}}
+            self.assertEqual(self.stock_api.get_eod_bulk_snapshot(1)[0], "2024-05-24")
+            self.assertEqual(EodBulkStore.get_dates(), ["2024-05-22"])
+        EodBulkStore.clear()
+
+    def test_get_all_stock_price_change_percentage(self) -> None:
+        def to_snapshot(prices: dict) -> tuple:
+            return "", EodSnapshot(np.array(list(prices.keys()), dtype=str),
+                                   np.array(list(prices.values()), dtype=np.float64), np.ones(len(prices)))
+
+        return_value = {1: to_snapshot({"MSFT": 300, "AAPL": 100, "TEST": 90}),
+                        2: to_snapshot({"MSFT": 150, "AAPL": 100})}
+        with mock.patch("smrti_quant_alerts.stock_crypto_api.stock_api.StockApi.get_eod_bulk_snapshot",
+                        side_effect=lambda day_delta: return_value[day_delta]):
             stock_price_change_percentage = self.stock_api.get_all_stock_price_change_percentage(["1D"])
             self.assertEqual(stock_price_change_percentage,
                              {StockSymbol("MSFT"): {"1D": 100}, StockSymbol("AAPL"): {"1D": 0},
                               StockSymbol("TEST"): {"1D": 0}})
 
             for i in [6, 31, 91, 181, 366, 1096, 1826, 3651]:
-                return_value[i] = ({StockSymbol("MSFT"): 150, StockSymbol("AAPL"): 100}, {})
+                return_value[i] = to_snapshot({"MSFT": 150, "AAPL": 100})
             stock_price_change_percentage = self.stock_api.get_all_stock_price_change_percentage()
             self.assertEqual(stock_price_change_percentage,
                              {StockSymbol("MSFT"): {"1D": 100, "5D": 100, "1M": 100, "3M": 100, "6M": 100,
@@ -88,6 +187,15 @@ class TestStockApi(unittest.TestCase):
                               StockSymbol("TEST"): {"1D": 0, "5D": 0, "1M": 0, "3M": 0, "6M": 0, "1Y": 0,
                                                     "3Y": 0, "5Y": 0, "10Y": 0}})
 
+            sectors = {"Tech": [StockSymbol("AAPL"), StockSymbol("MSFT"), StockSymbol("NONE")],
+                       "Test": [StockSymbol("TEST")], "Empty": [StockSymbol("NONE")]}
+            with mock.patch.object(StockApi, "get_all_non_etf_stocks_by_gics_sector", return_value=sectors):
+                res = self.stock_api.get_all_non_etf_stocks_price_change_percentage_by_gics_sector_timeframes(
+                    ["1D", "5D"], 70)
+                self.assertEqual(res["1D"], {"Tech": [(StockSymbol("MSFT"), 100), (StockSymbol("AAPL"), 0)],
+                                             "Test": []})
+                self.assertEqual(res["5D"], res["1D"])
+
     def test_get_stock_info(self) -> None:
         stock_list = [StockSymbol("AAPL", "Apple Inc.", "Information Technology",
                                   "Technology Hardware", "Cupertino, California",
@@ -101,7 +209,7 @@ class TestStockApi(unittest.TestCase):
                    left.is_sp500 == right.is_sp500 and left.is_nasdaq == right.is_nasdaq and \
                    left.ticker == right.ticker
 
-        with mock.patch("requests.get",
+        with mock.patch("requests.Session.get",
                         return_value=mock.Mock(json=lambda: [{"symbol": "MS.FT", "companyName": "Microsoft",
                                                               "sector": "Information Technology",
                                                               "industry": "Technology Hardware",
@@ -118,7 +226,7 @@ class TestStockApi(unittest.TestCase):
                                                       "789019", "1975", sp500=True)))
 
     def test_get_top_market_cap_stocks(self) -> None:
-        with mock.patch("requests.get",
+        with mock.patch("requests.Session.get",
                         return_value=mock.Mock(json=lambda: {"data": [{"code": "AAPL", "name": "Apple Inc.",
                                                                        "market_capitalization": 2000},
                                                                       {"code": "MSFT", "name": "Microsoft",
@@ -128,3 +236,149 @@ class TestStockApi(unittest.TestCase):
             stock_list = self.stock_api.get_top_market_cap_stocks(2)
             self.assertEqual(stock_list, [[StockSymbol("AAPL"), FinancialMetricsData(2000)],
                                           [StockSymbol("MSFT"), FinancialMetricsData(1500)]])
+
+    def test_get_stocks_quotes(self) -> None:
+        quotes = {"AAPL": {"symbol": "AAPL", "price": 100, "marketCap": 2000},
+                  "MSFT": {"symbol": "MSFT", "price": 200, "marketCap": None}}
+        requested_urls = []
+
+        def mock_get(url: str, timeout: int) -> mock.Mock:
+            requested_urls.append(url)
+            tickers = url.split("/")[-1].split("?")[0].split(",")
+            return mock.Mock(json=lambda: [quotes[ticker] for ticker in tickers if ticker in quotes])
+
+        stock_list = [StockSymbol("AAPL"), StockSymbol("MSFT"), StockSymbol("TSLA")]
+        with mock.patch("requests.Session.get", side_effect=mock_get), mock.patch.object(StockApi, "BATCH_SIZE", 2):
+            self.assertEqual(self.stock_api.get_stocks_quotes(stock_list),
+                             {StockSymbol("AAPL"): quotes["AAPL"], StockSymbol("MSFT"): quotes["MSFT"]})
+            self.assertEqual(sorted(url.split("?")[0] for url in requested_urls),
+                             [f"{StockApi.FMP_API_URL}/v3/quote/AAPL,MSFT", f"{StockApi.FMP_API_URL}/v3/quote/TSLA"])
+
+            # a null market cap is omitted
+            self.assertEqual(self.stock_api.get_stocks_market_cap(stock_list),
+                             {StockSymbol("AAPL"): FinancialMetricsData(2000)})
+
+    @mock.patch("smrti_quant_alerts.stock_crypto_api.stock_api.get_datetime_now")
+    def test_get_close_price_sma_status(self, mock_time_now) -> None:
+        StockBarDBUtils.clear()
+        # Friday evening
+        mock_time_now.return_value = datetime.datetime(2024, 5, 17, 19, 0, 0)
+        daily_bars = {"AAPL": [{"date": f"2024-05-{16 - i}", "close": 90} for i in range(3)],
+                      "MSFT": [{"date": "2024-05-16", "close": 90}]}
+        intraday_bars = [{"date": date, "close": 110}
+                         for date in ["2024-05-17 13:30:00", "2024-05-17 09:30:00", "2024-05-16 13:30:00"]]
+        requested_urls = []
+
+        def mock_get(url: str, timeout: int) -> mock.Mock:
+            if "/quote/" in url:
+                return mock.Mock(json=lambda: [{"symbol": "AAPL", "price": 100}, {"symbol": "MSFT", "price": 100}])
+            requested_urls.append(url)
+            ticker = url.split("?")[0].split("/")[-1]
+            if "historical-price-full" in url:
+                return mock.Mock(json=lambda: {"symbol": ticker, "historical": daily_bars[ticker]})
+            return mock.Mock(json=lambda: intraday_bars)
+
+        def get_requested_ranges() -> list:
+            return sorted(url.split("?")[1].split("&apikey")[0] for url in requested_urls)
+
+        stock_list = [StockSymbol("AAPL"), StockSymbol("MSFT")]
+        with mock.patch("requests.Session.get", side_effect=mock_get):
+            res = self.stock_api.get_close_price_sma_status(stock_list, [3, 3], ["1day", "4hour"])
+            self.assertEqual(res, {StockSymbol("AAPL"): {"1day": True, "4hour": False},
+                                   StockSymbol("MSFT"): {"4hour": False}})
+            self.assertEqual(len(requested_urls), 4)
+
+            # up-to-date bars are not requested again, the last intraday bar of the session has ended
+            requested_urls.clear()
+            self.assertEqual(self.stock_api.get_close_price_sma_status(stock_list, [3, 3], ["1day", "4hour"]), res)
+            self.assertEqual(requested_urls, [])
+
+            # stale bars are updated from the latest stored bar
+            mock_time_now.return_value = datetime.datetime(2024, 5, 18, 1, 0, 0)
+            daily_bars["AAPL"] = [{"date": "2024-05-17", "close": 120}, {"date": "2024-05-16", "close": 120}]
+            self.stock_api.get_close_price_sma_status([StockSymbol("AAPL")], [3, 3], ["1day", "4hour"])
+            self.assertEqual(get_requested_ranges(), ["serietype=line&from=2024-05-16&to=2024-05-18"])
+            self.assertEqual(StockBarDBUtils.get_closes(["AAPL"], "1day", 5), {"AAPL": [120, 120, 90, 90]})
+
+            # the weekend does not make the bars stale
+            requested_urls.clear()
+            mock_time_now.return_value = datetime.datetime(2024, 5, 19, 20, 0, 0)
+            self.stock_api.get_close_price_sma_status([StockSymbol("AAPL")], [3, 3], ["1day", "4hour"])
+            self.assertEqual(requested_urls, [])
+
+            # the bars still forming are not stored
+            mock_time_now.return_value = datetime.datetime(2024, 5, 20, 14, 0, 0)
+            intraday_bars[:0] = [{"date": "2024-05-20 13:30:00", "close": 140},
+                                 {"date": "2024-05-20 09:30:00", "close": 130}]
+            self.stock_api.get_close_price_sma_status([StockSymbol("AAPL")], [3, 3], ["1day", "4hour"])
+            self.assertEqual(get_requested_ranges(), ["from=2024-05-17&to=2024-05-20"])
+            self.assertEqual(StockBarDBUtils.get_closes(["AAPL"], "4hour", 5), {"AAPL": [130, 110, 110, 110]})
+
+            # the bars older than the retention window are deleted, whatever the sma window of the caller
+            mock_time_now.return_value = datetime.datetime(2024, 6, 10, 1, 0, 0)
+            daily_bars["AAPL"] = [{"date": "2024-06-07", "close": 100}]
+            self.stock_api.update_stock_bars([StockSymbol("AAPL")], "1day", 3)
+            self.assertEqual(StockBarDBUtils.get_closes(["AAPL", "MSFT"], "1day", 5),
+                             {"AAPL": [100, 120, 120, 90, 90], "MSFT": [90]})
+            with mock.patch.object(StockApi, "BAR_RETENTION_BARS", 3):
+                mock_time_now.return_value = datetime.datetime(2024, 6, 11, 1, 0, 0)
+                daily_bars["AAPL"] = [{"date": "2024-06-10", "close": 100}]
+                self.stock_api.update_stock_bars([StockSymbol("AAPL")], "1day", 3)
+            self.assertEqual(StockBarDBUtils.get_closes(["AAPL", "MSFT"], "1day", 5), {"AAPL": [100, 100]})
+        StockBarDBUtils.clear()
+
+    def test_get_stocks_growth_score_frame(self) -> None:
+        income_statements = {
+            StockSymbol("AAPL"): [{"revenue": revenue, "netIncome": 1, "grossProfit": revenue / 2,
+                                   "operatingIncome": revenue / 4} for revenue in [20, 18, 16, 14, 10, 10]],
+            StockSymbol("MSFT"): [{"revenue": 10, "netIncome": 1, "grossProfit": 5, "operatingIncome": 0}] * 4,
+            StockSymbol("NVDA"): []}
+        cash_flow_statements = {
+            StockSymbol("AAPL"): [{"freeCashFlow": 4}, {"freeCashFlow": 9}] + [{"freeCashFlow": 0}] * 4,
+            StockSymbol("MSFT"): [{"freeCashFlow": 5}] * 4, StockSymbol("NVDA"): []}
+
+        def mock_get_quarterly_statements(statement: str, stock_list: list, limit: int) -> dict:
+            statements = income_statements if statement == "income-statement" else cash_flow_statements
+            return {stock: statements[stock][:limit] for stock in stock_list}
+
+        stock_list = [StockSymbol("AAPL"), StockSymbol("MSFT"), StockSymbol("NVDA")]
+        with mock.patch.object(StockApi, "get_quarterly_statements", side_effect=mock_get_quarterly_statements):
+            stats = self.stock_api.get_stocks_stats_frame(stock_list, "semi", 2)
+            self.assertEqual(stats[FinancialMetricType.REVENUE].tolist(), [[38, 30], [20, 20], [0, 0]])
+            self.assertEqual(stats[FinancialMetricType.OPERATING_MARGIN].tolist(), [[0.25, 0.25], [0, 0], [0, 0]])
+            self.assertEqual(stats[FinancialMetricType.FREE_CASH_FLOW_MARGIN][:, 0].tolist(), [13 / 38, 0.5, 0])
+
+            growth_scores = self.stock_api.get_stocks_growth_score_frame(stock_list)
+            self.assertEqual(growth_scores[FinancialMetricType.GROWTH_SCORE][:, 0].tolist(), [2.15, 0, 0])
+            self.assertEqual(self.stock_api.get_stocks_growth_score(stock_list, True)[StockSymbol("AAPL")][
+                FinancialMetricType.FREE_CASH_FLOW_MARGIN_AVG], FinancialMetricsData(0.35, has_percentage=True))
+
+            yoy_growth = self.stock_api.get_stocks_quarterly_revenue_yoy_growth_frame(stock_list, 2)
+            self.assertEqual(yoy_growth[FinancialMetricType.REVENUE_YOY_GROWTH].tolist(),
+                             [[1, 0.8], [0, 0], [0, 0]])
+
+    def test_get_quarterly_statements(self) -> None:
+        StockApi.clear_quarterly_statements()
+        revenues = {"AAPL": [{"revenue": i, "netIncome": 1, "extra": 1} for i in range(24, 0, -1)], "MSFT": []}
+        requested_urls = []
+
+        def mock_get(url: str, timeout: int) -> mock.Mock:
+            requested_urls.append(url)
+            ticker = url.split("/")[-1].split("?")[0]
+            return mock.Mock(json=lambda: revenues[ticker])
+
+        stock_list = [StockSymbol("AAPL"), StockSymbol("MSFT")]
+        with mock.patch("requests.Session.get", side_effect=mock_get), \
+                mock.patch("smrti_quant_alerts.http_api.ResponseCache.get", return_value=None):
+            statements = self.stock_api.get_quarterly_statements("income-statement", stock_list, 2)
+            self.assertEqual(statements, {StockSymbol("AAPL"): [
+                {"revenue": 24, "netIncome": 1, "grossProfit": 0, "operatingIncome": 0},
+                {"revenue": 23, "netIncome": 1, "grossProfit": 0, "operatingIncome": 0}], StockSymbol("MSFT"): []})
+
+            self.assertEqual(self.stock_api.get_stocks_revenue(stock_list),
+                             {StockSymbol("AAPL"): FinancialMetricsData(24)})
+            yoy_growth = self.stock_api.get_stocks_quarterly_revenue_yoy_growth(stock_list, 1)
+            self.assertEqual(yoy_growth[StockSymbol("AAPL")], [FinancialMetricsData(0.2, has_percentage=True)])
+            self.assertEqual(len(requested_urls), 2)
+            self.assertTrue(all("limit=24" in url for url in requested_urls))
+        StockApi.clear_quarterly_statements()
@@ -3,7 +3,10 @@ import os
 import time
 from unittest.mock import patch
 
+import requests
+
 from smrti_quant_alerts.telegram_api import TelegramBot
+from smrti_quant_alerts.http_api import RateLimiter
 from smrti_quant_alerts.settings import Config
 
 
@@ -16,24 +19,45 @@ class TestTelegramBot(unittest.TestCase):
             pass
 
     def test_release_msg_from_queue(self) -> None:
+        def mock_send(request: requests.PreparedRequest, **kwargs) -> requests.Response:
+            response = requests.Response()
+            response.status_code, response._content, response.request = 200, b'{"ok": true}', request
+            return response
+
+        RateLimiter.reset()
         telegram_bot = TelegramBot(daemon=False)
         telegram_bot.msg_queue = [["test", True], ["test1", False], ["test2", True]]
         start = time.time()
-        with patch('requests.get', side_effect=lambda x, timeout: {"ok": True}):
+        with patch('requests.adapters.HTTPAdapter.send', side_effect=mock_send) as mock_adapter_send:
             telegram_bot._release_msg_from_queue()
             self.assertEqual(telegram_bot.msg_queue, [])
             self.assertFalse(telegram_bot.running)
-            self.assertTrue(time.time() - start > 6)  # up to 20 msg/min
+            self.assertEqual(mock_adapter_send.call_count, 3)
+            self.assertGreater(time.time() - start, 5.9)  # up to 20 msg/min
+
+    def test_rate_limit_per_chat(self) -> None:
+        RateLimiter.reset()
+        with patch.dict(TelegramBot.TELEGRAM_IDS, {"CG_ALERT": "-1", "CG_SUM": "-2"}), \
+                patch('requests.Session.get', side_effect=lambda x, timeout: {"ok": True}) as mock_get:
+            start = time.time()
+            # the chats do not wait for each other
+            TelegramBot("CG_ALERT", daemon=False).send_message("test")
+            TelegramBot("CG_SUM", daemon=False).send_message("test")
+            self.assertLess(time.time() - start, 1)
+            self.assertEqual(mock_get.call_count, 2)
+
+            TelegramBot("CG_ALERT", daemon=False).send_message("test")
+            self.assertGreater(time.time() - start, 2.9)  # up to 20 msg/min per chat
 
     def test_send_message(self) -> None:
-        with patch('requests.get', side_effect=lambda x, timeout: {"ok": True}):
+        with patch('requests.Session.get', side_effect=lambda x, timeout: {"ok": True}):
             with patch.object(TelegramBot, '_release_msg_from_queue') as mock_release_msg_from_queue:
                 telegram_bot = TelegramBot(daemon=False)
                 telegram_bot.send_message("test", blue_text=True)
                 telegram_bot.send_message("test", blue_text=False)
             mock_release_msg_from_queue.assert_not_called()
 
-        with patch('requests.get', side_effect=lambda x, timeout: {"ok": True}):
+        with patch('requests.Session.get', side_effect=lambda x, timeout: {"ok": True}):
             with patch.object(TelegramBot, '_release_msg_from_queue') as mock_release_msg_from_queue:
                 telegram_bot = TelegramBot(daemon=True)
                 telegram_bot.send_message("test", blue_text=True)
@@ -44,7 +68,7 @@ class TestTelegramBot(unittest.TestCase):
         path = os.path.dirname(os.path.abspath(__file__))
         mock_file_path = os.path.join(path, "mock_file.txt")
 
-        with patch('requests.post',
+        with patch('requests.Session.post',
                    side_effect=lambda x, data, files, stream, timeout: {"data": data, "files": files}):
             telegram_bot = TelegramBot(daemon=False)
             res = telegram_bot.send_file(mock_file_path, "test.csv")